@@ -0,0 +1,239 @@
+'''
+Measures pyDBMS throughput in rows per second for each backend and writes the results as JSON.
+
+    python -m benchmarks.run_benchmarks --rows 10000 --output results.json
+    python -m benchmarks.run_benchmarks --postgres "host=localhost dbname=bench user=postgres password=password"
+    python -m benchmarks.run_benchmarks --compare before.json
+
+Every benchmark runs repeat times against a freshly created table and the fastest run is kept.
+'''
+import argparse
+from datetime import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+from pyDBMS.database.abstract_database import AbstractDatabase
+from pyDBMS.database.sqlite_database import SQLiteDatabase
+from tests.example_types import LogTimestamp, SimpleModel
+
+def _simple_models(n : int) -> List[SimpleModel]:
+    return [SimpleModel(model_id=str(i), integer_column=i, float_column=i / 2) for i in range(n)]
+
+def _reset_table(db : AbstractDatabase, model_type):
+    with db.db_connection.borrow() as conn:
+        conn.execute(f'DROP TABLE IF EXISTS {model_type.__table_name__}')
+        conn.commit()
+    db.schema_cache.invalidate()
+    db.create_model(model_type)
+
+
+# each benchmark prepares its table, then returns a function running the measured work and the number of rows it handles
+def bench_model_construction(db, n):
+    return lambda: _simple_models(n), n
+
+def bench_model_validation(db, n):
+    values = [(str(i), str(i), str(i / 2)) for i in range(n)]
+    return lambda: [SimpleModel(model_id=a, integer_column=b, float_column=c) for a, b, c in values], n
+
+def bench_insert_single(db, n):
+    _reset_table(db, SimpleModel)
+    models = _simple_models(max(1, n // 10))
+    def run():
+        for m in models:
+            db.insert(m)
+    return run, len(models)
+
+def bench_insert_bulk(db, n):
+    _reset_table(db, SimpleModel)
+    models = _simple_models(n)
+    return lambda: db.insert(models), n
+
+def bench_insert_datetime(db, n):
+    _reset_table(db, LogTimestamp)
+    now = datetime.now()
+    models = [LogTimestamp(model_id=str(i), timestamp=now) for i in range(n)]
+    return lambda: db.insert(models), n
+
+def bench_select_all(db, n):
+    _reset_table(db, SimpleModel)
+    db.insert(_simple_models(n))
+    return lambda: db.select(SimpleModel), n
+
+def bench_select_projection(db, n):
+    _reset_table(db, SimpleModel)
+    db.insert(_simple_models(n))
+    return lambda: db.select(SimpleModel, fields=['integer_column']), n
+
+def bench_select_filtered(db, n):
+    _reset_table(db, SimpleModel)
+    db.insert(_simple_models(n))
+    keys = [str(i) for i in range(0, n, 2)]
+    chunk = 500
+    def run():
+        for i in range(0, len(keys), chunk):
+            db.select(SimpleModel, model_id=keys[i:i + chunk])
+    return run, len(keys)
+
+def bench_select_by_key(db, n):
+    _reset_table(db, SimpleModel)
+    db.insert(_simple_models(n))
+    keys = [str(i) for i in range(max(1, n // 10))]
+    def run():
+        for key in keys:
+            db.select(SimpleModel, model_id=key)
+    return run, len(keys)
+
+def bench_get_by_key(db, n):
+    _reset_table(db, SimpleModel)
+    db.insert(_simple_models(n))
+    keys = [str(i) for i in range(max(1, n // 10))]
+    def run():
+        for key in keys:
+            db.get(SimpleModel, key)
+    return run, len(keys)
+
+def bench_get_many(db, n):
+    _reset_table(db, SimpleModel)
+    db.insert(_simple_models(n))
+    keys = [str(i) for i in range(0, n, 2)]
+    return lambda: db.get_many(SimpleModel, keys), len(keys)
+
+def bench_select_pages(db, n):
+    _reset_table(db, SimpleModel)
+    db.insert(_simple_models(n))
+    def run():
+        page = db.select(SimpleModel, order_by=['integer_column'], limit=500)
+        while page:
+            page = db.select(SimpleModel, order_by=['integer_column'], limit=500, after=page[-1])
+    return run, n
+
+def bench_iter_select(db, n):
+    _reset_table(db, SimpleModel)
+    db.insert(_simple_models(n))
+    return lambda: sum(1 for _ in db.iter_select(SimpleModel)), n
+
+def bench_update_list(db, n):
+    _reset_table(db, SimpleModel)
+    db.insert(_simple_models(n))
+    models = [SimpleModel(model_id=str(i), integer_column=-i, float_column=0.0) for i in range(n)]
+    return lambda: db.update(models), n
+
+def bench_upsert(db, n):
+    _reset_table(db, SimpleModel)
+    db.insert(_simple_models(n // 2))
+    models = _simple_models(n)
+    return lambda: db.upsert(models), n
+
+def bench_delete(db, n):
+    _reset_table(db, SimpleModel)
+    db.insert(_simple_models(n))
+    keys = [str(i) for i in range(n)]
+    chunk = 500
+    def run():
+        for i in range(0, n, chunk):
+            db.delete(SimpleModel, model_id=keys[i:i + chunk])
+    return run, n
+
+BENCHMARKS = {
+    'model_construction' : bench_model_construction,
+    'model_validation' : bench_model_validation,
+    'insert_single' : bench_insert_single,
+    'insert_bulk' : bench_insert_bulk,
+    'insert_datetime' : bench_insert_datetime,
+    'select_all' : bench_select_all,
+    'select_projection' : bench_select_projection,
+    'select_filtered' : bench_select_filtered,
+    'select_by_key' : bench_select_by_key,
+    'get_by_key' : bench_get_by_key,
+    'get_many' : bench_get_many,
+    'select_pages' : bench_select_pages,
+    'iter_select' : bench_iter_select,
+    'update_list' : bench_update_list,
+    'upsert' : bench_upsert,
+    'delete' : bench_delete,
+}
+
+def run_benchmark(db : AbstractDatabase, benchmark : Callable, rows : int, repeat : int = 3) -> dict:
+    best = None
+    for _ in range(repeat):
+        run, count = benchmark(db, rows)
+        start = time.perf_counter()
+        run()
+        seconds = time.perf_counter() - start
+        if best is None or seconds < best[1]:
+            best = (count, seconds)
+
+    count, seconds = best
+    return {'rows' : count, 'seconds' : seconds, 'rows_per_second' : count / seconds if seconds > 0 else float(count)}
+
+def run_backend(name : str, db : AbstractDatabase, rows : int, repeat : int = 3, only : List[str] = None) -> List[dict]:
+    results = []
+    for benchmark_name, benchmark in BENCHMARKS.items():
+        if only and benchmark_name not in only:
+            continue
+        result = run_benchmark(db, benchmark, rows, repeat)
+        result.update({'backend' : name, 'benchmark' : benchmark_name})
+        results.append(result)
+        print(f'{name:>14} {benchmark_name:<20} {result["rows_per_second"]:>14,.0f} rows/s')
+    return results
+
+def _commit_id() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+def run_all(rows : int = 10000, repeat : int = 3, postgres_dsn : str = None, only : List[str] = None) -> dict:
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        results += run_backend('sqlite_file', SQLiteDatabase(os.path.join(directory, 'benchmark.db')), rows, repeat, only)
+    results += run_backend('sqlite_memory', SQLiteDatabase(':memory:'), rows, repeat, only)
+    if postgres_dsn:
+        from pyDBMS.database.postgres_database import PostgresDatabase
+        results += run_backend('postgres', PostgresDatabase(dsn=postgres_dsn), rows, repeat, only)
+
+    return {
+        'meta' : {
+            'commit' : _commit_id(),
+            'timestamp' : datetime.now().isoformat(),
+            'python' : platform.python_version(),
+            'platform' : platform.platform(),
+            'rows' : rows,
+            'repeat' : repeat,
+        },
+        'results' : results,
+    }
+
+def compare(before : dict, after : dict) -> Dict[str, float]:
+    '''Returns the rows/sec ratio of after to before for every benchmark present in both.'''
+    previous = {(r['backend'], r['benchmark']) : r['rows_per_second'] for r in before['results']}
+    return {f'{r["backend"]}.{r["benchmark"]}' : r['rows_per_second'] / previous[(r['backend'], r['benchmark'])]
+        for r in after['results'] if previous.get((r['backend'], r['benchmark']))}
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description='pyDBMS throughput benchmarks')
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--postgres', metavar='DSN', help='also benchmark a postgres database, e.g. "host=localhost dbname=bench user=postgres"')
+    parser.add_argument('--only', nargs='*', choices=sorted(BENCHMARKS), help='run only these benchmarks')
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--compare', metavar='JSON', help='print the speedup over an earlier results file')
+    args = parser.parse_args(argv)
+
+    results = run_all(args.rows, args.repeat, args.postgres, args.only)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            before = json.load(f)
+        for name, ratio in compare(before, results).items():
+            print(f'{name:<36} {ratio:>6.2f}x')
+
+if __name__ == '__main__':
+    sys.exit(main())
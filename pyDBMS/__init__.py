@@ -1,4 +1,4 @@
 import pyDBMS.dbtype as types
 
 # database imports
-from pyDBMS.database import AbstractDatabase, SQLiteDatabase, CrateDatabase
+from pyDBMS.database import AbstractDatabase, SQLiteDatabase, CrateDatabase, Q
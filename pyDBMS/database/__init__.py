@@ -1,3 +1,4 @@
 from .abstract_database import AbstractDatabase
 from .crate_database import CrateDatabase
-from .sqlite_database import SQLiteDatabase
\ No newline at end of file
+from .sqlite_database import SQLiteDatabase
+from .filters import Q
\ No newline at end of file
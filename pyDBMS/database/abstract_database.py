@@ -1,26 +1,212 @@
 from abc import ABC, abstractmethod
-from typing import List, Union
+from contextlib import contextmanager
+import threading
+import time
+from typing import Dict, Iterator, List, Tuple, Union
 from pyDBMS.database.type_mapper import TypeMapper
-from pyDBMS.dbtype import DBType, Model
+from pyDBMS.dbtype import DBType, Index, Model
 from pyDBMS.database.model_descriptor import StandardModelDescriptor
 from pyDBMS.database.connections.db_connection import DBConnection
-from pyDBMS.database.query_builder import DeleteQueryBuilder, SQLDriver, SelectQueryBuilder, StandardSQLDriver, UpdateQueryBuilder
+from pyDBMS.database.instrumentation import QueryHook
+from pyDBMS.database.caching import IdentityMap, ResultCache, shared_result_cache
+from pyDBMS.database.schema_cache import ColumnInfo, SchemaCache, build_model_class
+from pyDBMS.database.unit_of_work import UnitOfWork
+from pyDBMS.database.query_builder import AggregateQueryBuilder, DeleteQueryBuilder, SQLDriver, SelectQueryBuilder, StandardSQLDriver, UpdateQueryBuilder
+from pyDBMS.database.filters import filter_fields
+
+class InsertStats():
+    '''Summary of a call to `AbstractDatabase.insert`.'''
+
+    def __init__(self, rows : int, seconds : float) -> None:
+        self.rows = rows
+        self.seconds = seconds
+
+    @property
+    def rows_per_second(self) -> float:
+        if self.seconds <= 0:
+            return float(self.rows)
+        return self.rows / self.seconds
+
+    def __repr__(self) -> str:
+        return f'InsertStats(rows={self.rows}, seconds={self.seconds:.4f}, rows_per_second={self.rows_per_second:.1f})'
 
 class AbstractDatabase(ABC):
     db_connection : DBConnection
     sql_driver : SQLDriver
     model_descriptor = StandardModelDescriptor()
+
+    # send bulk inserts as a single multi-row VALUES statement instead of executemany
+    multi_row_insert = False
+    # upper bound on the number of bind parameters in a single statement
+    max_query_params = 999
+    # seconds catalog metadata is cached for, None caches until invalidated and 0 disables caching
+    schema_cache_ttl = 60.0
+    # ResultCache answering repeated selects, see enable_result_cache
+    result_cache = None
     
     def __init__(self,db_connection : DBConnection, model_descriptor = StandardModelDescriptor(), sql_driver = StandardSQLDriver(), type_mapper = TypeMapper()):
         self.model_descriptor = model_descriptor
         self.db_connection = db_connection
         self.sql_driver = sql_driver
         self.type_mapper = type_mapper
+        self.schema_cache = SchemaCache(self.schema_cache_ttl)
+        # identifies the database in the shared result cache, subclasses use their connection target.
+        # cache keys keep the token alive, so unlike id(self) it is never reused by another database
+        self.cache_namespace = object()
+        self._local = threading.local()
+
+    @contextmanager
+    def transaction(self):
+        '''
+        Runs the enclosed operations in a single transaction that is committed when the
+        outermost block exits and rolled back if it raises. Nested blocks use savepoints,
+        so an exception inside one only undoes that block.
+        '''
+        with self.db_connection.borrow(write=True) as conn:
+            depth = self._transaction_depth()
+            savepoint = f'pydbms_savepoint_{depth}'
+            if depth == 0:
+                conn.begin()
+            else:
+                conn.savepoint(savepoint)
+
+            self._local.transaction_depth = depth + 1
+            rolled_back = False
+            try:
+                yield
+            except BaseException:
+                rolled_back = True
+                if depth == 0:
+                    conn.rollback()
+                else:
+                    conn.rollback_to_savepoint(savepoint)
+                    conn.release_savepoint(savepoint)
+                raise
+            else:
+                if depth == 0:
+                    conn.commit()
+                else:
+                    conn.release_savepoint(savepoint)
+            finally:
+                self._local.transaction_depth = depth
+                if depth == 0:
+                    self._end_transaction_invalidation(rolled_back)
+
+    def _end_transaction_invalidation(self, rolled_back : bool):
+        # results read by other threads while the transaction was open may predate its commit
+        for table_name in self._local.__dict__.pop('dirty_tables', ()):
+            if self.result_cache is not None:
+                self.result_cache.invalidate((self.cache_namespace, table_name))
+            identity_map = self._identity_map()
+            if rolled_back and identity_map is not None:
+                identity_map.invalidate(table_name)
+
+    def enable_result_cache(self, cache : ResultCache = None):
+        '''
+        Answers repeated selects from a ResultCache, by default the one shared by the whole
+        process. Entries are invalidated by insert, update and delete through pyDBMS; changes
+        made by other processes are only seen once entries expire.
+        '''
+        self.result_cache = shared_result_cache if cache is None else cache
+
+    def disable_result_cache(self):
+        self.result_cache = None
+
+    @contextmanager
+    def session(self):
+        '''
+        Yields an IdentityMap for the current thread. Within the block, selecting a row that was
+        already loaded returns the same model instance. Nested sessions share the outer map.
+        '''
+        identity_map = self._identity_map()
+        if identity_map is not None:
+            yield identity_map
+            return
+
+        self._local.identity_map = IdentityMap()
+        try:
+            yield self._local.identity_map
+        finally:
+            self._local.identity_map = None
+
+    def _identity_map(self) -> IdentityMap:
+        return getattr(self._local, 'identity_map', None)
+
+    def _map_identities(self, models : List[Model]) -> List[Model]:
+        identity_map = self._identity_map()
+        if identity_map is None or not models or not isinstance(models[0], Model):
+            return models
+        return [identity_map.merge(m) for m in models]
+
+    def _tables_written(self, table_names, models : List[Model] = None):
+        '''Invalidates cached results of the written tables. Written models become the session's instances.'''
+        identity_map = self._identity_map()
+        if identity_map is not None:
+            if models is None:
+                for table_name in table_names:
+                    identity_map.invalidate(table_name)
+            else:
+                for m in models:
+                    identity_map.add(m)
+
+        if self.in_transaction():
+            self._local.__dict__.setdefault('dirty_tables', set()).update(table_names)
+        if self.result_cache is not None:
+            for table_name in table_names:
+                self.result_cache.invalidate((self.cache_namespace, table_name))
+
+    def add_hook(self, hook : QueryHook):
+        '''Registers a QueryHook (e.g. SlowQueryLog, LatencyHistogram, RowCounter) called around every statement.'''
+        self.db_connection.add_hook(hook)
+
+    def remove_hook(self, hook : QueryHook):
+        self.db_connection.remove_hook(hook)
+
+    @contextmanager
+    def unit_of_work(self):
+        '''
+        Yields a UnitOfWork that collects inserts, updates and deletes and flushes them
+        in one transaction when the block exits. Nothing is written if the block raises.
+        '''
+        uow = UnitOfWork(self)
+        yield uow
+        uow.flush()
+
+    def in_transaction(self) -> bool:
+        return self._transaction_depth() > 0
+
+    def _transaction_depth(self) -> int:
+        return getattr(self._local, 'transaction_depth', 0)
+
+    def _commit(self, conn : DBConnection):
+        '''Commits unless an enclosing transaction() block will commit instead.'''
+        if not self.in_transaction():
+            conn.commit()
 
     @abstractmethod
     def get_tables(self) -> List[str]:
         raise NotImplementedError()
 
+    def _load_schema(self) -> Dict[str, List[ColumnInfo]]:
+        '''Loads every table and its columns from the catalog, batched into as few queries as possible.'''
+        raise NotImplementedError()
+
+    def _schema(self) -> Dict[str, List[ColumnInfo]]:
+        return self.schema_cache.tables(self._load_schema)
+
+    def _cached_tables(self) -> List[str]:
+        return list(self._schema())
+
+    def _cached_columns(self, table_name : str) -> List[str]:
+        columns = self._schema().get(table_name)
+        if columns is None:
+            raise KeyError(table_name)
+        return [c.name for c in columns]
+
+    def _cached_model_meta(self, table_name : str) -> Model:
+        load = lambda: build_model_class(table_name, self._schema(), self.type_mapper)
+        return self.schema_cache.model_class(table_name, load)()
+
     @abstractmethod
     def get_columns(self, table_name : str) -> List[str]:
         raise NotImplementedError()
@@ -56,74 +242,464 @@ class AbstractDatabase(ABC):
             print(f'model {model.__table_name__} already exists in the database')
             return
         
-        self.db_connection.execute(self.model_descriptor.describe(model))
-        self.db_connection.commit()
+        with self.db_connection.borrow(write=True) as conn:
+            conn.execute(self.model_descriptor.describe(model))
+            for statement in self.model_descriptor.describe_indexes(model):
+                conn.execute(statement)
+            self._commit(conn)
+        self.schema_cache.invalidate()
+
+    def create_indexes(self, model : Model):
+        '''Creates the model's declared indexes that are missing from an existing table.'''
+        if isinstance(model, type):
+            model = model()
+        with self.db_connection.borrow(write=True) as conn:
+            for index in self.missing_indexes(model):
+                conn.execute(self.model_descriptor.describe_index(model, index))
+            self._commit(conn)
+
+    def missing_indexes(self, model : Model) -> List[Index]:
+        '''
+        Returns the indexes declared in the model's `__indexes__` that the database does not have.
+        An index counts as present if one with the same name, or with the same columns in the same
+        order and at least the same uniqueness, exists on the table.
+        '''
+        if isinstance(model, type):
+            model = model()
+        if not self.model_descriptor.describe_indexes(model):
+            return []
+        existing = self._load_indexes(model.__table_name__)
+        columns = {(fields, unique) for fields, unique in existing.values()}
+        return [index for index in model.__indexes__ if index.index_name(model.__table_name__) not in existing
+            and (index.fields, True) not in columns and (index.fields, index.unique) not in columns]
+
+    # returns (index name, is unique, column name) for every column of every index on a table, in column order
+    index_query = None
+
+    def _load_indexes(self, table_name : str) -> Dict[str, Tuple[Tuple[str], bool]]:
+        '''Returns the name of every index on the table mapped to its (columns, unique).'''
+        with self.db_connection.borrow() as conn:
+            cur = conn.cursor()
+            cur.execute(self.index_query, [table_name])
+            rows = cur.fetchall()
+        indexes = {}
+        for name, unique, column in rows:
+            columns, _ = indexes.get(name, ((), False))
+            indexes[name] = (columns + (column,), bool(unique))
+        return indexes
 
     @abstractmethod
-    def insert(self, model : Union[Model, List[Model]]):
-        if not isinstance(model, Model):
+    def insert(self, model : Union[Model, List[Model]], batch_size : int = 1000) -> InsertStats:
+        models = model if isinstance(model, list) else [model]
+        if not all([isinstance(m, Model) for m in models]):
             raise TypeError()
-        
-        cur = self.db_connection.cursor()
-        fields = sorted(model.fields)
-        cur.execute(f'INSERT INTO {model.__table_name__}({",".join(fields)}) VALUES ({",".join(["?" for _ in fields])})',[model.get(field) for field in fields])
-        self.db_connection.commit()
+        if batch_size < 1:
+            raise ValueError('batch_size must be a positive integer')
+
+        table_names = {m.__table_name__ for m in models}
+        start = time.perf_counter()
+        try:
+            with self.db_connection.borrow(write=True) as conn:
+                for template, fields, rows in self._insert_batches(models, batch_size):
+                    self._execute_insert_batch(conn, template, fields, rows)
+                    self._commit(conn)
+        except BaseException:
+            # some models were not written, so the session reloads the tables instead of mapping them
+            self._tables_written(table_names)
+            raise
+        self._tables_written(table_names, models)
+
+        return InsertStats(len(models), time.perf_counter() - start)
+
+    @staticmethod
+    def _group_models(models : List[Model]) -> Dict[Tuple[str, Tuple[str]], List[Model]]:
+        '''Groups models by table and column set, preserving the order they were given in.'''
+        groups = {}
+        for m in models:
+            groups.setdefault((m.__table_name__, tuple(sorted(m.fields))), []).append(m)
+        return groups
+
+    @staticmethod
+    def _insert_batches(models : List[Model], batch_size : int) -> Iterator[Tuple[Model, List[str], List[list]]]:
+        '''Yields (template model, fields, rows) for every batch of at most batch_size rows.'''
+        for (_, fields), group in AbstractDatabase._group_models(models).items():
+            for i in range(0, len(group), batch_size):
+                batch = group[i:i + batch_size]
+                yield batch[0], list(fields), [[m.get(field) for field in fields] for m in batch]
+
+    def _execute_insert_batch(self, conn : DBConnection, model : Model, fields : List[str], rows : List[list], upsert : bool = False):
+        build = self.sql_driver.build_bulk_upsert if upsert else self.sql_driver.build_bulk_insert
+        if not self.multi_row_insert or len(rows) == 1:
+            conn.executemany(build(model, fields), rows)
+            return
+
+        rows_per_statement = max(1, self.max_query_params // len(fields))
+        for i in range(0, len(rows), rows_per_statement):
+            chunk = rows[i:i + rows_per_statement]
+            conn.execute(build(model, fields, len(chunk)), [v for row in chunk for v in row])
+
+    def upsert(self, model : Union[Model, List[Model]], batch_size : int = 1000) -> InsertStats:
+        '''
+        Inserts models, updating the rows that already exist with the same primary key in the same
+        statement. When a list holds several models with one primary key, the last one is written.
+        '''
+        models = self._upsert_models(model)
+        if batch_size < 1:
+            raise ValueError('batch_size must be a positive integer')
+
+        table_names = {m.__table_name__ for m in models}
+        start = time.perf_counter()
+        try:
+            with self.db_connection.borrow(write=True) as conn:
+                for template, fields, rows in self._insert_batches(models, batch_size):
+                    self._execute_insert_batch(conn, template, fields, rows, upsert=True)
+                    self._commit(conn)
+        except BaseException:
+            # some models were not written, so the session reloads the tables instead of mapping them
+            self._tables_written(table_names)
+            raise
+        self._tables_written(table_names, models)
+
+        return InsertStats(len(models), time.perf_counter() - start)
+
+    @staticmethod
+    def _upsert_models(model : Union[Model, List[Model]]) -> List[Model]:
+        '''Validates models for upsert and drops all but the last model given for each primary key.'''
+        models = model if isinstance(model, list) else [model]
+        if not all([isinstance(m, Model) for m in models]):
+            raise TypeError()
+        for m in models:
+            if not m.__primary_keys__:
+                raise ValueError(f'{m.__table_name__} has no primary keys to upsert on')
+        # a statement may not update the same row twice, so duplicates are collapsed up front
+        return list({(m.__table_name__, tuple([m.get(x) for x in m.__primary_keys__])) : m for m in models}.values())
 
     @abstractmethod
     def delete(self, model_type, override_delete_all = False, **kwargs):
         if isinstance(model_type, type):
             model_type = model_type()
 
-        if len(kwargs) == 0 and not override_delete_all:
+        # where=None or an empty Q filters nothing, so they delete everything too
+        if not any(True for _ in filter_fields(kwargs)) and not override_delete_all:
             print('Warning: deleting all entries in a table must be explicitly overridden')
             return
 
-        self.db_connection.execute(self.sql_driver.build_delete(model_type, **kwargs))
-        self.db_connection.commit()
+        query, params = self.sql_driver.build_delete(model_type, **kwargs)
+        try:
+            with self.db_connection.borrow(write=True) as conn:
+                conn.execute(query, params)
+                self._commit(conn)
+        finally:
+            self._tables_written([model_type.__table_name__])
 
     @abstractmethod
     def update(self, model : Union[Model,List[Model]]) -> int:
-        if isinstance(model, list):
-            affected_rows = 0
-            for m in model:
-                affected_rows += self.update(m)
-            return affected_rows
-        
-        if not isinstance(model, Model):
-            print(f'{model} is not a subclass of Model')
-            return 0
-        if not model.__primary_keys__:
-            print('model must contain primary keys to be updated')
-            return 0
-
-        query, updatable_fields = self.sql_driver.build_update(model)
-        result = self.db_connection.execute(query, list([model.get(x) for x in updatable_fields]))
-        self.db_connection.commit()
-        return result.rowcount()
+        affected_rows = 0
+        written, missed, updated = [], [], []
+        try:
+            with self.transaction():
+                with self.db_connection.borrow(write=True) as conn:
+                    for template, updatable_fields, rows, group in self._update_batches(model):
+                        written.append(template.__table_name__)
+                        batch_rows = self._execute_update_batch(conn, template, updatable_fields, rows)
+                        affected_rows += batch_rows
+                        # only models whose rows were all found are known to match the database
+                        if batch_rows == len(rows):
+                            updated.extend(group)
+                        else:
+                            missed.append(template.__table_name__)
+                if missed:
+                    self._tables_written(missed)
+                self._tables_written(written, updated)
+        except BaseException:
+            self._tables_written({m.__table_name__ for m in (model if isinstance(model, list) else [model]) if isinstance(m, Model)})
+            raise
+        return affected_rows
+
+    @staticmethod
+    def _update_batches(model : Union[Model,List[Model]]) -> Iterator[Tuple[Model, List[str], List[list]]]:
+        '''
+        Yields (template model, updatable fields, rows, models) per table and field set. Each row holds the
+        updatable field values followed by the primary key values. Models that cannot be updated are skipped.
+        '''
+        models = model if isinstance(model, list) else [model]
+        updatable_models = []
+        for m in models:
+            if not isinstance(m, Model):
+                print(f'{m} is not a subclass of Model')
+            elif not m.__primary_keys__:
+                print('model must contain primary keys to be updated')
+            else:
+                updatable_models.append(m)
+
+        for (_, fields), group in AbstractDatabase._group_models(updatable_models).items():
+            primary_keys = group[0].__primary_keys__
+            updatable_fields = [x for x in fields if x not in primary_keys]
+            if updatable_fields:
+                yield group[0], updatable_fields, [[m.get(x) for x in updatable_fields] + [m.get(x) for x in primary_keys] for m in group], group
+
+    def _execute_update_batch(self, conn : DBConnection, model : Model, updatable_fields : List[str], rows : List[list]) -> int:
+        query = self.sql_driver.build_bulk_update(model, updatable_fields)
+        if len(rows) == 1:
+            return conn.execute(query, rows[0]).rowcount()
+        return conn.executemany(query, rows).rowcount()
 
     @abstractmethod
-    def select(self, model_type : Union[Model,type], **kwargs) -> List[Model]:
+    def select(self, model_type : Union[Model,type], rows : str = 'model', fields : List[str] = None, order_by : List[str] = None, limit : int = None, after = None, **kwargs) -> List[Model]:
+        '''
+        Selects the models matching the given field filters. With rows='compact' read-only,
+        tuple backed CompactRows are returned instead, which use far less memory than models.
+        When fields is given only those columns are selected and the models hold only those fields.
+
+        order_by sorts by the given fields ('-field' sorts descending) and limit caps the number of
+        rows. Pages are continued with after, the last row of the previous page: the query seeks
+        past it instead of skipping rows, so every page costs the same.
+
+        rows, fields, order_by, limit and after are not filters, so filters on fields with
+        those names must be given through where=Q(...).
+        '''
         if isinstance(model_type, type):
             model = model_type()
         else:
             model = model_type
         
-        for key in kwargs:
+        for key in filter_fields(kwargs):
             assert key in model.fields
 
-        query = self.sql_driver.build_select(model, **kwargs)
+        fields = self._projection(model, fields)
+        self._check_paging(model, order_by, limit)
+        query, params = self.sql_driver.build_select(model, fields, order_by=order_by, limit=limit, after=after, **kwargs)
+        result_fields, result_rows = self._fetch_all(model.__table_name__, query, params)
+        results = self._build_rows(model_type, result_fields, result_rows, self._compact_rows(rows))
+        return results if fields is not None else self._map_identities(results)
+
+    @staticmethod
+    def _check_paging(model : Model, order_by : List[str], limit : int):
+        for field in [order_by] if isinstance(order_by, str) else order_by or []:
+            assert field.lstrip('-') in model.fields
+        if limit is not None and (not isinstance(limit, int) or limit < 0):
+            raise ValueError('limit must be a non-negative integer')
+
+    @staticmethod
+    def _projection(model : Model, fields : List[str]) -> List[str]:
+        '''Validates the fields a select is restricted to, returning None when every field is selected.'''
+        if fields is None:
+            return None
+        if isinstance(fields, str):
+            fields = [fields]
+        fields = list(dict.fromkeys(fields))
+        if not fields:
+            raise ValueError('fields must name at least one field')
+        for field in fields:
+            assert field in model.fields
+        # partially loaded models are kept out of the identity map, so it never hands out a model missing fields
+        return fields
+
+    def get(self, model_type : Union[Model,type], primary_key) -> Model:
+        '''
+        Returns the model with the given primary key, or None if there is no such row. Composite
+        keys are given as a tuple in `__primary_keys__` order.
+        '''
+        models = self.get_many(model_type, [primary_key])
+        return models[0] if models else None
+
+    def get_many(self, model_type : Union[Model,type], primary_keys : list, chunk_size : int = None) -> List[Model]:
+        '''
+        Returns the models with the given primary keys, in the order the keys were given, leaving
+        out keys that have no row. Keys are looked up in chunks of at most chunk_size per statement,
+        by default as many as max_query_params allows. Inside a session, models already in its
+        identity map are returned without querying.
+        '''
+        model_class = model_type if isinstance(model_type, type) else type(model_type)
+        key_fields = model_class.__primary_keys__
+        if not key_fields:
+            raise ValueError(f'{model_class.__table_name__} has no primary keys')
+
+        key_types = [model_class._type_mapping[x] for x in key_fields]
+        keys = []
+        for key in primary_keys:
+            values = tuple(key) if isinstance(key, (tuple, list)) else (key,)
+            if len(values) != len(key_fields):
+                raise ValueError(f'primary keys of {model_class.__table_name__} have {len(key_fields)} values: {key_fields}')
+            keys.append(tuple([t._coerce(v) for t, v in zip(key_types, values)]))
+
+        found = {}
+        identity_map = self._identity_map()
+        missing = []
+        for key in dict.fromkeys(keys):
+            model = identity_map.get(model_class.__table_name__, key) if identity_map is not None else None
+            if model is None:
+                missing.append(key)
+            else:
+                found[key] = model
+
+        if chunk_size is None:
+            chunk_size = max(1, self.max_query_params // len(key_fields))
+        for i in range(0, len(missing), chunk_size):
+            chunk = missing[i:i + chunk_size]
+            query = self.sql_driver.build_get(model_class, len(chunk))
+            fields, rows = self._fetch_all(model_class.__table_name__, query, [v for key in chunk for v in key])
+            for model in self._map_identities(self._build_rows(model_class, fields, rows)):
+                found[tuple([model.get(x) for x in key_fields])] = model
+
+        return [found[key] for key in keys if key in found]
+
+    def count(self, model_type : Union[Model,type], **kwargs) -> int:
+        '''Returns the number of rows matching the given filters, counted by the database.'''
+        model = model_type() if isinstance(model_type, type) else model_type
+        for key in filter_fields(kwargs):
+            assert key in model.fields
+
+        query, params = self.sql_driver.build_count(model, **kwargs)
+        _, rows = self._fetch_all(model.__table_name__, query, params)
+        return int(rows[0][0])
+
+    def exists(self, model_type : Union[Model,type], **kwargs) -> bool:
+        '''Returns whether any row matches the given filters, stopping at the first match.'''
+        model = model_type() if isinstance(model_type, type) else model_type
+        for key in filter_fields(kwargs):
+            assert key in model.fields
+
+        query, params = self.sql_driver.build_exists(model, **kwargs)
+        _, rows = self._fetch_all(model.__table_name__, query, params)
+        return len(rows) > 0
+
+    def aggregate(self, model_type : Union[Model,type], group_by : List[str] = None, count = None, sum = None, min = None, max = None, avg = None, **kwargs):
+        '''
+        Computes aggregates in the database. count, sum, min, max and avg each take a field name or
+        a list of them, and count also takes '*'. Results are keyed `<function>_<field>`, or 'count'
+        for count('*'). Without group_by a single dictionary is returned, otherwise one per group,
+        holding the group fields too and ordered by them. Filters on fields named like these
+        keywords must be given through where=Q(...).
+        '''
+        model = model_type() if isinstance(model_type, type) else model_type
+        for key in filter_fields(kwargs):
+            assert key in model.fields
+
+        group_by, aggregates = self._aggregate_spec(model, group_by, {'count' : count, 'sum' : sum, 'min' : min, 'max' : max, 'avg' : avg})
+        query, params = self.sql_driver.build_aggregate(model, group_by, aggregates, **kwargs)
+        _, rows = self._fetch_all(model.__table_name__, query, params)
+        results = self._aggregate_results(type(model), group_by, aggregates, rows)
+        return results if group_by else results[0]
+
+    @staticmethod
+    def _aggregate_spec(model : Model, group_by : List[str], functions : Dict[str, Union[str, List[str]]]) -> Tuple[List[str], List[Tuple[str, str]]]:
+        '''Validates the arguments of aggregate, returning the group fields and the (function, field) pairs.'''
+        group_by = [group_by] if isinstance(group_by, str) else list(group_by or [])
+        for field in group_by:
+            assert field in model.fields
+
+        aggregates = []
+        for function, fields in functions.items():
+            if fields is None:
+                continue
+            for field in [fields] if isinstance(fields, str) else fields:
+                assert field in model.fields or (function == 'count' and field == '*')
+                aggregates.append((function, field))
+
+        if not aggregates and not group_by:
+            raise ValueError('aggregate needs at least one aggregate or group_by field')
+        return group_by, aggregates
+
+    @staticmethod
+    def _aggregate_results(model_class : type, group_by : List[str], aggregates : List[Tuple[str, str]], rows : list) -> List[dict]:
+        '''Builds a dictionary per result row, converting group fields and min/max values to their field types.'''
+        keys = list(group_by) + [AggregateQueryBuilder.alias(function, field) for function, field in aggregates]
+        converters = [model_class._type_mapping[field]._from_db for field in group_by]
+        for function, field in aggregates:
+            if function in ('min', 'max'):
+                converters.append(model_class._type_mapping[field]._from_db)
+            elif function == 'count':
+                converters.append(int)
+            else:
+                converters.append(lambda v: v)
+        return [dict(zip(keys, [convert(v) for convert, v in zip(converters, row)])) for row in rows]
+
+    def _fetch_all(self, table_name : str, query, params) -> Tuple[List[str], list]:
+        '''Runs a select and returns (fields, rows), answering from the result cache when it is enabled.'''
+        cache = self.result_cache
+        # reads inside a transaction may see its uncommitted writes, so they are never cached
+        if cache is None or self.in_transaction():
+            with self.db_connection.borrow() as conn:
+                results = conn.execute(query, params)
+                return results.fields(), results.fetchall()
+
+        key = (self.cache_namespace, query, tuple(params))
+        result = cache.get(key)
+        if result is None:
+            table = (self.cache_namespace, table_name)
+            generation = cache.generation(table)
+            with self.db_connection.borrow() as conn:
+                results = conn.execute(query, params)
+                result = (results.fields(), results.fetchall())
+            cache.put(key, table, result, generation)
+        return result
+
+    def iter_select(self, model_type : Union[Model,type], chunk_size : int = 1000, rows : str = 'model', fields : List[str] = None, order_by : List[str] = None, limit : int = None, after = None, **kwargs) -> Iterator[Model]:
+        '''
+        Lazily selects models, or CompactRows with rows='compact', fetching and building at most
+        chunk_size at a time so memory use does not grow with the size of the result set.
+        Ordering and paging work as in `select`. Filters on fields named like any of the
+        keyword arguments, chunk_size included, must be given through where=Q(...).
+        '''
+        compact = self._compact_rows(rows)
+        model = model_type() if isinstance(model_type, type) else model_type
+        for key in filter_fields(kwargs):
+            assert key in model.fields
+
+        fields = self._projection(model, fields)
+        self._check_paging(model, order_by, limit)
+        query, params = self.sql_driver.build_select(model, fields, order_by=order_by, limit=limit, after=after, **kwargs)
+        for result_fields, chunk in self._fetch_chunks(query, params, chunk_size):
+            results = self._build_rows(model_type, result_fields, chunk, compact)
+            yield from results if fields is not None else self._map_identities(results)
+
+    def select_arrays(self, model_type : Union[Model,type], chunk_size : int = 10000, fields : List[str] = None, **kwargs) -> Dict[str, 'numpy.ndarray']:
+        '''
+        Selects matching rows as a dictionary of column name to numpy array, typed by each
+        field's DBType. Arrays are filled chunk by chunk without building Model objects.
+        When fields is given only those columns are selected. Requires numpy. Filters on fields
+        named chunk_size or fields must be given through where=Q(...).
+        '''
+        from pyDBMS.database.columnar import ColumnArrayBuilder
+
+        model = model_type() if isinstance(model_type, type) else model_type
+        for key in filter_fields(kwargs):
+            assert key in model.fields
+
+        fields = self._projection(model, fields)
+        query, params = self.sql_driver.build_select(model, fields, **kwargs)
+        builder = None
+        for result_fields, rows in self._fetch_chunks(query, params, chunk_size):
+            if builder is None:
+                builder = ColumnArrayBuilder(type(model), result_fields)
+            builder.add_rows(rows)
+
+        if builder is None:
+            builder = ColumnArrayBuilder(type(model), model.fields if fields is None else fields)
+        return builder.build()
 
-        results = self.db_connection.execute(query)
-        return self._build_objects(model_type, results)
+    def _fetch_chunks(self, query, params, chunk_size : int) -> Iterator[Tuple[List[str], list]]:
+        '''Runs a query on a streaming cursor and yields (fields, rows) for each fetched chunk.'''
+        with self.db_connection.borrow(share=False) as conn:
+            cur = conn.server_cursor()
+            try:
+                cur.execute(query, params)
+                while True:
+                    rows = cur.fetchmany(chunk_size)
+                    if not rows:
+                        break
+                    yield cur.fields(), rows
+            finally:
+                cur.close()
 
-    def _build_objects(self, model_type, results):
-        fields = results.fields()
-        items = []
-        for result in results.fetchall():
-            
-            obj = model_type() if isinstance(model_type, type) else model_type
-            for i in range(len(result)):
-                obj[fields[i]] = result[i]
-            items.append(obj)
+    def _build_rows(self, model_type, fields, rows, compact : bool = False) -> List[Model]:
+        model_class = model_type if isinstance(model_type, type) else type(model_type)
+        load = model_class._compact_loader(fields) if compact else model_class._loader(fields)
+        return [load(row) for row in rows]
 
-        return items
\ No newline at end of file
+    @staticmethod
+    def _compact_rows(rows : str) -> bool:
+        if rows not in ('model', 'compact'):
+            raise ValueError(f"rows must be 'model' or 'compact', not {rows!r}")
+        return rows == 'compact'
\ No newline at end of file
@@ -0,0 +1,313 @@
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+import time
+from typing import AsyncIterator, Dict, List, Union
+from pyDBMS.database.abstract_database import AbstractDatabase, InsertStats
+from pyDBMS.database.connections.async_connection import AsyncDBConnection, AsyncPostgresConnection, AsyncSQLiteConnection
+from pyDBMS.database.connections.async_connection_pool import AsyncConnectionPool
+from pyDBMS.database.filters import filter_fields
+from pyDBMS.database.model_descriptor import PostgresDBModelDescriptor, SQLiteModelDescriptor, StandardModelDescriptor
+from pyDBMS.database.postgres_database import PostgresDatabase, values_update_statements
+from pyDBMS.database.query_builder import PostgresSQLDriver, SQLDriver, StandardSQLDriver
+from pyDBMS.database.schema_cache import ColumnInfo, SchemaCache, build_model_class
+from pyDBMS.database.sqlite_database import SQLiteDatabase
+from pyDBMS.database.type_mapper import PostgresTypeMapper, TypeMapper
+from pyDBMS.dbtype import Model
+
+class AsyncAbstractDatabase():
+    '''
+    asyncio counterpart of AbstractDatabase. Every operation is a coroutine and
+    `iter_select` is an async generator; SQL is built by the same SQLDriver and
+    ModelDescriptor as the blocking databases.
+    '''
+    db_connection : AsyncDBConnection
+    sql_driver : SQLDriver
+    model_descriptor = StandardModelDescriptor()
+
+    multi_row_insert = False
+    max_query_params = 999
+    schema_cache_ttl = 60.0
+    # catalog query returning the rows read by _schema_from_rows
+    schema_query : str
+
+    def __init__(self, db_connection : AsyncDBConnection, model_descriptor = StandardModelDescriptor(), sql_driver = StandardSQLDriver(), type_mapper = TypeMapper()):
+        self.db_connection = db_connection
+        self.model_descriptor = model_descriptor
+        self.sql_driver = sql_driver
+        self.type_mapper = type_mapper
+        self.schema_cache = SchemaCache(self.schema_cache_ttl)
+        self._depth = ContextVar(f'pydbms_transaction_depth_{id(self)}', default=0)
+
+    @asynccontextmanager
+    async def transaction(self):
+        '''
+        Runs the enclosed operations of the current task in a single transaction, committed
+        when the outermost block exits and rolled back if it raises. Nested blocks use savepoints.
+        '''
+        async with self.db_connection.borrow() as conn:
+            depth = self._depth.get()
+            savepoint = f'pydbms_savepoint_{depth}'
+            if depth == 0:
+                await conn.begin()
+            else:
+                await conn.savepoint(savepoint)
+
+            self._depth.set(depth + 1)
+            try:
+                yield
+            except BaseException:
+                if depth == 0:
+                    await conn.rollback()
+                else:
+                    await conn.rollback_to_savepoint(savepoint)
+                    await conn.release_savepoint(savepoint)
+                raise
+            else:
+                if depth == 0:
+                    await conn.commit()
+                else:
+                    await conn.release_savepoint(savepoint)
+            finally:
+                self._depth.set(depth)
+
+    def in_transaction(self) -> bool:
+        return self._depth.get() > 0
+
+    async def _commit(self, conn : AsyncDBConnection):
+        if not self.in_transaction():
+            await conn.commit()
+
+    async def close(self):
+        await self.db_connection.close()
+
+    @staticmethod
+    def _schema_from_rows(rows) -> Dict[str, List[ColumnInfo]]:
+        raise NotImplementedError()
+
+    async def _schema(self) -> Dict[str, List[ColumnInfo]]:
+        tables = self.schema_cache.get()
+        if tables is None:
+            async with self.db_connection.borrow() as conn:
+                cur = await conn.execute(self.schema_query)
+                tables = self._schema_from_rows(await cur.fetchall())
+            self.schema_cache.set(tables)
+        return tables
+
+    async def get_tables(self) -> List[str]:
+        return list(await self._schema())
+
+    async def get_columns(self, table_name : str) -> List[str]:
+        columns = (await self._schema()).get(table_name)
+        if columns is None:
+            raise KeyError(table_name)
+        return [c.name for c in columns]
+
+    async def get_model_meta(self, table_name : str) -> Model:
+        tables = await self._schema()
+        return self.schema_cache.model_class(table_name, lambda: build_model_class(table_name, tables, self.type_mapper))()
+
+    async def table_exists(self, table_name : str) -> bool:
+        return table_name in await self.get_tables()
+
+    async def model_exists(self, model : Model) -> bool:
+        if isinstance(model, type):
+            model = model()
+        if not await self.table_exists(model.__table_name__):
+            return False
+
+        columns = await self.get_columns(model.__table_name__)
+        if sorted(model.fields) == sorted(columns):
+            return True
+
+        raise ValueError('model fields do not match the database fields')
+
+    async def create_model(self, model : Model):
+        if isinstance(model, type):
+            model = model()
+        if await self.model_exists(model):
+            print(f'model {model.__table_name__} already exists in the database')
+            return
+
+        async with self.db_connection.borrow() as conn:
+            await conn.execute(self.model_descriptor.describe(model))
+            for statement in self.model_descriptor.describe_indexes(model):
+                await conn.execute(statement)
+            await self._commit(conn)
+        self.schema_cache.invalidate()
+
+    async def insert(self, model : Union[Model, List[Model]], batch_size : int = 1000) -> InsertStats:
+        models = model if isinstance(model, list) else [model]
+        if not all([isinstance(m, Model) for m in models]):
+            raise TypeError()
+        if batch_size < 1:
+            raise ValueError('batch_size must be a positive integer')
+
+        start = time.perf_counter()
+        async with self.db_connection.borrow() as conn:
+            for template, fields, rows in AbstractDatabase._insert_batches(models, batch_size):
+                await self._execute_insert_batch(conn, template, fields, rows)
+                await self._commit(conn)
+
+        return InsertStats(len(models), time.perf_counter() - start)
+
+    async def upsert(self, model : Union[Model, List[Model]], batch_size : int = 1000) -> InsertStats:
+        models = AbstractDatabase._upsert_models(model)
+        if batch_size < 1:
+            raise ValueError('batch_size must be a positive integer')
+
+        start = time.perf_counter()
+        async with self.db_connection.borrow() as conn:
+            for template, fields, rows in AbstractDatabase._insert_batches(models, batch_size):
+                await self._execute_insert_batch(conn, template, fields, rows, upsert=True)
+                await self._commit(conn)
+
+        return InsertStats(len(models), time.perf_counter() - start)
+
+    async def _execute_insert_batch(self, conn : AsyncDBConnection, model : Model, fields : List[str], rows : List[list], upsert : bool = False):
+        build = self.sql_driver.build_bulk_upsert if upsert else self.sql_driver.build_bulk_insert
+        if not self.multi_row_insert or len(rows) == 1:
+            await conn.executemany(build(model, fields), rows)
+            return
+
+        rows_per_statement = max(1, self.max_query_params // len(fields))
+        for i in range(0, len(rows), rows_per_statement):
+            chunk = rows[i:i + rows_per_statement]
+            await conn.execute(build(model, fields, len(chunk)), [v for row in chunk for v in row])
+
+    async def delete(self, model_type, override_delete_all = False, **kwargs):
+        if isinstance(model_type, type):
+            model_type = model_type()
+
+        # where=None or an empty Q filters nothing, so they delete everything too
+        if not any(True for _ in filter_fields(kwargs)) and not override_delete_all:
+            print('Warning: deleting all entries in a table must be explicitly overridden')
+            return
+
+        query, params = self.sql_driver.build_delete(model_type, **kwargs)
+        async with self.db_connection.borrow() as conn:
+            await conn.execute(query, params)
+            await self._commit(conn)
+
+    async def update(self, model : Union[Model, List[Model]]) -> int:
+        affected_rows = 0
+        async with self.transaction():
+            async with self.db_connection.borrow() as conn:
+                for template, updatable_fields, rows, _ in AbstractDatabase._update_batches(model):
+                    affected_rows += await self._execute_update_batch(conn, template, updatable_fields, rows)
+        return affected_rows
+
+    async def _execute_update_batch(self, conn : AsyncDBConnection, model : Model, updatable_fields : List[str], rows : List[list]) -> int:
+        query = self.sql_driver.build_bulk_update(model, updatable_fields)
+        if len(rows) == 1:
+            return await (await conn.execute(query, rows[0])).rowcount()
+        return await (await conn.executemany(query, rows)).rowcount()
+
+    async def select(self, model_type : Union[Model, type], rows : str = 'model', fields : List[str] = None, order_by : List[str] = None, limit : int = None, after = None, **kwargs) -> List[Model]:
+        compact = AbstractDatabase._compact_rows(rows)
+        model = model_type() if isinstance(model_type, type) else model_type
+        for key in filter_fields(kwargs):
+            assert key in model.fields
+
+        fields = AbstractDatabase._projection(model, fields)
+        AbstractDatabase._check_paging(model, order_by, limit)
+        query, params = self.sql_driver.build_select(model, fields, order_by=order_by, limit=limit, after=after, **kwargs)
+        async with self.db_connection.borrow() as conn:
+            cur = await conn.execute(query, params)
+            return self._build_rows(model_type, await cur.fields(), await cur.fetchall(), compact)
+
+    async def iter_select(self, model_type : Union[Model, type], chunk_size : int = 1000, rows : str = 'model', fields : List[str] = None, order_by : List[str] = None, limit : int = None, after = None, **kwargs) -> AsyncIterator[Model]:
+        '''
+        Lazily selects models, fetching and building at most chunk_size models at a time. As in
+        `AbstractDatabase.iter_select`, filters on fields named like the keyword arguments go through where=Q(...).
+        '''
+        compact = AbstractDatabase._compact_rows(rows)
+        model = model_type() if isinstance(model_type, type) else model_type
+        for key in filter_fields(kwargs):
+            assert key in model.fields
+
+        fields = AbstractDatabase._projection(model, fields)
+        AbstractDatabase._check_paging(model, order_by, limit)
+        query, params = self.sql_driver.build_select(model, fields, order_by=order_by, limit=limit, after=after, **kwargs)
+        # the connection must not stay published to the consumer's context after the generator is closed
+        async with self.db_connection.borrow(share=False) as conn:
+            cur = await conn.server_cursor()
+            try:
+                await cur.execute(query, params)
+                while True:
+                    chunk = await cur.fetchmany(chunk_size)
+                    if not chunk:
+                        break
+                    for m in self._build_rows(model_type, await cur.fields(), chunk, compact):
+                        yield m
+            finally:
+                await cur.close()
+
+    async def count(self, model_type : Union[Model, type], **kwargs) -> int:
+        model = model_type() if isinstance(model_type, type) else model_type
+        for key in filter_fields(kwargs):
+            assert key in model.fields
+
+        query, params = self.sql_driver.build_count(model, **kwargs)
+        return int((await self._fetch_all(query, params))[0][0])
+
+    async def exists(self, model_type : Union[Model, type], **kwargs) -> bool:
+        model = model_type() if isinstance(model_type, type) else model_type
+        for key in filter_fields(kwargs):
+            assert key in model.fields
+
+        query, params = self.sql_driver.build_exists(model, **kwargs)
+        return len(await self._fetch_all(query, params)) > 0
+
+    async def aggregate(self, model_type : Union[Model, type], group_by : List[str] = None, count = None, sum = None, min = None, max = None, avg = None, **kwargs):
+        '''Computes aggregates in the database, see `AbstractDatabase.aggregate`.'''
+        model = model_type() if isinstance(model_type, type) else model_type
+        for key in filter_fields(kwargs):
+            assert key in model.fields
+
+        group_by, aggregates = AbstractDatabase._aggregate_spec(model, group_by, {'count' : count, 'sum' : sum, 'min' : min, 'max' : max, 'avg' : avg})
+        query, params = self.sql_driver.build_aggregate(model, group_by, aggregates, **kwargs)
+        results = AbstractDatabase._aggregate_results(type(model), group_by, aggregates, await self._fetch_all(query, params))
+        return results if group_by else results[0]
+
+    async def _fetch_all(self, query, params) -> list:
+        async with self.db_connection.borrow() as conn:
+            cur = await conn.execute(query, params)
+            return await cur.fetchall()
+
+    _build_rows = AbstractDatabase._build_rows
+
+
+class AsyncSQLiteDatabase(AsyncAbstractDatabase):
+    '''
+    asyncio access to a local sqlite database. Each pooled connection runs on its own worker
+    thread; pool_size must stay 1 for ':memory:' databases, which are private to a connection.
+    '''
+    schema_query = SQLiteDatabase.schema_query
+    _schema_from_rows = staticmethod(SQLiteDatabase._schema_from_rows)
+
+    def __init__(self, filename, pool_size : int = 1, **kwargs) -> None:
+        pool = AsyncConnectionPool(lambda: AsyncSQLiteConnection.connect(filename, **kwargs), max_size=pool_size)
+        super().__init__(pool, model_descriptor=SQLiteModelDescriptor())
+
+
+class AsyncPostgresDatabase(AsyncAbstractDatabase):
+    '''asyncio access to a postgres database through psycopg 3, with connections drawn from an AsyncConnectionPool.'''
+    multi_row_insert = PostgresDatabase.multi_row_insert
+    max_query_params = PostgresDatabase.max_query_params
+    values_update_threshold = PostgresDatabase.values_update_threshold
+    schema_query = PostgresDatabase.schema_query
+    _schema_from_rows = staticmethod(PostgresDatabase._schema_from_rows)
+
+    def __init__(self, pool_options : dict = None, **kwargs) -> None:
+        '''Connects using the psycopg connection arguments; pool_options are passed to AsyncConnectionPool.'''
+        pool = AsyncConnectionPool(lambda: AsyncPostgresConnection.connect(**kwargs), **(pool_options or {}))
+        super().__init__(pool, model_descriptor=PostgresDBModelDescriptor(), sql_driver=PostgresSQLDriver(), type_mapper=PostgresTypeMapper())
+
+    async def _execute_update_batch(self, conn, model : Model, updatable_fields : List[str], rows : List[list]) -> int:
+        if len(rows) < self.values_update_threshold:
+            return await super()._execute_update_batch(conn, model, updatable_fields, rows)
+
+        affected_rows = 0
+        for query, params in values_update_statements(self, model, updatable_fields, rows):
+            affected_rows += await (await conn.execute(query, params)).rowcount()
+        return affected_rows
@@ -0,0 +1,180 @@
+from collections import OrderedDict
+import threading
+import time
+from pyDBMS.dbtype import Model
+
+class CacheStats():
+    '''Snapshot of a ResultCache's or IdentityMap's counters.'''
+
+    def __init__(self, hits, misses, size, evictions = 0, invalidations = 0) -> None:
+        self.hits = hits
+        self.misses = misses
+        self.size = size
+        self.evictions = evictions
+        self.invalidations = invalidations
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def __repr__(self) -> str:
+        return (f'CacheStats(hits={self.hits}, misses={self.misses}, hit_rate={self.hit_rate:.3f}, size={self.size}, '
+            f'evictions={self.evictions}, invalidations={self.invalidations})')
+
+
+class ResultCache():
+    '''
+    Thread-safe LRU cache of raw query results shared by every database it is enabled on.
+    Entries expire after ttl seconds (None never expires) and are dropped whenever the
+    table they were read from is written through pyDBMS.
+    '''
+
+    def __init__(self, max_entries : int = 1024, ttl : float = 60.0) -> None:
+        if max_entries < 1:
+            raise ValueError('max_entries must be at least 1')
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._keys_by_table = {}
+        self._generations = {}
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    def get(self, key):
+        '''Returns the value cached under key, or None.'''
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl is not None and time.monotonic() - entry[2] >= self.ttl:
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[0]
+
+    def generation(self, table) -> int:
+        '''Returns a counter that changes whenever table is invalidated.'''
+        with self._lock:
+            return self._generations.get(table, 0)
+
+    def put(self, key, table, value, generation : int = None):
+        '''
+        Caches value under key, remembering the (namespace, table) it was read from. When the
+        generation read before running the query is given, results that may have been
+        invalidated by a concurrent write are not cached.
+        '''
+        with self._lock:
+            if generation is not None and generation != self._generations.get(table, 0):
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, table, time.monotonic())
+            self._keys_by_table.setdefault(table, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self._evictions += 1
+
+    def invalidate(self, table):
+        '''Drops every entry read from the given (namespace, table).'''
+        with self._lock:
+            self._generations[table] = self._generations.get(table, 0) + 1
+            keys = self._keys_by_table.pop(table, ())
+            for key in keys:
+                del self._entries[key]
+            self._invalidations += len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_table.clear()
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(self._hits, self._misses, len(self._entries), self._evictions, self._invalidations)
+
+    def _remove(self, key):
+        _, table, _ = self._entries.pop(key)
+        keys = self._keys_by_table.get(table)
+        keys.discard(key)
+        if not keys:
+            del self._keys_by_table[table]
+
+
+# shared by every database that enables the result cache without giving its own
+shared_result_cache = ResultCache()
+
+
+class IdentityMap():
+    '''
+    Maps (table, primary key) to the single model instance loaded for it within a session,
+    so repeated selects of the same row return the same object.
+    '''
+
+    def __init__(self) -> None:
+        self._models = {}
+        self._hits = 0
+        self._misses = 0
+
+    @staticmethod
+    def key(model : Model):
+        '''Returns the identity key of a model, or None if it has no complete primary key.'''
+        primary_keys = model.__primary_keys__
+        if not primary_keys:
+            return None
+        values = tuple([model.get(k) for k in primary_keys])
+        if None in values:
+            return None
+        return (model.__table_name__, values)
+
+    def get(self, table_name : str, primary_key : tuple) -> Model:
+        model = self._models.get((table_name, primary_key))
+        if model is None:
+            self._misses += 1
+        else:
+            self._hits += 1
+        return model
+
+    def merge(self, model : Model) -> Model:
+        '''Returns the instance already mapped to model's identity, registering model if there is none.'''
+        key = self.key(model)
+        if key is None:
+            return model
+        existing = self._models.get(key)
+        if existing is None:
+            self._misses += 1
+            self._models[key] = model
+            return model
+        self._hits += 1
+        return existing
+
+    def add(self, model : Model):
+        '''
+        Maps model to its identity, replacing any instance loaded before. A model missing some of
+        its fields does not hold the whole row, so the identity is dropped from the map instead.
+        '''
+        key = self.key(model)
+        if key is None:
+            return
+        if all([field in model for field in model.fields]):
+            self._models[key] = model
+        else:
+            self._models.pop(key, None)
+
+    def invalidate(self, table_name : str):
+        for key in [k for k in self._models if k[0] == table_name]:
+            del self._models[key]
+
+    def clear(self):
+        self._models.clear()
+
+    def __len__(self) -> int:
+        return len(self._models)
+
+    def stats(self) -> CacheStats:
+        return CacheStats(self._hits, self._misses, len(self._models))
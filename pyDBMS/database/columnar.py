@@ -0,0 +1,41 @@
+from typing import Dict, List
+import numpy as np
+from pyDBMS.dbtype import DBType
+
+# dtypes that can represent a null value (nan / NaT) without falling back to objects
+NULLABLE_KINDS = ('f', 'M')
+
+def column_array(type_object : DBType, values) -> np.ndarray:
+    '''
+    Converts a sequence of column values to a numpy array typed by the field's DBType.
+    Columns containing nulls in integer or boolean fields fall back to object arrays.
+    '''
+    dtype = np.dtype(type_object._numpy_dtype)
+    if dtype.kind != 'O' and dtype.kind not in NULLABLE_KINDS and None in values:
+        dtype = np.dtype(object)
+    return np.array(values, dtype=dtype)
+
+class ColumnArrayBuilder():
+    '''Accumulates fetched row chunks as typed column arrays.'''
+
+    def __init__(self, model_class, fields : List[str]) -> None:
+        self.fields = list(fields)
+        self.types = [model_class._type_mapping[field] for field in self.fields]
+        self._chunks = [[] for _ in self.fields]
+
+    def add_rows(self, rows):
+        if not rows:
+            return
+        for chunks, type_object, values in zip(self._chunks, self.types, zip(*rows)):
+            chunks.append(column_array(type_object, values))
+
+    def build(self) -> Dict[str, np.ndarray]:
+        columns = {}
+        for field, type_object, chunks in zip(self.fields, self.types, self._chunks):
+            if not chunks:
+                columns[field] = np.array([], dtype=type_object._numpy_dtype)
+            elif len(chunks) == 1:
+                columns[field] = chunks[0]
+            else:
+                columns[field] = np.concatenate(chunks)
+        return columns
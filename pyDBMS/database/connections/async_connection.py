@@ -0,0 +1,269 @@
+from abc import ABC, abstractmethod
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+import functools
+from itertools import count
+from typing import Callable
+from pyDBMS.database.connections.db_connection import DBConnection, SQLiteDBConnection
+
+class AsyncDBCursor(ABC):
+    def __init__(self, cursor_impl) -> None:
+        self._cursor_impl = cursor_impl
+
+    @abstractmethod
+    async def execute(self, sql, params = None):
+        pass
+
+    @abstractmethod
+    async def executemany(self, sql, seq_of_params):
+        pass
+
+    @abstractmethod
+    async def fetchall(self):
+        pass
+
+    @abstractmethod
+    async def fetchone(self):
+        pass
+
+    @abstractmethod
+    async def fetchmany(self, n):
+        pass
+
+    @abstractmethod
+    async def rowcount(self):
+        pass
+
+    @abstractmethod
+    async def fields(self):
+        pass
+
+    @abstractmethod
+    async def close(self):
+        pass
+
+class AsyncDBConnection(ABC):
+    '''Awaitable counterpart of DBConnection, used by AsyncAbstractDatabase.'''
+
+    @asynccontextmanager
+    async def borrow(self, share : bool = True):
+        '''
+        Yields the connection to use for a single database operation. A plain connection
+        lends itself; pooled connections check one out and return it afterwards. Unless share
+        is False the connection is also used by operations nested in the same task. Async
+        generators pass share=False, as they may be finalized in another task's context.
+        '''
+        yield self
+
+    async def begin(self):
+        pass
+
+    async def savepoint(self, name):
+        await self.execute(f'SAVEPOINT {name}')
+
+    async def release_savepoint(self, name):
+        await self.execute(f'RELEASE SAVEPOINT {name}')
+
+    async def rollback_to_savepoint(self, name):
+        await self.execute(f'ROLLBACK TO SAVEPOINT {name}')
+
+    async def is_alive(self) -> bool:
+        try:
+            await self.execute('SELECT 1')
+            return True
+        except Exception:
+            return False
+
+    async def server_cursor(self):
+        '''Returns a cursor suitable for streaming large result sets with fetchmany.'''
+        return await self.cursor()
+
+    @abstractmethod
+    async def cursor(self):
+        pass
+
+    @abstractmethod
+    async def commit(self):
+        pass
+
+    @abstractmethod
+    async def rollback(self):
+        pass
+
+    @abstractmethod
+    async def execute(self, sql, params = None):
+        pass
+
+    @abstractmethod
+    async def executemany(self, sql, seq_of_params):
+        pass
+
+    @abstractmethod
+    async def close(self):
+        pass
+
+class ThreadedAsyncCursor(AsyncDBCursor):
+    def __init__(self, connection, cursor_impl) -> None:
+        super().__init__(cursor_impl)
+        self._connection = connection
+
+    async def execute(self, sql, params = None):
+        return ThreadedAsyncCursor(self._connection, await self._connection._run(self._cursor_impl.execute, sql, params))
+
+    async def executemany(self, sql, seq_of_params):
+        return ThreadedAsyncCursor(self._connection, await self._connection._run(self._cursor_impl.executemany, sql, seq_of_params))
+
+    async def fetchall(self):
+        return await self._connection._run(self._cursor_impl.fetchall)
+
+    async def fetchone(self):
+        return await self._connection._run(self._cursor_impl.fetchone)
+
+    async def fetchmany(self, n):
+        return await self._connection._run(self._cursor_impl.fetchmany, n)
+
+    async def rowcount(self):
+        return await self._connection._run(self._cursor_impl.rowcount)
+
+    async def fields(self):
+        return await self._connection._run(self._cursor_impl.fields)
+
+    async def close(self):
+        await self._connection._run(self._cursor_impl.close)
+
+class ThreadedAsyncConnection(AsyncDBConnection):
+    '''
+    Wraps a blocking DBConnection so it can be awaited. The connection is created and used
+    on a single dedicated worker thread, keeping driver calls off the event loop.
+    '''
+
+    def __init__(self, executor : ThreadPoolExecutor, connection : DBConnection) -> None:
+        self._executor = executor
+        self._connection = connection
+
+    @classmethod
+    async def connect(cls, connection_factory : Callable[[], DBConnection]):
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='pydbms')
+        try:
+            connection = await asyncio.get_running_loop().run_in_executor(executor, connection_factory)
+        except BaseException:
+            executor.shutdown(wait=False)
+            raise
+        return cls(executor, connection)
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, functools.partial(fn, *args))
+
+    async def cursor(self):
+        return ThreadedAsyncCursor(self, await self._run(self._connection.cursor))
+
+    async def server_cursor(self):
+        return ThreadedAsyncCursor(self, await self._run(self._connection.server_cursor))
+
+    async def begin(self):
+        await self._run(self._connection.begin)
+
+    async def commit(self):
+        await self._run(self._connection.commit)
+
+    async def rollback(self):
+        await self._run(self._connection.rollback)
+
+    async def savepoint(self, name):
+        await self._run(self._connection.savepoint, name)
+
+    async def release_savepoint(self, name):
+        await self._run(self._connection.release_savepoint, name)
+
+    async def rollback_to_savepoint(self, name):
+        await self._run(self._connection.rollback_to_savepoint, name)
+
+    async def is_alive(self) -> bool:
+        return await self._run(self._connection.is_alive)
+
+    async def execute(self, sql, params = None):
+        return ThreadedAsyncCursor(self, await self._run(self._connection.execute, sql, params))
+
+    async def executemany(self, sql, seq_of_params):
+        return ThreadedAsyncCursor(self, await self._run(self._connection.executemany, sql, seq_of_params))
+
+    async def close(self):
+        try:
+            await self._run(self._connection.close)
+        finally:
+            self._executor.shutdown(wait=False)
+
+class AsyncSQLiteConnection(ThreadedAsyncConnection):
+    '''sqlite3 has no asynchronous interface, so each connection runs on its own worker thread.'''
+
+    @classmethod
+    async def connect(cls, filename, **connection_args):
+        return await super().connect(lambda: SQLiteDBConnection(filename, **connection_args))
+
+
+
+_server_cursor_ids = count()
+
+class AsyncPostgresCursor(AsyncDBCursor):
+    async def execute(self, sql, params = None):
+        await self._cursor_impl.execute(sql, params or None)
+        return self
+
+    async def executemany(self, sql, seq_of_params):
+        await self._cursor_impl.executemany(sql, seq_of_params)
+        return self
+
+    async def fetchall(self):
+        return await self._cursor_impl.fetchall()
+
+    async def fetchone(self):
+        return await self._cursor_impl.fetchone()
+
+    async def fetchmany(self, n):
+        return await self._cursor_impl.fetchmany(n)
+
+    async def rowcount(self):
+        return self._cursor_impl.rowcount
+
+    async def fields(self):
+        return [x[0] for x in self._cursor_impl.description]
+
+    async def close(self):
+        await self._cursor_impl.close()
+
+class AsyncPostgresConnection(AsyncDBConnection):
+    '''Native asynchronous postgres connection backed by psycopg 3.'''
+
+    def __init__(self, connection_impl) -> None:
+        self._connection_impl = connection_impl
+
+    @classmethod
+    async def connect(cls, **connection_args):
+        # imported here so psycopg is only required when it is used
+        import psycopg
+        return cls(await psycopg.AsyncConnection.connect(**connection_args))
+
+    async def cursor(self):
+        return AsyncPostgresCursor(self._connection_impl.cursor())
+
+    async def server_cursor(self):
+        # named cursors are kept on the server and only send rows as they are fetched
+        return AsyncPostgresCursor(self._connection_impl.cursor(name=f'pydbms_cursor_{next(_server_cursor_ids)}'))
+
+    async def commit(self):
+        await self._connection_impl.commit()
+
+    async def rollback(self):
+        await self._connection_impl.rollback()
+
+    async def execute(self, sql, params = None):
+        cur = AsyncPostgresCursor(self._connection_impl.cursor())
+        return await cur.execute(sql, params)
+
+    async def executemany(self, sql, seq_of_params):
+        cur = AsyncPostgresCursor(self._connection_impl.cursor())
+        return await cur.executemany(sql, seq_of_params)
+
+    async def close(self):
+        await self._connection_impl.close()
@@ -0,0 +1,188 @@
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+import time
+from typing import Awaitable, Callable
+from pyDBMS.database.connections.async_connection import AsyncDBConnection
+from pyDBMS.database.connections.connection_pool import PoolStats
+
+class AsyncConnectionPool(AsyncDBConnection):
+    '''
+    Pool of AsyncDBConnections opened on demand by awaiting connection_factory().
+
+    Connections are checked out with `borrow()` for the duration of an operation. Borrowing is
+    reentrant per task, so nested operations in the same task share one connection. When
+    health_check is set each idle connection is verified with `is_alive()` on checkout.
+    '''
+
+    def __init__(self, connection_factory : Callable[[], Awaitable[AsyncDBConnection]], max_size : int = 10,
+            acquire_timeout : float = None, health_check : bool = True) -> None:
+        if max_size < 1:
+            raise ValueError('max_size must be at least 1')
+
+        self.connection_factory = connection_factory
+        self.max_size = max_size
+        self.acquire_timeout = acquire_timeout
+        self.health_check = health_check
+
+        self._condition = None
+        self._held = ContextVar(f'pydbms_pool_{id(self)}', default=None)
+        self._idle = deque()
+        self._size = 0
+        self._in_use = 0
+        self._acquisitions = 0
+        self._total_wait_time = 0.0
+        self._max_wait_time = 0.0
+        self._timeouts = 0
+        self._closed = False
+
+    def _get_condition(self) -> asyncio.Condition:
+        # created on first use so the pool can be constructed outside of a running event loop
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    async def acquire(self, timeout : float = None) -> AsyncDBConnection:
+        '''Checks a connection out of the pool, waiting up to timeout seconds for one to be released.'''
+        timeout = self.acquire_timeout if timeout is None else timeout
+        start = time.perf_counter()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        condition = self._get_condition()
+
+        async with condition:
+            while True:
+                if self._closed:
+                    raise RuntimeError('connection pool is closed')
+                if self._idle:
+                    connection = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    connection = None
+                    self._size += 1
+                    break
+
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    self._timeouts += 1
+                    raise TimeoutError(f'no connection available within {timeout} seconds')
+                try:
+                    await asyncio.wait_for(condition.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+            self._in_use += 1
+
+        try:
+            if connection is not None and self.health_check and not await connection.is_alive():
+                await self._close_quietly(connection)
+                connection = None
+            if connection is None:
+                connection = await self.connection_factory()
+        except BaseException:
+            async with condition:
+                self._size -= 1
+                self._in_use -= 1
+                condition.notify()
+            raise
+
+        wait_time = time.perf_counter() - start
+        self._acquisitions += 1
+        self._total_wait_time += wait_time
+        self._max_wait_time = max(self._max_wait_time, wait_time)
+        return connection
+
+    async def release(self, connection : AsyncDBConnection):
+        '''Returns a connection to the pool, discarding any uncommitted work.'''
+        try:
+            await connection.rollback()
+        except Exception:
+            await self._close_quietly(connection)
+            connection = None
+
+        if connection is not None and self._closed:
+            await self._close_quietly(connection)
+            connection = None
+
+        condition = self._get_condition()
+        async with condition:
+            self._in_use -= 1
+            if connection is None:
+                self._size -= 1
+            else:
+                self._idle.append(connection)
+            condition.notify()
+
+    @asynccontextmanager
+    async def borrow(self, share : bool = True):
+        held = self._held.get()
+        if held is not None:
+            yield held
+            return
+
+        connection = await self.acquire()
+        token = self._held.set(connection) if share else None
+        try:
+            yield connection
+        finally:
+            if token is not None:
+                self._held.reset(token)
+            await self.release(connection)
+
+    def stats(self) -> PoolStats:
+        return PoolStats(self._size, self._in_use, self.max_size, self._acquisitions, self._total_wait_time, self._max_wait_time, self._timeouts)
+
+    async def close(self):
+        '''Closes every idle connection. Connections still checked out are closed when released.'''
+        condition = self._get_condition()
+        async with condition:
+            self._closed = True
+            while self._idle:
+                connection = self._idle.popleft()
+                self._size -= 1
+                await self._close_quietly(connection)
+            condition.notify_all()
+
+    async def cursor(self):
+        return await self._held_connection().cursor()
+
+    async def server_cursor(self):
+        return await self._held_connection().server_cursor()
+
+    async def begin(self):
+        await self._held_connection().begin()
+
+    async def commit(self):
+        await self._held_connection().commit()
+
+    async def rollback(self):
+        await self._held_connection().rollback()
+
+    async def savepoint(self, name):
+        await self._held_connection().savepoint(name)
+
+    async def release_savepoint(self, name):
+        await self._held_connection().release_savepoint(name)
+
+    async def rollback_to_savepoint(self, name):
+        await self._held_connection().rollback_to_savepoint(name)
+
+    async def execute(self, sql, params = None):
+        return await self._held_connection().execute(sql, params)
+
+    async def executemany(self, sql, seq_of_params):
+        return await self._held_connection().executemany(sql, seq_of_params)
+
+    async def is_alive(self) -> bool:
+        return True
+
+    def _held_connection(self) -> AsyncDBConnection:
+        connection = self._held.get()
+        if connection is None:
+            raise RuntimeError('pooled connections must be used inside borrow()')
+        return connection
+
+    async def _close_quietly(self, connection : AsyncDBConnection):
+        try:
+            await connection.close()
+        except Exception:
+            pass
@@ -0,0 +1,236 @@
+from collections import deque
+from contextlib import contextmanager
+import threading
+import time
+from typing import Callable
+from pyDBMS.database.connections.db_connection import DBConnection
+
+class PoolStats():
+    '''Snapshot of a ConnectionPool's usage counters.'''
+
+    def __init__(self, size, in_use, max_size, acquisitions, total_wait_time, max_wait_time, timeouts) -> None:
+        self.size = size
+        self.in_use = in_use
+        self.max_size = max_size
+        self.acquisitions = acquisitions
+        self.total_wait_time = total_wait_time
+        self.max_wait_time = max_wait_time
+        self.timeouts = timeouts
+
+    @property
+    def average_wait_time(self) -> float:
+        return self.total_wait_time / self.acquisitions if self.acquisitions else 0.0
+
+    @property
+    def utilization(self) -> float:
+        '''Fraction of the pool's maximum capacity currently checked out.'''
+        return self.in_use / self.max_size
+
+    def __repr__(self) -> str:
+        return (f'PoolStats(size={self.size}, in_use={self.in_use}, max_size={self.max_size}, acquisitions={self.acquisitions}, '
+            f'average_wait_time={self.average_wait_time:.6f}, max_wait_time={self.max_wait_time:.6f}, timeouts={self.timeouts})')
+
+
+class ConnectionPool(DBConnection):
+    '''
+    Thread-safe pool of DBConnections created on demand by connection_factory.
+
+    Connections are checked out with `borrow()` for the duration of an operation. Borrowing is
+    reentrant per thread, so nested operations on the same thread share one connection.
+    Idle connections above min_size are closed after idle_timeout seconds, and when
+    health_check is set each connection is verified with `is_alive()` on checkout.
+    '''
+
+    def __init__(self, connection_factory : Callable[[], DBConnection], min_size : int = 1, max_size : int = 10,
+            idle_timeout : float = 300.0, acquire_timeout : float = None, health_check : bool = True) -> None:
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError('pool sizes must satisfy 0 <= min_size <= max_size and max_size >= 1')
+
+        self.connection_factory = connection_factory
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.acquire_timeout = acquire_timeout
+        self.health_check = health_check
+
+        self._condition = threading.Condition()
+        self._local = threading.local()
+        self._idle = deque()
+        self._size = 0
+        self._in_use = 0
+        self._acquisitions = 0
+        self._total_wait_time = 0.0
+        self._max_wait_time = 0.0
+        self._timeouts = 0
+        self._closed = False
+
+        for _ in range(min_size):
+            self._idle.append((connection_factory(), time.monotonic()))
+            self._size += 1
+
+    def acquire(self, timeout : float = None) -> DBConnection:
+        '''Checks a connection out of the pool, waiting up to timeout seconds for one to be released.'''
+        timeout = self.acquire_timeout if timeout is None else timeout
+        start = time.perf_counter()
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        with self._condition:
+            while True:
+                if self._closed:
+                    raise RuntimeError('connection pool is closed')
+                self._close_expired()
+                if self._idle:
+                    connection, _ = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    connection = None
+                    self._size += 1
+                    break
+
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    self._timeouts += 1
+                    raise TimeoutError(f'no connection available within {timeout} seconds')
+                self._condition.wait(remaining)
+            self._in_use += 1
+
+        try:
+            if connection is not None and self.health_check and not connection.is_alive():
+                self._close_quietly(connection)
+                connection = None
+            if connection is None:
+                connection = self.connection_factory()
+        except BaseException:
+            with self._condition:
+                self._size -= 1
+                self._in_use -= 1
+                self._condition.notify()
+            raise
+
+        if connection.hooks is not self.hooks:
+            connection._set_hooks(self.hooks)
+
+        wait_time = time.perf_counter() - start
+        with self._condition:
+            self._acquisitions += 1
+            self._total_wait_time += wait_time
+            self._max_wait_time = max(self._max_wait_time, wait_time)
+
+        return connection
+
+    def release(self, connection : DBConnection):
+        '''Returns a connection to the pool, discarding any uncommitted work.'''
+        try:
+            connection.rollback()
+        except Exception:
+            self._close_quietly(connection)
+            connection = None
+
+        if connection is not None and self._closed:
+            self._close_quietly(connection)
+            connection = None
+
+        with self._condition:
+            self._in_use -= 1
+            if connection is None:
+                self._size -= 1
+            else:
+                self._idle.append((connection, time.monotonic()))
+            self._condition.notify()
+
+    @contextmanager
+    def borrow(self, write : bool = False, share : bool = True):
+        if not share:
+            # a connection of its own, which nested operations neither reuse nor release
+            connection = self.acquire()
+            try:
+                yield connection
+            finally:
+                self.release(connection)
+            return
+
+        held = getattr(self._local, 'connection', None)
+        if held is not None:
+            yield held
+            return
+
+        connection = self.acquire()
+        self._local.connection = connection
+        try:
+            yield connection
+        finally:
+            self._local.connection = None
+            self.release(connection)
+
+    def _set_hooks(self, hooks):
+        # hooks are installed on the pooled connections, which run the statements
+        with self._condition:
+            self.hooks = hooks
+            for connection, _ in self._idle:
+                connection._set_hooks(hooks)
+
+    def stats(self) -> PoolStats:
+        with self._condition:
+            return PoolStats(self._size, self._in_use, self.max_size, self._acquisitions, self._total_wait_time, self._max_wait_time, self._timeouts)
+
+    def close(self):
+        '''Closes every idle connection. Connections still checked out are closed when released.'''
+        with self._condition:
+            self._closed = True
+            while self._idle:
+                connection, _ = self._idle.popleft()
+                self._size -= 1
+                self._close_quietly(connection)
+            self._condition.notify_all()
+
+    def cursor(self):
+        return self._held().cursor()
+
+    def server_cursor(self):
+        return self._held().server_cursor()
+
+    def begin(self):
+        self._held().begin()
+
+    def commit(self):
+        self._held().commit()
+
+    def rollback(self):
+        self._held().rollback()
+
+    def savepoint(self, name):
+        self._held().savepoint(name)
+
+    def release_savepoint(self, name):
+        self._held().release_savepoint(name)
+
+    def rollback_to_savepoint(self, name):
+        self._held().rollback_to_savepoint(name)
+
+    def execute(self, sql, params = None):
+        return self._held().execute(sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        return self._held().executemany(sql, seq_of_params)
+
+    def is_alive(self) -> bool:
+        return True
+
+    def _held(self) -> DBConnection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            raise RuntimeError('pooled connections must be used inside borrow()')
+        return connection
+
+    def _close_expired(self):
+        now = time.monotonic()
+        while self._idle and self._size > self.min_size and now - self._idle[0][1] >= self.idle_timeout:
+            connection, _ = self._idle.popleft()
+            self._size -= 1
+            self._close_quietly(connection)
+
+    def _close_quietly(self, connection : DBConnection):
+        try:
+            connection.close()
+        except Exception:
+            pass
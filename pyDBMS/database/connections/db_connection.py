@@ -1,7 +1,9 @@
 from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from itertools import count
 import sqlite3
 from sqlite3.dbapi2 import Connection, Cursor
-import psycopg2
+from pyDBMS.database.instrumentation import QueryHook, instrumented_call
 
 class DBCursor(ABC):
     _cursor_impl : Cursor
@@ -12,6 +14,10 @@ class DBCursor(ABC):
     def execute(self, sql, params = None):
         pass
 
+    @abstractmethod
+    def executemany(self, sql, seq_of_params):
+        pass
+
     @abstractmethod
     def fetchall(self):
         pass
@@ -27,17 +33,146 @@ class DBCursor(ABC):
     @abstractmethod
     def rowcount(self):
         pass
-    pass
+
+    def close(self):
+        self._cursor_impl.close()
+
+class InstrumentedCursor(DBCursor):
+    '''Wraps a DBCursor, reporting its statements and fetched rows to the registered hooks.'''
+
+    def __init__(self, cursor_impl : DBCursor, hooks, sql = None) -> None:
+        super().__init__(cursor_impl)
+        self.hooks = hooks
+        self.sql = sql
+
+    def execute(self, sql, params = None):
+        # the statement is remembered here too, since callers may fetch from this cursor instead of the returned one
+        self.sql = sql
+        result = instrumented_call(self.hooks, sql, params, False, lambda: self._cursor_impl.execute(sql, params))
+        return InstrumentedCursor(result, self.hooks, sql)
+
+    def executemany(self, sql, seq_of_params):
+        self.sql = sql
+        result = instrumented_call(self.hooks, sql, seq_of_params, True, lambda: self._cursor_impl.executemany(sql, seq_of_params))
+        return InstrumentedCursor(result, self.hooks, sql)
+
+    def fetchall(self):
+        rows = self._cursor_impl.fetchall()
+        self._fetched(len(rows))
+        return rows
+
+    def fetchone(self):
+        row = self._cursor_impl.fetchone()
+        if row is not None:
+            self._fetched(1)
+        return row
+
+    def fetchmany(self, n):
+        rows = self._cursor_impl.fetchmany(n)
+        self._fetched(len(rows))
+        return rows
+
+    def rowcount(self):
+        return self._cursor_impl.rowcount()
+
+    def fields(self):
+        return self._cursor_impl.fields()
+
+    def _fetched(self, count):
+        if count:
+            for hook in self.hooks:
+                hook.rows_fetched(self.sql, count)
 
 class DBConnection(ABC):
     _connection_impl : Connection
+    # QueryHooks called around every statement, see add_hook
+    hooks = ()
+
     def __init__(self, **connection_args) -> None:
         super().__init__()
 
+    def add_hook(self, hook : QueryHook):
+        '''Registers a QueryHook called around every statement run on this connection and its cursors.'''
+        self._set_hooks(self.hooks + (hook,))
+
+    def remove_hook(self, hook : QueryHook):
+        self._set_hooks(tuple([h for h in self.hooks if h is not hook]))
+
+    def _set_hooks(self, hooks):
+        self.hooks = hooks
+        # the instrumented methods only shadow the class's while hooks are registered,
+        # so connections without hooks run exactly the uninstrumented code
+        for name in ('execute', 'executemany', 'cursor', 'server_cursor'):
+            if hooks:
+                setattr(self, name, getattr(self, '_instrumented_' + name))
+            else:
+                self.__dict__.pop(name, None)
+
+    def _instrumented_execute(self, sql, params = None):
+        result = instrumented_call(self.hooks, sql, params, False, lambda: type(self).execute(self, sql, params))
+        return InstrumentedCursor(result, self.hooks, sql)
+
+    def _instrumented_executemany(self, sql, seq_of_params):
+        result = instrumented_call(self.hooks, sql, seq_of_params, True, lambda: type(self).executemany(self, sql, seq_of_params))
+        return InstrumentedCursor(result, self.hooks, sql)
+
+    def _instrumented_cursor(self):
+        return InstrumentedCursor(type(self).cursor(self), self.hooks)
+
+    def _instrumented_server_cursor(self):
+        cursor = type(self).server_cursor(self)
+        # the default server_cursor returns an already instrumented cursor()
+        return cursor if isinstance(cursor, InstrumentedCursor) else InstrumentedCursor(cursor, self.hooks)
+
+    @contextmanager
+    def borrow(self, write : bool = False, share : bool = True):
+        '''
+        Yields the connection to use for a single database operation. A plain connection
+        lends itself; pooled connections check one out and return it afterwards.
+        write marks operations that modify the database, for connections that serialize writers.
+        Unless share is False the connection is also used by operations nested on the same thread.
+        Generators pass share=False, as they stay open across yields: pools then lend them a
+        connection of their own, which does not see the uncommitted writes of a transaction.
+        '''
+        yield self
+
+    def begin(self):
+        '''Starts a transaction. DB-API drivers open one implicitly on the first statement.'''
+        pass
+
+    def rollback(self):
+        self._connection_impl.rollback()
+
+    def savepoint(self, name):
+        self.execute(f'SAVEPOINT {name}')
+
+    def release_savepoint(self, name):
+        self.execute(f'RELEASE SAVEPOINT {name}')
+
+    def rollback_to_savepoint(self, name):
+        self.execute(f'ROLLBACK TO SAVEPOINT {name}')
+
+    def close(self):
+        self._connection_impl.close()
+
+    def is_alive(self) -> bool:
+        try:
+            self.execute('SELECT 1')
+            return True
+        except Exception:
+            return False
+
     @abstractmethod
     def cursor(self):
         pass
 
+    def server_cursor(self):
+        '''
+        Returns a cursor suitable for streaming large result sets with fetchmany.
+        Drivers without server-side cursors fall back to a regular cursor.
+        '''
+        return self.cursor()
+
     @abstractmethod
     def commit(self):
         pass
@@ -46,6 +181,10 @@ class DBConnection(ABC):
     def execute(self, sql, params):
         pass
 
+    @abstractmethod
+    def executemany(self, sql, seq_of_params):
+        pass
+
 class SQLiteDBCursor(DBCursor):
     def execute(self, sql, params = None):
         if params:
@@ -53,6 +192,9 @@ class SQLiteDBCursor(DBCursor):
         else:
             return SQLiteDBCursor(self._cursor_impl.execute(sql))
 
+    def executemany(self, sql, seq_of_params):
+        return SQLiteDBCursor(self._cursor_impl.executemany(sql, seq_of_params))
+
     def fetchall(self):
         return self._cursor_impl.fetchall()
 
@@ -76,6 +218,11 @@ class SQLiteDBConnection(DBConnection):
     def cursor(self):
         return SQLiteDBCursor(self._connection_impl.cursor())
 
+    def begin(self):
+        # sqlite3 only opens transactions implicitly before DML, so savepoints could otherwise commit early
+        if not self._connection_impl.in_transaction:
+            self._connection_impl.execute('BEGIN')
+
     def commit(self):
         self._connection_impl.commit()
 
@@ -85,10 +232,10 @@ class SQLiteDBConnection(DBConnection):
         else:
             return SQLiteDBCursor(self._connection_impl.execute(sql))
 
-from crate.client import connect, connection
+    def executemany(self, sql, seq_of_params):
+        return SQLiteDBCursor(self._connection_impl.executemany(sql, seq_of_params))
 
 class CrateDBCursor(DBCursor):
-    _connection_impl : connection.Connection
     def execute(self, sql, params = None):
         if params:
             self._cursor_impl.execute(sql, params)
@@ -96,6 +243,10 @@ class CrateDBCursor(DBCursor):
             self._cursor_impl.execute(sql)
         return self
 
+    def executemany(self, sql, seq_of_params):
+        self._cursor_impl.executemany(sql, seq_of_params)
+        return self
+
     def fetchall(self):
         return self._cursor_impl.fetchall()
 
@@ -112,10 +263,10 @@ class CrateDBCursor(DBCursor):
         return [x[0] for x in self._cursor_impl.description]
 
 class CrateDBConnection(DBConnection):
-    _connection_impl : connection.Connection
-
     def __init__(self, servers, **connection_args) -> None:
         super().__init__(**connection_args)
+        # imported here so the crate client is only required when it is used
+        from crate.client import connect
         self._connection_impl = connect(servers, **connection_args)
 
     def cursor(self):
@@ -124,6 +275,19 @@ class CrateDBConnection(DBConnection):
     def commit(self):
         self._connection_impl.commit()
 
+    def rollback(self):
+        # crate has no transactions, statements take effect immediately
+        pass
+
+    def savepoint(self, name):
+        pass
+
+    def release_savepoint(self, name):
+        pass
+
+    def rollback_to_savepoint(self, name):
+        pass
+
     def execute(self, sql, params = None):
         cur = self._connection_impl.cursor()
         if params:
@@ -132,10 +296,17 @@ class CrateDBConnection(DBConnection):
             cur.execute(sql)
         return CrateDBCursor(cur)
 
+    def executemany(self, sql, seq_of_params):
+        cur = self._connection_impl.cursor()
+        cur.executemany(sql, seq_of_params)
+        return CrateDBCursor(cur)
 
 
 
 
+
+_server_cursor_ids = count()
+
 class PostgresCursor(DBCursor):
 
     def execute(self, sql, params = None):
@@ -145,6 +316,10 @@ class PostgresCursor(DBCursor):
             self._cursor_impl.execute(sql)
         return self
 
+    def executemany(self, sql, seq_of_params):
+        self._cursor_impl.executemany(sql, seq_of_params)
+        return self
+
     def fetchall(self):
         return self._cursor_impl.fetchall()
 
@@ -165,11 +340,17 @@ class PostgresConnection(DBConnection):
 
     def __init__(self, **connection_args) -> None:
         super().__init__(**connection_args)
+        # imported here so psycopg2 is only required when it is used
+        import psycopg2
         self._connection_impl = psycopg2.connect(**connection_args)
 
     def cursor(self):
         return PostgresCursor(self._connection_impl.cursor())
 
+    def server_cursor(self):
+        # named cursors are kept on the server and only send rows as they are fetched
+        return PostgresCursor(self._connection_impl.cursor(name=f'pydbms_cursor_{next(_server_cursor_ids)}'))
+
     def commit(self):
         self._connection_impl.commit()
 
@@ -179,4 +360,27 @@ class PostgresConnection(DBConnection):
             cur.execute(sql, params)
         else:
             cur.execute(sql)
-        return PostgresCursor(cur)
\ No newline at end of file
+        return PostgresCursor(cur)
+
+    def executemany(self, sql, seq_of_params):
+        cur = self._connection_impl.cursor()
+        cur.executemany(sql, seq_of_params)
+        return PostgresCursor(cur)
+
+    def copy_expert(self, sql, file, size = 8192) -> int:
+        '''Runs a COPY statement reading from or writing to file, returning the number of rows copied.'''
+        cur = self._connection_impl.cursor()
+        try:
+            cur.copy_expert(sql, file, size)
+            return cur.rowcount
+        finally:
+            cur.close()
+
+    def mogrify(self, sql, params = None) -> str:
+        '''Returns sql with params bound client side, for statements such as COPY that cannot take parameters.'''
+        cur = self._connection_impl.cursor()
+        try:
+            query = cur.mogrify(sql, params or None)
+            return query.decode() if isinstance(query, bytes) else query
+        finally:
+            cur.close()
@@ -0,0 +1,163 @@
+from collections import deque
+from contextlib import contextmanager
+import threading
+import time
+import weakref
+from pyDBMS.database.connections.db_connection import DBConnection, SQLiteDBConnection
+
+class SQLiteConnectionPool(DBConnection):
+    '''
+    Thread-safe access to a sqlite database file. Every thread reads through a connection of its own,
+    so readers run concurrently under WAL journaling, while writes go through a single writer
+    connection handed to `borrow(write=True)` callers one at a time, in the order they asked for it.
+    Operations nested inside a write on the same thread share the writer connection, except
+    unshared borrows, which always read on the thread's reader so they never outlive a write.
+
+    The pragmas are applied to every connection when it is opened; None leaves the sqlite default.
+    cache_size is in pages, or in KiB when negative, mmap_size in bytes and busy_timeout in ms.
+    '''
+
+    def __init__(self, filename, journal_mode : str = 'wal', synchronous : str = 'normal', cache_size : int = -64000,
+            mmap_size : int = 268435456, busy_timeout : int = 5000, write_timeout : float = None, **connection_args) -> None:
+        if filename == ':memory:' or str(filename).startswith('file::memory:'):
+            raise ValueError('in-memory sqlite databases are private to one connection and cannot be shared between threads')
+
+        self.filename = filename
+        self.write_timeout = write_timeout
+        self.pragmas = {name : value for name, value in [('busy_timeout', busy_timeout), ('synchronous', synchronous),
+            ('cache_size', cache_size), ('mmap_size', mmap_size)] if value is not None}
+        # connections are closed by close() from whichever thread calls it
+        self._connection_args = dict(connection_args, check_same_thread=False)
+        self._local = threading.local()
+        self._connections = weakref.WeakSet()
+        self._condition = threading.Condition()
+        self._write_queue = deque()
+        self._writing = False
+
+        # the journal mode is stored in the database file, so setting it once on the writer covers every connection
+        self._writer = self._open()
+        if journal_mode is not None:
+            self._writer.execute(f'PRAGMA journal_mode = {journal_mode}')
+
+    def _open(self) -> SQLiteDBConnection:
+        connection = SQLiteDBConnection(self.filename, **self._connection_args)
+        for name, value in self.pragmas.items():
+            connection.execute(f'PRAGMA {name} = {value}')
+        if self.hooks:
+            connection._set_hooks(self.hooks)
+        self._connections.add(connection)
+        return connection
+
+    def _reader(self) -> SQLiteDBConnection:
+        reader = getattr(self._local, 'reader', None)
+        if reader is None:
+            # dropped with the thread's local storage when the thread exits
+            reader = self._local.reader = self._open()
+        return reader
+
+    @contextmanager
+    def borrow(self, write : bool = False, share : bool = True):
+        if not share:
+            if write:
+                raise ValueError('writes must be borrowed shared, so nested operations use the writer')
+            yield self._reader()
+            return
+
+        local = self._local
+        previous = getattr(local, 'connection', None)
+        if previous is self._writer or (previous is not None and not write):
+            yield previous
+            return
+
+        if not write:
+            local.connection = self._reader()
+            try:
+                yield local.connection
+            finally:
+                local.connection = previous
+            return
+
+        self._acquire_writer()
+        local.connection = self._writer
+        try:
+            yield self._writer
+        finally:
+            local.connection = previous
+            self._release_writer()
+
+    def _acquire_writer(self):
+        deadline = None if self.write_timeout is None else time.monotonic() + self.write_timeout
+        with self._condition:
+            token = object()
+            self._write_queue.append(token)
+            try:
+                while self._writing or self._write_queue[0] is not token:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        raise TimeoutError(f'the sqlite writer was not available within {self.write_timeout} seconds')
+                    self._condition.wait(remaining)
+            except BaseException:
+                self._write_queue.remove(token)
+                self._condition.notify_all()
+                raise
+            self._write_queue.popleft()
+            self._writing = True
+
+    def _release_writer(self):
+        try:
+            # discard anything left uncommitted, as the next writer must not commit it
+            self._writer.rollback()
+        finally:
+            with self._condition:
+                self._writing = False
+                self._condition.notify_all()
+
+    def _set_hooks(self, hooks):
+        self.hooks = hooks
+        for connection in list(self._connections):
+            connection._set_hooks(hooks)
+
+    def close(self):
+        for connection in list(self._connections):
+            try:
+                connection.close()
+            except Exception:
+                pass
+
+    def cursor(self):
+        return self._held().cursor()
+
+    def server_cursor(self):
+        return self._held().server_cursor()
+
+    def begin(self):
+        self._held().begin()
+
+    def commit(self):
+        self._held().commit()
+
+    def rollback(self):
+        self._held().rollback()
+
+    def savepoint(self, name):
+        self._held().savepoint(name)
+
+    def release_savepoint(self, name):
+        self._held().release_savepoint(name)
+
+    def rollback_to_savepoint(self, name):
+        self._held().rollback_to_savepoint(name)
+
+    def execute(self, sql, params = None):
+        return self._held().execute(sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        return self._held().executemany(sql, seq_of_params)
+
+    def is_alive(self) -> bool:
+        return True
+
+    def _held(self) -> DBConnection:
+        # outside borrow() statements run on the thread's reader connection
+        connection = getattr(self._local, 'connection', None)
+        return connection if connection is not None else self._reader()
@@ -1,24 +1,50 @@
 from pyDBMS.database.abstract_database import AbstractDatabase
 from pyDBMS.database.connections.db_connection import CrateDBConnection
+from pyDBMS.database.connections.connection_pool import ConnectionPool
 from typing import List, Union
 from pyDBMS.database.model_descriptor import CrateDBModelDescriptor
-from pyDBMS.dbtype import Model
+from pyDBMS.database.query_builder import CrateSQLDriver
+from pyDBMS.database.schema_cache import ColumnInfo
+from pyDBMS.database.type_mapper import CrateTypeMapper
+from pyDBMS.dbtype import DBType, Model
 
 class CrateDatabase(AbstractDatabase):
-    def __init__(self, servers, **connection_args):
-        super().__init__(db_connection=CrateDBConnection(servers,**connection_args), model_descriptor=CrateDBModelDescriptor())
+    def __init__(self, servers, pool_options : dict = None, **connection_args):
+        '''
+        Connects to the crate servers. When pool_options is given (e.g. {'max_size' : 10})
+        connections are drawn from a ConnectionPool instead of a single shared connection.
+        '''
+        if pool_options is None:
+            connection = CrateDBConnection(servers, **connection_args)
+        else:
+            connection = ConnectionPool(lambda: CrateDBConnection(servers, **connection_args), **pool_options)
+        super().__init__(db_connection=connection, model_descriptor=CrateDBModelDescriptor(), sql_driver=CrateSQLDriver(), type_mapper=CrateTypeMapper())
+        self.cache_namespace = ('crate', repr(servers))
 
     def get_tables(self) -> List[str]:
-        cur = self.db_connection.cursor()
-        cur.execute('SHOW TABLES')
-        return [x[0] for x in cur.fetchall()]
+        return self._cached_tables()
 
     def get_columns(self, table_name : str) -> List[str]:
-        if table_name not in self.get_tables():
-            raise KeyError()
-        cur = self.db_connection.cursor()
-        cur.execute(f'SHOW COLUMNS FROM {table_name}')
-        return [x[0] for x in cur.fetchall()]
+        return self._cached_columns(table_name)
+
+    def get_model_meta(self, table_name : str) -> DBType:
+        return self._cached_model_meta(table_name)
+
+    def _load_schema(self):
+        with self.db_connection.borrow() as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT table_name FROM information_schema.tables WHERE table_schema = 'doc' AND table_type = 'BASE TABLE'")
+            tables = {x[0] : [] for x in cur.fetchall()}
+            cur.execute("SELECT table_name, column_name FROM information_schema.key_column_usage WHERE table_schema = 'doc'")
+            primary_keys = {(x[0], x[1]) for x in cur.fetchall()}
+            cur.execute("""SELECT table_name, column_name, data_type, is_nullable FROM information_schema.columns
+            WHERE table_schema = 'doc' ORDER BY table_name, ordinal_position""")
+            rows = cur.fetchall()
+
+        for table_name, col_name, type_string, nullable in rows:
+            if table_name in tables:
+                tables[table_name].append(ColumnInfo(col_name, type_string, nullable, (table_name, col_name) in primary_keys))
+        return tables
 
     def table_exists(self, table_name : str) -> bool:
         return super().table_exists(table_name)
@@ -29,8 +55,8 @@ class CrateDatabase(AbstractDatabase):
     def create_model(self, model : Model):
         return super().create_model(model)
 
-    def insert(self, model : Union[Model, List[Model]]):
-        return super().insert(model)
+    def insert(self, model : Union[Model, List[Model]], batch_size : int = 1000):
+        return super().insert(model, batch_size)
 
     def delete(self, model_type, override_delete_all = False, **kwargs):
         return super().delete(model_type,override_delete_all, **kwargs)    
@@ -0,0 +1,73 @@
+from typing import Iterator
+
+# lookups that may follow a field name in a filter, e.g. timestamp__gte=...
+LOOKUPS = ('exact', 'in', 'ne', 'lt', 'lte', 'gt', 'gte', 'like', 'isnull')
+COMPARISONS = {'lt' : '<', 'lte' : '<=', 'gt' : '>', 'gte' : '>=', 'like' : 'LIKE'}
+
+# filter keyword taking a Q expression, e.g. select(Model, where=Q(a=1) | Q(b=2))
+WHERE = 'where'
+
+def split_lookup(key : str):
+    '''Splits a filter keyword into (field, lookup), defaulting to an exact match.'''
+    field, separator, lookup = key.rpartition('__')
+    if separator and lookup in LOOKUPS:
+        return field, lookup
+    return key, 'exact'
+
+class Q():
+    '''
+    Filter expression built from the same field lookups as keyword filters. Expressions are
+    combined with & (AND), | (OR) and negated with ~. The lookups of a single Q are ANDed.
+    '''
+    AND = 'AND'
+    OR = 'OR'
+
+    def __init__(self, *children, **lookups) -> None:
+        for child in children:
+            if not isinstance(child, Q):
+                raise TypeError(f'{child!r} is not a Q expression')
+        self.children = list(children) + sorted(lookups.items())
+        self.connector = Q.AND
+        self.negated = False
+
+    def _combine(self, other, connector : str) -> 'Q':
+        if not isinstance(other, Q):
+            return NotImplemented
+        q = Q(self, other)
+        q.connector = connector
+        return q
+
+    def __and__(self, other) -> 'Q':
+        return self._combine(other, Q.AND)
+
+    def __or__(self, other) -> 'Q':
+        return self._combine(other, Q.OR)
+
+    def __invert__(self) -> 'Q':
+        q = Q()
+        q.children = list(self.children)
+        q.connector = self.connector
+        q.negated = not self.negated
+        return q
+
+    def __repr__(self) -> str:
+        inner = f' {self.connector} '.join([repr(c) if isinstance(c, Q) else f'{c[0]}={c[1]!r}' for c in self.children])
+        return f'{"~" if self.negated else ""}Q({inner})'
+
+def filter_fields(filters : dict) -> Iterator[str]:
+    '''Yields the name of every field referenced by keyword filters, including those inside a where expression.'''
+    for key, value in filters.items():
+        if key == WHERE:
+            if value is not None:
+                yield from _q_fields(value)
+        else:
+            yield split_lookup(key)[0]
+
+def _q_fields(q : Q) -> Iterator[str]:
+    if not isinstance(q, Q):
+        raise TypeError(f'{WHERE} must be a Q expression, not {type(q).__name__}')
+    for child in q.children:
+        if isinstance(child, Q):
+            yield from _q_fields(child)
+        else:
+            yield split_lookup(child[0])[0]
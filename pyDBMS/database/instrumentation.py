@@ -0,0 +1,151 @@
+from bisect import bisect_left
+from collections import deque
+import re
+import threading
+import time
+from typing import Callable, Dict, List
+
+class QueryEvent():
+    '''Describes a single statement run through an instrumented connection or cursor.'''
+
+    def __init__(self, sql : str, params, rowcount : int, seconds : float, many : bool = False, error : BaseException = None) -> None:
+        self.sql = sql
+        self.params = params
+        self.rowcount = rowcount
+        self.seconds = seconds
+        self.many = many
+        self.error = error
+
+    def __repr__(self) -> str:
+        return f'QueryEvent({self.sql!r}, rowcount={self.rowcount}, seconds={self.seconds:.6f}, many={self.many}, error={self.error!r})'
+
+
+class QueryHook():
+    '''
+    Base class for instrumentation registered with `add_hook` on a DBConnection or database.
+    Hooks are called synchronously on the thread running the statement.
+    '''
+
+    def before_execute(self, sql : str, params):
+        pass
+
+    def after_execute(self, event : QueryEvent):
+        pass
+
+    def rows_fetched(self, sql : str, count : int):
+        pass
+
+
+def instrumented_call(hooks, sql : str, params, many : bool, call : Callable):
+    '''Runs call(), reporting it to every hook before and after, and returns its result.'''
+    for hook in hooks:
+        hook.before_execute(sql, params)
+
+    start = time.perf_counter()
+    try:
+        result = call()
+    except BaseException as e:
+        event = QueryEvent(sql, params, -1, time.perf_counter() - start, many, e)
+        for hook in hooks:
+            hook.after_execute(event)
+        raise
+
+    event = QueryEvent(sql, params, result.rowcount(), time.perf_counter() - start, many)
+    for hook in hooks:
+        hook.after_execute(event)
+    return result
+
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LISTS = re.compile(r'\?(?:\s*,\s*\?)+')
+_ROW_LISTS = re.compile(r'\(\?(?:, \.\.\.)?\)(?:\s*,\s*\(\?(?:, \.\.\.)?\))+')
+
+def statement_shape(sql : str) -> str:
+    '''
+    Normalizes a statement so statements differing only in literal values, the length of
+    IN lists or the number of VALUES rows share one shape.
+    '''
+    shape = _LITERALS.sub('?', sql.replace('%s', '?'))
+    shape = _PLACEHOLDER_LISTS.sub('?, ...', shape)
+    return _ROW_LISTS.sub('(?, ...), ...', shape)
+
+
+class SlowQueryLog(QueryHook):
+    '''Keeps the most recent max_entries statements that took at least threshold seconds.'''
+
+    def __init__(self, threshold : float = 0.1, max_entries : int = 1000) -> None:
+        self.threshold = threshold
+        self.entries = deque(maxlen=max_entries)
+
+    def after_execute(self, event : QueryEvent):
+        if event.seconds >= self.threshold:
+            self.entries.append(event)
+
+
+class LatencyHistogram(QueryHook):
+    '''
+    Counts statement latencies per statement shape in buckets bounded by the given upper
+    limits in seconds. Latencies above the last bound fall into an overflow bucket.
+    '''
+
+    def __init__(self, buckets : List[float] = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)) -> None:
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._counts = {}
+        self._totals = {}
+
+    def after_execute(self, event : QueryEvent):
+        shape = statement_shape(event.sql)
+        with self._lock:
+            counts = self._counts.get(shape)
+            if counts is None:
+                counts = self._counts[shape] = [0] * (len(self.buckets) + 1)
+                self._totals[shape] = 0.0
+            counts[bisect_left(self.buckets, event.seconds)] += 1
+            self._totals[shape] += event.seconds
+
+    def shapes(self) -> List[str]:
+        with self._lock:
+            return list(self._counts)
+
+    def counts(self, shape : str) -> List[int]:
+        with self._lock:
+            return list(self._counts.get(shape, [0] * (len(self.buckets) + 1)))
+
+    def percentile(self, shape : str, q : float) -> float:
+        '''Upper bound of the bucket holding the q-th percentile (0-100), or inf if it overflowed.'''
+        counts = self.counts(shape)
+        target = sum(counts) * q / 100
+        seen = 0
+        for bound, count in zip(self.buckets + (float('inf'),), counts):
+            seen += count
+            if count and seen >= target:
+                return bound
+        return 0.0
+
+    def summary(self) -> Dict[str, dict]:
+        with self._lock:
+            return {shape : {'count' : sum(counts), 'total_seconds' : self._totals[shape],
+                'mean_seconds' : self._totals[shape] / sum(counts), 'buckets' : list(counts)} for shape, counts in self._counts.items()}
+
+
+class RowCounter(QueryHook):
+    '''Counts rows fetched from cursors and rows affected by statements, overall and per statement shape.'''
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.rows_fetched_total = 0
+        self.rows_affected_total = 0
+        self.fetched_by_shape = {}
+
+    def after_execute(self, event : QueryEvent):
+        # some drivers report the number of selected rows as the rowcount
+        if event.rowcount > 0 and not event.sql.lstrip()[:6].upper() == 'SELECT':
+            with self._lock:
+                self.rows_affected_total += event.rowcount
+
+    def rows_fetched(self, sql : str, count : int):
+        shape = statement_shape(sql) if sql is not None else None
+        with self._lock:
+            self.rows_fetched_total += count
+            self.fetched_by_shape[shape] = self.fetched_by_shape.get(shape, 0) + count
@@ -1,5 +1,6 @@
 from abc import ABC
-from pyDBMS.dbtype import Boolean, CharN, DBType, Date, DateTime, Float, Integer, Model, String
+from typing import List
+from pyDBMS.dbtype import Boolean, CharN, DBType, Date, DateTime, Float, Index, Integer, Model, String
 DEFAULT = object()
 class StandardModelDescriptor(ABC):
     '''Responsible for describing the models meta information'''
@@ -31,9 +32,7 @@ class StandardModelDescriptor(ABC):
                 raise NotImplementedError()
             c = field + ' '
             type_object = model._type_mapping[field]
-            type_str = str(type_object) if self.supported_types[type(type_object)] == DEFAULT else self.supported_types[type(type_object)]
-            
-            c += type_str
+            c += self.column_type(type_object)
             if not type_object.is_nullable:
                 c += ' NOT NULL'
             columns.append(c)
@@ -44,6 +43,23 @@ class StandardModelDescriptor(ABC):
         query = 'CREATE TABLE ' + model.__table_name__ + ' (\n' + inner_str +'\n)'
         return query
 
+    def describe_indexes(self, model : Model) -> List[str]:
+        '''Describes the sql commands creating every declared index of the model. They use IF NOT EXISTS, so indexes that already exist are left as they are.'''
+        return [self.describe_index(model, index) for index in model.__indexes__]
+
+    def describe_index(self, model : Model, index : Index) -> str:
+        query = f'CREATE {"UNIQUE " if index.unique else ""}INDEX IF NOT EXISTS {index.index_name(model.__table_name__)} ON {model.__table_name__} ({",".join(index.fields)})'
+        if index.where:
+            query += f' WHERE {index.where}'
+        return query
+
+    def column_type(self, type_object : DBType) -> str:
+        '''Returns the sql type used for a column of the given DBType.'''
+        if type(type_object) not in self.supported_types:
+            raise NotImplementedError()
+        type_str = self.supported_types[type(type_object)]
+        return str(type_object) if type_str == DEFAULT else type_str
+
     def normalize_types(self, model : Model) -> dict:
         normalized_values = {}
         for k, v in model:
@@ -87,6 +103,10 @@ class CrateDBModelDescriptor(StandardModelDescriptor):
     def _convert_date(self, value):
         pass
 
+    def describe_indexes(self, model : Model) -> List[str]:
+        # crate indexes every column by default and has no CREATE INDEX
+        return []
+
 
 class PostgresDBModelDescriptor(StandardModelDescriptor):
     supported_types = {
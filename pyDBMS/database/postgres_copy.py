@@ -0,0 +1,195 @@
+from datetime import date, datetime
+import queue
+import re
+import threading
+from typing import Callable, Iterable, Iterator, List
+from pyDBMS.database.model_descriptor import PostgresDBModelDescriptor, StandardModelDescriptor
+from pyDBMS.dbtype import Model
+
+# COPY text format: tab separated columns, one row per line and \N for null
+NULL = '\\N'
+_ESCAPES = str.maketrans({'\\' : '\\\\', '\t' : '\\t', '\n' : '\\n', '\r' : '\\r'})
+_UNESCAPES = {'b' : '\b', 'f' : '\f', 'n' : '\n', 'r' : '\r', 't' : '\t', 'v' : '\v'}
+_ESCAPE_SEQUENCE = re.compile(r'\\(.)')
+
+def _encode_text(value):
+    return str(value).translate(_ESCAPES)
+
+def _encode_bool(value):
+    return 't' if value else 'f'
+
+def _encode_timestamp(value):
+    return value.isoformat(sep=' ')
+
+def _decode_text(value):
+    if '\\' not in value:
+        return value
+    return _ESCAPE_SEQUENCE.sub(lambda m: _UNESCAPES.get(m.group(1), m.group(1)), value)
+
+def _decode_bool(value):
+    return value == 't'
+
+def _decode_timestamp(value):
+    # postgres trims trailing zeros from fractional seconds
+    if '.' in value:
+        head, fraction = value.split('.')
+        value = f'{head}.{fraction:0<6}'
+    return datetime.fromisoformat(value)
+
+# keyed by the column type PostgresDBModelDescriptor gives each DBType, without any length
+ENCODERS = {
+    'INTEGER' : str,
+    'FLOAT' : repr,
+    'BOOLEAN' : _encode_bool,
+    'TEXT' : _encode_text,
+    'CHARACTER' : _encode_text,
+    'DATE' : date.isoformat,
+    'TIMESTAMP' : _encode_timestamp,
+}
+
+DECODERS = {
+    'INTEGER' : int,
+    'FLOAT' : float,
+    'BOOLEAN' : _decode_bool,
+    'TEXT' : _decode_text,
+    'CHARACTER' : _decode_text,
+    'DATE' : date.fromisoformat,
+    'TIMESTAMP' : _decode_timestamp,
+}
+
+class CopyFormat():
+    '''Encodes and decodes rows of a model's fields in the COPY text format.'''
+
+    def __init__(self, model_class, fields : List[str] = None, model_descriptor : StandardModelDescriptor = PostgresDBModelDescriptor()) -> None:
+        self.model_class = model_class
+        self.fields = list(model_class.fields if fields is None else fields)
+        column_types = [model_descriptor.column_type(model_class._type_mapping[f]).split('(')[0] for f in self.fields]
+        for column_type in column_types:
+            if column_type not in ENCODERS:
+                raise NotImplementedError(f'COPY does not support columns of type {column_type}')
+        self._types = [model_class._type_mapping[f] for f in self.fields]
+        self._encoders = [ENCODERS[t] for t in column_types]
+        self._decoders = [DECODERS[t] for t in column_types]
+
+    def copy_from_query(self) -> str:
+        return f'COPY {self.model_class.__table_name__} ({",".join(self.fields)}) FROM STDIN'
+
+    def copy_to_query(self, select_query : str) -> str:
+        return f'COPY ({select_query}) TO STDOUT'
+
+    def encode(self, row) -> str:
+        '''
+        Encodes a model, or a sequence of values ordered like fields, as one line. Values of a
+        sequence are converted by their field's DBType first, as model fields are on assignment.
+        '''
+        if isinstance(row, dict):
+            values = [row.get(f) for f in self.fields]
+        else:
+            if len(row) != len(self.fields):
+                raise ValueError(f'expected {len(self.fields)} values ordered like {self.fields}, got {len(row)}')
+            values = [None if v is None else t._coerce(v) for t, v in zip(self._types, row)]
+        return '\t'.join([NULL if v is None else encode(v) for encode, v in zip(self._encoders, values)]) + '\n'
+
+    def decode(self, line : str) -> tuple:
+        return tuple([None if v == NULL else decode(v) for decode, v in zip(self._decoders, line.split('\t'))])
+
+class CopyInStream():
+    '''
+    Read-only file object over lazily encoded lines, so `copy_expert` can stream rows
+    to the server without the whole input being built in memory.
+    '''
+
+    def __init__(self, lines : Iterable[str]) -> None:
+        self._lines = iter(lines)
+        self._buffer = ''
+
+    def read(self, size : int = -1) -> str:
+        chunks = [self._buffer]
+        length = len(self._buffer)
+        while size < 0 or length < size:
+            line = next(self._lines, None)
+            if line is None:
+                break
+            chunks.append(line)
+            length += len(line)
+
+        data = ''.join(chunks)
+        if size < 0:
+            self._buffer = ''
+            return data
+        self._buffer = data[size:]
+        return data[:size]
+
+    def readline(self, size : int = -1) -> str:
+        if self._buffer:
+            line, self._buffer = self._buffer, ''
+            return line
+        return next(self._lines, '')
+
+class _CopyOutCancelled(Exception):
+    pass
+
+class _CopyOutWriter():
+    '''File object handed to `copy_expert` that passes each chunk of output to a bounded queue.'''
+
+    def __init__(self, chunks : queue.Queue) -> None:
+        self._chunks = chunks
+        self.cancelled = False
+
+    def write(self, data):
+        if isinstance(data, bytes):
+            data = data.decode()
+        while True:
+            if self.cancelled:
+                raise _CopyOutCancelled()
+            try:
+                self._chunks.put(data, timeout=0.1)
+                return len(data)
+            except queue.Full:
+                continue
+
+_DONE = object()
+
+def stream_copy_out(copy_expert : Callable, query : str, max_buffered_chunks : int = 64) -> Iterator[str]:
+    '''
+    Runs `copy_expert(query, file)` on a worker thread and yields the output line by line as it
+    arrives. At most max_buffered_chunks chunks of output are held in memory at once.
+    '''
+    chunks = queue.Queue(max_buffered_chunks)
+    writer = _CopyOutWriter(chunks)
+    errors = []
+
+    def run():
+        try:
+            copy_expert(query, writer)
+        except _CopyOutCancelled:
+            pass
+        except BaseException as e:
+            errors.append(e)
+        finally:
+            while True:
+                try:
+                    chunks.put(_DONE, timeout=0.1)
+                    break
+                except queue.Full:
+                    if writer.cancelled:
+                        break
+
+    worker = threading.Thread(target=run, name='pydbms-copy-out', daemon=True)
+    worker.start()
+    partial = ''
+    try:
+        while True:
+            data = chunks.get()
+            if data is _DONE:
+                break
+            lines = (partial + data).split('\n')
+            partial = lines.pop()
+            yield from lines
+        if errors:
+            raise errors[0]
+        if partial:
+            yield partial
+    finally:
+        writer.cancelled = True
+        worker.join()
@@ -1,31 +1,41 @@
 from pyDBMS.database.connections.db_connection import PostgresConnection
+from pyDBMS.database.connections.connection_pool import ConnectionPool
 from pyDBMS.database.model_descriptor import PostgresDBModelDescriptor, SQLiteModelDescriptor
-from pyDBMS.database.abstract_database import AbstractDatabase
+from pyDBMS.database.abstract_database import AbstractDatabase, InsertStats
+from pyDBMS.database.postgres_copy import CopyFormat, CopyInStream, stream_copy_out
 from pyDBMS.database.query_builder import PostgresSQLDriver
+from pyDBMS.database.schema_cache import ColumnInfo
 from pyDBMS.database.type_mapper import PostgresTypeMapper
+from pyDBMS.database.filters import filter_fields
 from pyDBMS.dbtype import DBType, DynamicModel, Model
-from typing import Union, List
+import itertools
+import time
+from typing import Iterable, Iterator, Union, List
 
 class PostgresDatabase(AbstractDatabase):
     '''Represents the connection to a sqlite database hosted locally.'''
-    
-    def __init__(self, **kwargs) -> None:
-        super().__init__(PostgresConnection(**kwargs),model_descriptor=PostgresDBModelDescriptor(),sql_driver=PostgresSQLDriver(), type_mapper=PostgresTypeMapper())
+    multi_row_insert = True
+    max_query_params = 65535
+    # batches of at least this many rows are updated with UPDATE ... FROM (VALUES ...)
+    values_update_threshold = 500
+
+    def __init__(self, pool_options : dict = None, **kwargs) -> None:
+        '''
+        Connects using the psycopg2 connection arguments. When pool_options is given
+        (e.g. {'min_size' : 2, 'max_size' : 20}) connections are drawn from a ConnectionPool.
+        '''
+        if pool_options is None:
+            connection = PostgresConnection(**kwargs)
+        else:
+            connection = ConnectionPool(lambda: PostgresConnection(**kwargs), **pool_options)
+        super().__init__(connection,model_descriptor=PostgresDBModelDescriptor(),sql_driver=PostgresSQLDriver(), type_mapper=PostgresTypeMapper())
+        self.cache_namespace = ('postgres', repr(sorted(kwargs.items())))
 
     def get_tables(self):
-        cur = self.db_connection.cursor()
-        cur.execute("""SELECT table_name
-        FROM information_schema.tables
-        WHERE table_schema='public'
-        AND table_type='BASE TABLE';""")
-        return [x[0] for x in cur.fetchall()]
+        return self._cached_tables()
 
     def get_columns(self, table_name):
-        if table_name not in self.get_tables():
-            raise KeyError()
-        cur = self.db_connection.cursor()
-        data = cur.execute(f'''SELECT column_name FROM information_schema.columns WHERE table_name = '{table_name}';''')
-        return [x[0] for x in data.fetchall()]
+        return self._cached_columns(table_name)
 
     def table_exists(self, table_name):
         return super().table_exists(table_name)
@@ -34,36 +44,47 @@ class PostgresDatabase(AbstractDatabase):
         return super().model_exists(model)
 
     def get_model_meta(self, table_name: str) -> DBType:
-        q = f'''select column_name, data_type, case when character_maximum_length is not null then character_maximum_length else numeric_precision end as max_length, is_nullable, column_default as default_value from information_schema.columns where table_name = '{table_name}' and table_schema not in ('information_schema', 'pg_catalog') order by table_schema, table_name, ordinal_position;'''
-        cur = self.db_connection.cursor()
-        cur.execute(q)
-        fields = {}
-        for row in cur.fetchall():
-            col_name = row[0]
-            type_string = row[1]
-            charlen = row[2]
-            nullable = row[3] == 'YES'
-            print(col_name)
-            fields[col_name] = self.type_mapper.get_type(type_string)(nullable)
-
-        pk_query = f'''SELECT c.column_name, c.data_type
-FROM information_schema.table_constraints tc 
-JOIN information_schema.constraint_column_usage AS ccu USING (constraint_schema, constraint_name) 
-JOIN information_schema.columns AS c ON c.table_schema = tc.constraint_schema
-  AND tc.table_name = c.table_name AND ccu.column_name = c.column_name
-WHERE constraint_type = 'PRIMARY KEY' and tc.table_name = '{table_name}';
-        '''
-        cur.execute(pk_query)
-        primary_keys = [x[0] for x in cur.fetchall()]
-        return DynamicModel(table_name, fields, primary_keys)
+        return self._cached_model_meta(table_name)
+
+    # pg_catalog is queried directly, the information_schema views are much slower to plan
+    schema_query = '''SELECT c.relname, a.attname, format_type(a.atttypid, NULL), NOT a.attnotnull, COALESCE(a.attnum = ANY(i.indkey), false)
+FROM pg_catalog.pg_class c
+JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+LEFT JOIN pg_catalog.pg_attribute a ON a.attrelid = c.oid AND a.attnum > 0 AND NOT a.attisdropped
+LEFT JOIN pg_catalog.pg_index i ON i.indrelid = c.oid AND i.indisprimary
+WHERE n.nspname = 'public' AND c.relkind IN ('r', 'p')
+ORDER BY c.relname, a.attnum;'''
+
+    index_query = '''SELECT i.relname, x.indisunique, a.attname
+FROM pg_catalog.pg_index x
+JOIN pg_catalog.pg_class t ON t.oid = x.indrelid
+JOIN pg_catalog.pg_class i ON i.oid = x.indexrelid
+JOIN pg_catalog.pg_namespace n ON n.oid = t.relnamespace
+CROSS JOIN LATERAL unnest(x.indkey) WITH ORDINALITY AS k(attnum, position)
+JOIN pg_catalog.pg_attribute a ON a.attrelid = t.oid AND a.attnum = k.attnum
+WHERE n.nspname = 'public' AND t.relname = %s
+ORDER BY i.relname, k.position;'''
+
+    def _load_schema(self):
+        with self.db_connection.borrow() as conn:
+            cur = conn.cursor()
+            cur.execute(self.schema_query)
+            return self._schema_from_rows(cur.fetchall())
+
+    @staticmethod
+    def _schema_from_rows(rows):
+        tables = {}
+        for table_name, col_name, type_string, nullable, primary_key in rows:
+            columns = tables.setdefault(table_name, [])
+            if col_name is not None:
+                columns.append(ColumnInfo(col_name, type_string, nullable, primary_key))
+        return tables
 
     def create_model(self, model):
         return super().create_model(model)
         
-    def insert(self, model : Model):
-        cur = self.db_connection.cursor()
-        cur.execute(f'INSERT INTO {model.__table_name__} ({",".join(model.fields)}) VALUES ({",".join(["%s" for x in model.fields])})',[model.get(field) for field in model.fields])
-        self.db_connection.commit()
+    def insert(self, model : Union[Model, List[Model]], batch_size : int = 1000):
+        return super().insert(model, batch_size)
 
     def delete(self, model_type, override_delete_all=False, **kwargs):
         return super().delete(model_type, override_delete_all=override_delete_all, **kwargs)
@@ -73,3 +94,84 @@ WHERE constraint_type = 'PRIMARY KEY' and tc.table_name = '{table_name}';
 
     def update(self, model: Union[Model, List[Model]]) -> int:
         return super().update(model)
+
+    def copy_in(self, models : Iterable, model_type : Union[Model, type] = None, fields : List[str] = None) -> InsertStats:
+        '''
+        Bulk loads models with COPY, streaming rows to the server as they are encoded. models may be
+        any iterable of models, or of value sequences ordered like fields; model_type defaults to the
+        type of the first model. fields defaults to the model's fields, which are in alphabetical order.
+        '''
+        rows = iter(models)
+        if model_type is None:
+            first = next(rows, None)
+            if first is None:
+                return InsertStats(0, 0.0)
+            if not isinstance(first, Model):
+                raise TypeError('model_type is required when copying rows that are not models')
+            model_type = first
+            rows = itertools.chain([first], rows)
+
+        model_class = model_type if isinstance(model_type, type) else type(model_type)
+        copy_format = CopyFormat(model_class, self._projection(model_class, fields), self.model_descriptor)
+        row_count = 0
+        def lines():
+            nonlocal row_count
+            for row in rows:
+                row_count += 1
+                yield copy_format.encode(row)
+
+        start = time.perf_counter()
+        try:
+            with self.db_connection.borrow(write=True) as conn:
+                conn.copy_expert(copy_format.copy_from_query(), CopyInStream(lines()))
+                self._commit(conn)
+        finally:
+            self._tables_written([copy_format.model_class.__table_name__])
+        return InsertStats(row_count, time.perf_counter() - start)
+
+    def copy_out(self, model_type : Union[Model, type], arrays : bool = False, chunk_size : int = 10000, fields : List[str] = None, **kwargs) -> Iterator:
+        '''
+        Streams matching rows out with COPY, yielding models, or with arrays set a dictionary of
+        column arrays for every chunk_size rows (requires numpy). fields restricts the copied columns.
+        The connection is busy until the generator is exhausted or closed, so it must not be used
+        for other queries meanwhile.
+        '''
+        model = model_type() if isinstance(model_type, type) else model_type
+        for key in filter_fields(kwargs):
+            assert key in model.fields
+
+        model_class = type(model)
+        copy_format = CopyFormat(model_class, self._projection(model, fields), self.model_descriptor)
+        query, params = self.sql_driver.build_select(model, copy_format.fields, **kwargs)
+        with self.db_connection.borrow(share=False) as conn:
+            lines = stream_copy_out(conn.copy_expert, copy_format.copy_to_query(conn.mogrify(query, params)))
+            if not arrays:
+                load = model_class._loader(copy_format.fields)
+                for line in lines:
+                    yield load(copy_format.decode(line))
+                return
+
+            from pyDBMS.database.columnar import ColumnArrayBuilder
+            for chunk in iter(lambda: list(itertools.islice(lines, chunk_size)), []):
+                builder = ColumnArrayBuilder(model_class, copy_format.fields)
+                builder.add_rows([copy_format.decode(line) for line in chunk])
+                yield builder.build()
+
+    def _execute_update_batch(self, conn, model : Model, updatable_fields : List[str], rows : List[list]) -> int:
+        if len(rows) < self.values_update_threshold:
+            return super()._execute_update_batch(conn, model, updatable_fields, rows)
+
+        affected_rows = 0
+        for query, params in values_update_statements(self, model, updatable_fields, rows):
+            affected_rows += conn.execute(query, params).rowcount()
+        return affected_rows
+
+
+def values_update_statements(db, model : Model, updatable_fields : List[str], rows : List[list]):
+    '''Yields (query, params) for UPDATE ... FROM (VALUES ...) statements covering rows, chunked by db.max_query_params.'''
+    columns = list(updatable_fields) + list(model.__primary_keys__)
+    column_types = [db.model_descriptor.column_type(model._type_mapping[x]) for x in columns]
+    rows_per_statement = max(1, db.max_query_params // len(columns))
+    for i in range(0, len(rows), rows_per_statement):
+        chunk = rows[i:i + rows_per_statement]
+        yield db.sql_driver.update_builder.build_values_query(model, updatable_fields, len(chunk), column_types), [v for row in chunk for v in row]
@@ -1,49 +1,147 @@
 from abc import ABC, abstractmethod
+from functools import lru_cache, update_wrapper
+from typing import List, Tuple
+from pyDBMS.database.filters import COMPARISONS, WHERE, Q, split_lookup
+from pyDBMS.dbtype import CompactRow, Model
 
-from numpy import insert
-from pyDBMS.dbtype import Model
+class cached_method():
+    '''
+    Caches a method's results like lru_cache, but with one cache per instance that is dropped
+    together with it. lru_cache on the method itself would be shared by the class and keep every
+    instance it saw alive for the life of the process.
+    '''
+
+    def __init__(self, maxsize : int = 1024) -> None:
+        self.maxsize = maxsize
+
+    def __call__(self, method):
+        self.method = method
+        update_wrapper(self, method)
+        return self
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner = None):
+        if instance is None:
+            return self
+        # stored on the instance, which then finds the cache before this descriptor
+        cached = instance.__dict__[self.name] = lru_cache(maxsize=self.maxsize)(self.method.__get__(instance, owner))
+        return cached
 
 class QueryBuilder(ABC):
+    '''
+    Base class for building parameterized sql statements. Builders return the statement
+    together with its parameter list. Statement text only depends on the shape of the query
+    (table, filtered fields and IN-list sizes), so templates are cached per shape.
+    '''
     param_symbol = '?'
     @abstractmethod
-    def build_query(self, model : Model, **kwargs) -> str:
+    def build_query(self, model : Model, **kwargs) -> Tuple[str, list]:
         pass
 
-    def _build_where_clause(self, kwargs):
-        if len(kwargs) == 0:
+    def _build_where_clause(self, kwargs) -> Tuple[str, list]:
+        shape, params = self._where_shape(kwargs)
+        return self._compile_where(shape), params
+
+    def _where_shape(self, kwargs) -> Tuple[tuple, list]:
+        '''
+        Splits filters into a hashable shape, one entry per keyword filter sorted by keyword and
+        then the where expression, and the list of values to bind in the same order. Shapes only
+        hold operators, field names and value counts, never the values themselves.
+        '''
+        shape = []
+        params = []
+        for key, value in sorted(kwargs.items()):
+            if key != WHERE:
+                shape.append(self._lookup_shape(key, value, params))
+        if kwargs.get(WHERE) is not None:
+            shape.append(self._q_shape(kwargs[WHERE], params))
+        return tuple(shape), params
+
+    def _lookup_shape(self, key : str, value, params : list) -> tuple:
+        field, lookup = split_lookup(key)
+        if lookup == 'isnull':
+            return ('isnull', field, bool(value))
+        if lookup in COMPARISONS:
+            if value is None or isinstance(value, list):
+                raise ValueError(f'{key} takes a single value, not {value!r}')
+            params.append(value)
+            return (lookup, field)
+
+        if lookup == 'in':
+            # strings are iterable but never meant as a list of values
+            if isinstance(value, (str, bytes)) or not hasattr(value, '__iter__'):
+                raise TypeError(f'{key} takes a list of values, not {value!r}')
+            values = list(value)
+        else:
+            values = value if isinstance(value, list) else [value]
+        non_null_values = [v for v in values if v is not None]
+        params.extend(non_null_values)
+        return ('ne' if lookup == 'ne' else 'exact', field, len(non_null_values) != len(values), len(non_null_values))
+
+    def _q_shape(self, q : Q, params : list) -> tuple:
+        if not isinstance(q, Q):
+            raise TypeError(f'{WHERE} must be a Q expression, not {type(q).__name__}')
+        children = tuple([self._q_shape(c, params) if isinstance(c, Q) else self._lookup_shape(c[0], c[1], params) for c in q.children])
+        return (q.connector, q.negated, children)
+
+    @cached_method(maxsize=1024)
+    def _compile_where(self, shape : tuple) -> str:
+        if len(shape) == 0:
             return ''
-        kwargs = self._normalize_fields(**kwargs)
-        
-        field_filter_strs = []
-        for field, value in kwargs.items():
-            field_filter_strs.append(self._process_field(field,value))
-
-        return f' WHERE {" AND ".join(field_filter_strs)}'
-
-    def _normalize_fields(self, **kwargs):
-        fields = {}
-        for k,v in kwargs.items():
-            if not isinstance(v, list):
-                v = [v]
-            fields[k] = v
-        return fields
-
-    def _process_field(self, field, values):
+        return f' WHERE {" AND ".join([self._compile_filter(entry) for entry in shape])}'
+
+    def _compile_filter(self, entry : tuple) -> str:
+        kind = entry[0]
+        if kind == 'exact':
+            return self._process_field(*entry[1:])
+        if kind == 'ne':
+            return self._process_excluded_field(*entry[1:])
+        if kind == 'isnull':
+            return f'{entry[1]} is null' if entry[2] else f'{entry[1]} is not null'
+        if kind in COMPARISONS:
+            return f'{entry[1]} {COMPARISONS[kind]} {self.param_symbol}'
+
+        connector, negated, children = entry
+        if len(children) == 1 and not negated:
+            return self._compile_filter(children[0])
+        if not children:
+            clause = '1 = 1' if connector == Q.AND else '1 = 0'
+        else:
+            clause = f' {connector} '.join([self._compile_filter(c) for c in children])
+        return f'NOT ({clause})' if negated else f'({clause})'
+
+    def _process_field(self, field, has_null, value_count):
         field_filters = []
-        if None in values:
+        if has_null:
             field_filters.append(f'{field} is null')
-            values = [v for v in values if v is not None]
-        
-        normal_values = []
-        for value in values:
-            if isinstance(value, str):
-                normal_values.append("'" + str(value) + "'")
-            else:
-                normal_values.append(str(value))
-        if normal_values:
-            field_filters.append(f'{field} in ({",".join(normal_values)})')
 
-        return " OR ".join(field_filters)
+        if value_count == 1:
+            field_filters.append(f'{field} = {self.param_symbol}')
+        elif value_count > 1:
+            field_filters.append(f'{field} in ({",".join([self.param_symbol] * value_count)})')
+
+        if not field_filters:
+            # an empty IN list matches nothing
+            return '1 = 0'
+        filter_str = " OR ".join(field_filters)
+        return f'({filter_str})' if len(field_filters) > 1 else filter_str
+
+    def _process_excluded_field(self, field, has_null, value_count):
+        field_filters = []
+        if has_null:
+            field_filters.append(f'{field} is not null')
+
+        if value_count == 1:
+            field_filters.append(f'{field} <> {self.param_symbol}')
+        elif value_count > 1:
+            field_filters.append(f'{field} not in ({",".join([self.param_symbol] * value_count)})')
+
+        if not field_filters:
+            return '1 = 1'
+        filter_str = " AND ".join(field_filters)
+        return f'({filter_str})' if len(field_filters) > 1 else filter_str
 
 
 class UpdateQueryBuilder(QueryBuilder):
@@ -52,50 +150,316 @@ class UpdateQueryBuilder(QueryBuilder):
         for x in model.__primary_keys__:
             primary_keys[x] = model[x]
 
-        updatable_fields = set(model.fields) - set(primary_keys)
-        return f'UPDATE {model.__table_name__} SET {",".join([x + f"= {self.param_symbol}" for x in updatable_fields])}{self._build_where_clause(primary_keys)}', updatable_fields
+        updatable_fields = tuple(sorted(set(model.fields) - set(primary_keys)))
+        shape, params = self._where_shape(primary_keys)
+        return self._template(model.__table_name__, updatable_fields, shape), [model.get(x) for x in updatable_fields] + params
+
+    @cached_method(maxsize=1024)
+    def _template(self, table_name, updatable_fields, shape):
+        return f'UPDATE {table_name} SET {",".join([x + f"= {self.param_symbol}" for x in updatable_fields])}{self._compile_where(shape)}'
+
+    def build_bulk_query(self, model : Model, updatable_fields : List[str]) -> str:
+        '''
+        Builds an update statement for executemany. Parameters are the updatable field values
+        followed by the primary key values, in the given order.
+        '''
+        return self._bulk_template(model.__table_name__, tuple(updatable_fields), tuple(model.__primary_keys__))
+
+    @cached_method(maxsize=1024)
+    def _bulk_template(self, table_name, updatable_fields, primary_keys):
+        where = " AND ".join([f'{x} = {self.param_symbol}' for x in primary_keys])
+        return f'UPDATE {table_name} SET {",".join([x + f"= {self.param_symbol}" for x in updatable_fields])} WHERE {where}'
 
 class PostgresUpdateQueryBuilder(UpdateQueryBuilder):
     param_symbol = '%s'
 
+    def build_values_query(self, model : Model, updatable_fields : List[str], row_count : int, column_types : List[str]) -> str:
+        '''
+        Builds an UPDATE ... FROM (VALUES ...) statement that updates row_count rows at once.
+        Parameters follow the same row layout as build_bulk_query, flattened. column_types gives
+        the sql type of every column in that layout and is used to type the VALUES list.
+        '''
+        return self._values_template(model.__table_name__, tuple(updatable_fields), tuple(model.__primary_keys__), row_count, tuple(column_types))
+
+    @cached_method(maxsize=256)
+    def _values_template(self, table_name, updatable_fields, primary_keys, row_count, column_types):
+        columns = updatable_fields + primary_keys
+        # only the first row needs casts, the remaining rows take the same column types
+        first_row = f'({",".join([f"CAST({self.param_symbol} AS {t})" for t in column_types])})'
+        row = f'({",".join([self.param_symbol] * len(columns))})'
+        values = ",".join([first_row] + [row] * (row_count - 1))
+        assignments = ",".join([f'{x} = pydbms_values.{x}' for x in updatable_fields])
+        where = " AND ".join([f'{table_name}.{x} = pydbms_values.{x}' for x in primary_keys])
+        return f'UPDATE {table_name} SET {assignments} FROM (VALUES {values}) AS pydbms_values({",".join(columns)}) WHERE {where}'
+
 class SelectQueryBuilder(QueryBuilder):
-    def build_query(self, model : Model, **query_fields):
-        return f'SELECT {",".join(model.fields)} FROM {model.__table_name__}{self._build_where_clause(query_fields)}'
+    # compare keyset positions as row values, (a, b) > (?, ?), when every column sorts the same way
+    row_value_comparison = False
+
+    def build_query(self, model : Model, fields : List[str] = None, order_by : List[str] = None, limit : int = None, after = None, **query_fields):
+        '''
+        Builds a select of the given fields, by default every field of the model. order_by names
+        the sort columns, prefixed with '-' to sort descending. When ordering, limiting or paging
+        the primary keys are appended as tie-breakers so the order is total, and after continues
+        from a row (a model or CompactRow) or from the values of every ordering column.
+        Nulls sort after every value ascending and before them descending, on every dialect.
+        Fields named like these parameters can only be filtered on through a where expression.
+        '''
+        shape, params = self._where_shape(query_fields)
+        fields = tuple(model.fields if fields is None else fields)
+        if order_by is None and limit is None and after is None:
+            return self._template(model.__table_name__, fields, shape), params
+
+        ordering = self.ordering(model, order_by)
+        nullable = tuple([field not in model.__primary_keys__ and model._type_mapping[field].is_nullable for field, _ in ordering])
+        after_nulls = None
+        if after is not None:
+            values = self._keyset_values(ordering, after)
+            after_nulls = tuple([v is None for v in values])
+            params.extend([values[i] for i in self._keyset(ordering, nullable, after_nulls)[1]])
+        if limit is not None:
+            params.append(limit)
+        return self._template(model.__table_name__, fields, shape, ordering, nullable, after_nulls, limit is not None), params
+
+    @staticmethod
+    def ordering(model : Model, order_by : List[str] = None) -> Tuple[Tuple[str, bool], ...]:
+        '''Returns (field, descending) for every sort column, followed by the primary keys not already sorted on.'''
+        order_by = [order_by] if isinstance(order_by, str) else list(order_by or [])
+        ordering = [(x[1:], True) if x.startswith('-') else (x, False) for x in order_by]
+        sorted_fields = {field for field, _ in ordering}
+        return tuple(ordering + [(x, False) for x in model.__primary_keys__ if x not in sorted_fields])
+
+    @staticmethod
+    def _keyset_values(ordering, after) -> list:
+        if isinstance(after, (dict, CompactRow)):
+            missing = [field for field, _ in ordering if field not in after]
+            if missing:
+                raise ValueError(f'after is missing the ordering fields {missing}')
+            return [after[field] for field, _ in ordering]
+
+        values = list(after) if isinstance(after, (tuple, list)) else [after]
+        if len(values) != len(ordering):
+            raise ValueError(f'after needs a value for each ordering field: {[field for field, _ in ordering]}')
+        return values
+
+    @cached_method(maxsize=1024)
+    def _template(self, table_name, fields, shape, ordering = (), nullable = (), after_nulls = None, has_limit = False):
+        query = f'SELECT {",".join(fields)} FROM {table_name}{self._compile_where(shape)}'
+        if after_nulls is not None:
+            keyset_filter = self._keyset(ordering, nullable, after_nulls)[0]
+            query += f' AND {keyset_filter}' if shape else f' WHERE {keyset_filter}'
+        if ordering:
+            query += f' ORDER BY {",".join([self._order_term(field, descending, n) for (field, descending), n in zip(ordering, nullable)])}'
+        if has_limit:
+            query += f' LIMIT {self.param_symbol}'
+        return query
+
+    @cached_method(maxsize=1024)
+    def _keyset(self, ordering, nullable, after_nulls):
+        '''
+        Returns the filter matching the rows after a position in the ordering, with the indexes of
+        the position's values in the order the filter binds them. The expanded form
+        (a > ?) OR (a = ? AND b > ?) ... works with mixed sort directions on every dialect, and the
+        first column is also bounded on its own so an index on it can be used for the range.
+        Null positions are compared with IS NULL and take no parameter.
+        '''
+        if self.row_value_comparison and len(ordering) > 1 and len({descending for _, descending in ordering}) == 1 \
+                and not any(nullable) and not any(after_nulls):
+            operator = '<' if ordering[0][1] else '>'
+            return f'({",".join([field for field, _ in ordering])}) {operator} ({",".join([self.param_symbol] * len(ordering))})', tuple(range(len(ordering)))
+
+        conditions = []
+        for i, (field, descending) in enumerate(ordering):
+            following = self._keyset_term(field, descending, nullable[i], after_nulls[i], i, False)
+            if following is not None:
+                equal = [(f'{x} IS NULL', ()) if after_nulls[j] else (f'{x} = {self.param_symbol}', (j,)) for j, (x, _) in enumerate(ordering[:i])]
+                conditions.append(self._join_terms(equal + [following], ' AND '))
+        if not conditions:
+            return '1 = 0', ()
+        if len(conditions) == 1:
+            return conditions[0]
+
+        sql, indexes = self._join_terms([(f'({c})', i) for c, i in conditions], ' OR ')
+        bound = self._keyset_term(*ordering[0], nullable[0], after_nulls[0], 0, True)
+        return self._join_terms([bound, (f'({sql})', indexes)] if bound else [(f'({sql})', indexes)], ' AND ')
+
+    @staticmethod
+    def _join_terms(terms, connector : str):
+        return connector.join([sql for sql, _ in terms]), tuple([i for _, indexes in terms for i in indexes])
+
+    @staticmethod
+    def _order_term(field, descending, nullable) -> str:
+        # nullable columns state their null order, as sqlite and postgres default to opposite ones
+        if not nullable:
+            return f'{field} DESC' if descending else field
+        return f'{field} DESC NULLS FIRST' if descending else f'{field} NULLS LAST'
+
+    def _keyset_term(self, field, descending, nullable, is_null, index, inclusive):
+        '''Returns (sql, value indexes) matching values after, or with inclusive at or after, a position in one column, or None when nothing can follow.'''
+        if descending:
+            # nulls come first, so every value follows a null position
+            if is_null:
+                return None if inclusive else (f'{field} IS NOT NULL', ())
+            return f'{field} {"<=" if inclusive else "<"} {self.param_symbol}', (index,)
+        if is_null:
+            return (f'{field} IS NULL', ()) if inclusive else None
+        sql = f'{field} {">=" if inclusive else ">"} {self.param_symbol}'
+        return (f'({sql} OR {field} IS NULL)' if nullable else sql), (index,)
+
+    def build_key_query(self, model : Model, key_count : int) -> str:
+        '''
+        Builds a select of up to key_count rows by primary key. Parameters are the primary key
+        values of every requested row, flattened in `__primary_keys__` order.
+        '''
+        return self._key_template(model.__table_name__, tuple(model.fields), tuple(model.__primary_keys__), key_count)
+
+    @cached_method(maxsize=1024)
+    def _key_template(self, table_name, fields, primary_keys, key_count):
+        if len(primary_keys) == 1:
+            where = self._process_field(primary_keys[0], False, key_count)
+        else:
+            # composite keys are matched with one AND group per row, which every dialect supports
+            row = f'({" AND ".join([f"{x} = {self.param_symbol}" for x in primary_keys])})'
+            where = " OR ".join([row] * key_count)
+        return f'SELECT {",".join(fields)} FROM {table_name} WHERE {where}'
 
 class PostgresSelectQueryBuilder(SelectQueryBuilder):
     param_symbol = '%s'
+    row_value_comparison = True
 
 class DeleteQueryBuilder(QueryBuilder):
     def build_query(self, model: Model, **kwargs) -> str:
-        return f'DELETE FROM {model.__table_name__}{self._build_where_clause(kwargs)}'
+        shape, params = self._where_shape(kwargs)
+        return self._template(model.__table_name__, shape), params
+
+    @cached_method(maxsize=1024)
+    def _template(self, table_name, shape):
+        return f'DELETE FROM {table_name}{self._compile_where(shape)}'
 
 class PostgresDeleteQueryBuilder(DeleteQueryBuilder):
     param_symbol = '%s'
 
 class InsertQueryBuilder(QueryBuilder):
     def build_query(self, model: Model) -> str:
-        print([model.get(x) for x in model.fields])
-        non_null_fields = [x for x in model.fields if model.get(x) is not None]
-        print(f'INSERT INTO {model.__table_name__}({",".join(non_null_fields)}) VALUES ({",".join([self.param_symbol for _ in non_null_fields])})')
-        print([model.get(x) for x in non_null_fields])
-        # print( f'INSERT INTO {model.__table_name__}({",".join(model.fields)}) VALUES ({",".join([self.param_symbol for _ in model.fields])})')
-        return f'INSERT INTO {model.__table_name__}({",".join(model.fields)}) VALUES ({",".join([self.param_symbol for _ in model.fields])})', [model.get(x) for x in model.fields]
+        return self.build_bulk_query(model, model.fields), [model.get(x) for x in model.fields]
+
+    def build_bulk_query(self, model : Model, fields : List[str], row_count : int = 1) -> str:
+        '''
+        Builds an insert statement for the given fields. When row_count is greater than one
+        the statement carries a multi-row VALUES list of that many rows.
+        '''
+        row = f'({",".join([self.param_symbol for _ in fields])})'
+        return f'INSERT INTO {model.__table_name__}({",".join(fields)}) VALUES {",".join([row] * row_count)}'
 
 class PostgresInsertQueryBuilder(InsertQueryBuilder):
     param_symbol = '%s'
 
+class UpsertQueryBuilder(InsertQueryBuilder):
+    '''
+    Builds INSERT ... ON CONFLICT statements keyed on the model's primary keys. Conflicting rows
+    have their remaining fields overwritten with the inserted values, or are left unchanged when
+    every given field is a primary key.
+    '''
+    def build_bulk_query(self, model : Model, fields : List[str], row_count : int = 1) -> str:
+        return self._template(model.__table_name__, tuple(fields), tuple(model.__primary_keys__), row_count)
+
+    @cached_method(maxsize=1024)
+    def _template(self, table_name, fields, primary_keys, row_count):
+        row = f'({",".join([self.param_symbol] * len(fields))})'
+        updatable_fields = [x for x in fields if x not in primary_keys]
+        return f'INSERT INTO {table_name}({",".join(fields)}) VALUES {",".join([row] * row_count)} {self._conflict_clause(primary_keys, updatable_fields)}'
+
+    def _conflict_clause(self, primary_keys, updatable_fields):
+        if not updatable_fields:
+            return f'ON CONFLICT ({",".join(primary_keys)}) DO NOTHING'
+        return f'ON CONFLICT ({",".join(primary_keys)}) DO UPDATE SET {",".join([f"{x} = excluded.{x}" for x in updatable_fields])}'
+
+class PostgresUpsertQueryBuilder(UpsertQueryBuilder):
+    param_symbol = '%s'
+
+class CrateUpsertQueryBuilder(UpsertQueryBuilder):
+    def _conflict_clause(self, primary_keys, updatable_fields):
+        # crate only takes a conflict target together with DO UPDATE SET
+        if not updatable_fields:
+            return 'ON CONFLICT DO NOTHING'
+        return super()._conflict_clause(primary_keys, updatable_fields)
+
+class AggregateQueryBuilder(QueryBuilder):
+    '''
+    Builds statements computing aggregates on the server. Aggregates are given as (function, field)
+    pairs, where function is one of FUNCTIONS and field may be '*' for count. Each aggregate column
+    is named by `alias`, and grouped results are ordered by the group columns.
+    '''
+    FUNCTIONS = ('count', 'sum', 'min', 'max', 'avg')
+
+    def build_query(self, model : Model, group_by : List[str] = (), aggregates : List[Tuple[str, str]] = (), **query_fields):
+        shape, params = self._where_shape(query_fields)
+        return self._template(model.__table_name__, tuple(group_by), tuple(aggregates), shape), params
+
+    def build_count_query(self, model : Model, **query_fields):
+        return self.build_query(model, (), (('count', '*'),), **query_fields)
+
+    def build_exists_query(self, model : Model, **query_fields):
+        shape, params = self._where_shape(query_fields)
+        return self._exists_template(model.__table_name__, shape), params
+
+    @staticmethod
+    def alias(function : str, field : str) -> str:
+        return function if field == '*' else f'{function}_{field}'
+
+    @cached_method(maxsize=1024)
+    def _template(self, table_name, group_by, aggregates, shape):
+        columns = list(group_by) + [f'{self._aggregate(function, field)} AS {self.alias(function, field)}' for function, field in aggregates]
+        query = f'SELECT {",".join(columns)} FROM {table_name}{self._compile_where(shape)}'
+        if group_by:
+            query += f' GROUP BY {",".join(group_by)} ORDER BY {",".join(group_by)}'
+        return query
+
+    def _aggregate(self, function, field):
+        return f'{function.upper()}({field})'
+
+    @cached_method(maxsize=1024)
+    def _exists_template(self, table_name, shape):
+        return f'SELECT 1 FROM {table_name}{self._compile_where(shape)} LIMIT 1'
+
+class PostgresAggregateQueryBuilder(AggregateQueryBuilder):
+    param_symbol = '%s'
+
+    def _aggregate(self, function, field):
+        # postgres averages integers as numeric, which the driver returns as Decimal
+        if function == 'avg':
+            return f'CAST(AVG({field}) AS DOUBLE PRECISION)'
+        return super()._aggregate(function, field)
+
 class SQLDriver():
-    def __init__(self, update_builder : UpdateQueryBuilder, select_builder : UpdateQueryBuilder, delete_builder : DeleteQueryBuilder, insert_builder : InsertQueryBuilder) -> None:
+    def __init__(self, update_builder : UpdateQueryBuilder, select_builder : UpdateQueryBuilder, delete_builder : DeleteQueryBuilder, insert_builder : InsertQueryBuilder, upsert_builder : UpsertQueryBuilder = None, aggregate_builder : AggregateQueryBuilder = None) -> None:
         self.select_builder = select_builder
         self.update_builder = update_builder
         self.delete_builder = delete_builder
         self.insert_builder = insert_builder
+        self.upsert_builder = upsert_builder if upsert_builder is not None else UpsertQueryBuilder()
+        self.aggregate_builder = aggregate_builder if aggregate_builder is not None else AggregateQueryBuilder()
 
     def build_update(self, model):
         return self.update_builder.build_query(model)
 
-    def build_select(self, model, **query_fields):
-        return self.select_builder.build_query(model, **query_fields)
+    def build_bulk_update(self, model, updatable_fields):
+        return self.update_builder.build_bulk_query(model, updatable_fields)
+
+    def build_select(self, model, fields = None, **query_fields):
+        return self.select_builder.build_query(model, fields, **query_fields)
+
+    def build_get(self, model, key_count = 1):
+        return self.select_builder.build_key_query(model, key_count)
+
+    def build_count(self, model, **query_fields):
+        return self.aggregate_builder.build_count_query(model, **query_fields)
+
+    def build_exists(self, model, **query_fields):
+        return self.aggregate_builder.build_exists_query(model, **query_fields)
+
+    def build_aggregate(self, model, group_by, aggregates, **query_fields):
+        return self.aggregate_builder.build_query(model, group_by, aggregates, **query_fields)
 
     def build_delete(self, model, **query_fields):
         return self.delete_builder.build_query(model, **query_fields)
@@ -103,10 +467,23 @@ class SQLDriver():
     def build_insert(self, model):
         return self.insert_builder.build_query(model)
 
+    def build_bulk_insert(self, model, fields, row_count = 1):
+        return self.insert_builder.build_bulk_query(model, fields, row_count)
+
+    def build_upsert(self, model):
+        return self.upsert_builder.build_query(model)
+
+    def build_bulk_upsert(self, model, fields, row_count = 1):
+        return self.upsert_builder.build_bulk_query(model, fields, row_count)
+
 class StandardSQLDriver(SQLDriver):
     def __init__(self) -> None:
-        super().__init__(UpdateQueryBuilder(), SelectQueryBuilder(), DeleteQueryBuilder(), InsertQueryBuilder())
+        super().__init__(UpdateQueryBuilder(), SelectQueryBuilder(), DeleteQueryBuilder(), InsertQueryBuilder(), UpsertQueryBuilder(), AggregateQueryBuilder())
 
 class PostgresSQLDriver(SQLDriver):
     def __init__(self) -> None:
-        super().__init__(PostgresUpdateQueryBuilder(), PostgresSelectQueryBuilder(), PostgresDeleteQueryBuilder(), PostgresInsertQueryBuilder())
\ No newline at end of file
+        super().__init__(PostgresUpdateQueryBuilder(), PostgresSelectQueryBuilder(), PostgresDeleteQueryBuilder(), PostgresInsertQueryBuilder(), PostgresUpsertQueryBuilder(), PostgresAggregateQueryBuilder())
+
+class CrateSQLDriver(SQLDriver):
+    def __init__(self) -> None:
+        super().__init__(UpdateQueryBuilder(), SelectQueryBuilder(), DeleteQueryBuilder(), InsertQueryBuilder(), CrateUpsertQueryBuilder(), AggregateQueryBuilder())
\ No newline at end of file
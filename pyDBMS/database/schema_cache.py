@@ -0,0 +1,82 @@
+import threading
+import time
+from typing import Callable, Dict, List
+from pyDBMS.dbtype import DynamicModel
+
+class ColumnInfo():
+    '''Catalog information about a single column.'''
+
+    def __init__(self, name : str, type_string : str, is_nullable : bool, is_primary_key : bool) -> None:
+        self.name = name
+        self.type_string = type_string
+        self.is_nullable = is_nullable
+        self.is_primary_key = is_primary_key
+
+    def __repr__(self) -> str:
+        return f'ColumnInfo({self.name!r}, {self.type_string!r}, is_nullable={self.is_nullable}, is_primary_key={self.is_primary_key})'
+
+
+class SchemaCache():
+    '''
+    Caches a database's catalog: every table with its columns, loaded by a single batched
+    call, and the model classes built from it by `get_model_meta`. Entries expire after
+    ttl seconds (None never expires, 0 disables caching) or when invalidated.
+    '''
+
+    def __init__(self, ttl : float = 60.0) -> None:
+        self.ttl = ttl
+        self._lock = threading.RLock()
+        self._tables = None
+        self._loaded_at = 0.0
+        self._model_classes = {}
+
+    def tables(self, loader : Callable[[], Dict[str, List[ColumnInfo]]]) -> Dict[str, List[ColumnInfo]]:
+        with self._lock:
+            tables = self.get()
+            if tables is None:
+                tables = loader()
+                self.set(tables)
+            return tables
+
+    def get(self) -> Dict[str, List[ColumnInfo]]:
+        '''Returns the cached tables, or None if they were never loaded or have expired.'''
+        with self._lock:
+            if self._tables is None or self._expired():
+                return None
+            return self._tables
+
+    def set(self, tables : Dict[str, List[ColumnInfo]]):
+        with self._lock:
+            self._tables = tables
+            self._loaded_at = time.monotonic()
+            self._model_classes = {}
+
+    def model_class(self, table_name : str, loader : Callable[[], type]) -> type:
+        with self._lock:
+            if self._tables is None or self._expired():
+                self._model_classes = {}
+            model_class = self._model_classes.get(table_name)
+            if model_class is None:
+                model_class = loader()
+                if self.ttl != 0:
+                    self._model_classes[table_name] = model_class
+            return model_class
+
+    def invalidate(self):
+        with self._lock:
+            self._tables = None
+            self._model_classes = {}
+
+    def _expired(self) -> bool:
+        if self.ttl is None:
+            return False
+        return time.monotonic() - self._loaded_at >= self.ttl
+
+
+def build_model_class(table_name : str, tables : Dict[str, List[ColumnInfo]], type_mapper) -> type:
+    '''Builds the DynamicModel class describing a table from its cached catalog columns.'''
+    columns = tables.get(table_name)
+    if columns is None:
+        raise KeyError(table_name)
+    fields = {c.name : type_mapper.get_type(c.type_string)(c.is_nullable) for c in columns}
+    return type(DynamicModel(table_name, fields, [c.name for c in columns if c.is_primary_key]))
@@ -1,6 +1,9 @@
+import os
 from pyDBMS.database.connections.db_connection import SQLiteDBConnection
+from pyDBMS.database.connections.sqlite_connection_pool import SQLiteConnectionPool
 from pyDBMS.database.model_descriptor import SQLiteModelDescriptor
 from .abstract_database import AbstractDatabase
+from .schema_cache import ColumnInfo
 from ..dbtype import DBType, DynamicModel, Float, Integer, Model, String
 from typing import Union, List
 
@@ -9,39 +12,51 @@ class SQLiteDatabase(AbstractDatabase):
     
 
 
-    def __init__(self, filename, **kwargs) -> None:
-        super().__init__(SQLiteDBConnection(filename, **kwargs),model_descriptor=SQLiteModelDescriptor())
+    def __init__(self, filename, pool_options : dict = None, **kwargs) -> None:
+        '''
+        Opens the sqlite database file. When pool_options is given (e.g. {'synchronous' : 'normal'})
+        the database can be shared between threads through a SQLiteConnectionPool: every thread
+        reads on its own WAL connection and writes are serialized through a single writer.
+        '''
+        if pool_options is None:
+            connection = SQLiteDBConnection(filename, **kwargs)
+        else:
+            connection = SQLiteConnectionPool(filename, **pool_options, **kwargs)
+        super().__init__(connection, model_descriptor=SQLiteModelDescriptor())
+        if filename != ':memory:':
+            self.cache_namespace = ('sqlite', os.path.abspath(filename))
 
     def get_tables(self):
-        cur = self.db_connection.cursor()
-        cur.execute("SELECT name FROM sqlite_master WHERE type='table';")
-        return [x[0] for x in cur.fetchall()]
+        return self._cached_tables()
 
     def get_columns(self, table_name):
-        if table_name not in self.get_tables():
-            raise KeyError()
-        cur = self.db_connection.cursor()
-        data = cur.execute(f'''PRAGMA table_info({table_name});''')
-        return [x[1] for x in data.fetchall()]
+        return self._cached_columns(table_name)
 
     def get_model_meta(self, table_name: str) -> DBType:
-        cur = self.db_connection.cursor()
-        cur.execute(f'PRAGMA table_info({table_name});')
-        primary_keys = []
-        fields = {}
-        for row in cur.fetchall():
-            print(row)
-            col_name = row[1]
-            is_nullable = row[3] == 0
-            dbtype = row[2]
-            if row[5]:
-                primary_keys.append(col_name)
+        return self._cached_model_meta(table_name)
 
-            fields[col_name] = self.type_mapper.get_type(dbtype)(is_nullable)
+    schema_query = """SELECT m.name, p.name, p.type, p."notnull", p.pk
+    FROM sqlite_master m JOIN pragma_table_info(m.name) p
+    WHERE m.type = 'table'
+    ORDER BY m.name, p.cid;"""
+
+    index_query = '''SELECT l.name, l."unique", i.name
+    FROM pragma_index_list(?) l JOIN pragma_index_info(l.name) i
+    ORDER BY l.name, i.seqno;'''
+
+    def _load_schema(self):
+        with self.db_connection.borrow() as conn:
+            cur = conn.cursor()
+            cur.execute(self.schema_query)
+            return self._schema_from_rows(cur.fetchall())
+
+    @staticmethod
+    def _schema_from_rows(rows):
+        tables = {}
+        for table_name, col_name, dbtype, not_null, primary_key in rows:
+            tables.setdefault(table_name, []).append(ColumnInfo(col_name, dbtype, not_null == 0, bool(primary_key)))
+        return tables
 
-        return DynamicModel(table_name, fields, primary_keys)
-        
-        
     def table_exists(self, table_name):
         return super().table_exists(table_name)
 
@@ -51,8 +66,8 @@ class SQLiteDatabase(AbstractDatabase):
     def create_model(self, model):
         return super().create_model(model)
         
-    def insert(self, model):
-        return super().insert(model)
+    def insert(self, model : Union[Model, List[Model]], batch_size : int = 1000):
+        return super().insert(model, batch_size)
 
     def delete(self, model_type, override_delete_all=False, **kwargs):
         return super().delete(model_type, override_delete_all=override_delete_all, **kwargs)
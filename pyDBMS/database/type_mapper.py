@@ -21,4 +21,18 @@ class PostgresTypeMapper(TypeMapper):
         'double precision' : Float,
         'date' : Date
 
-    }
\ No newline at end of file
+    }
+
+
+class CrateTypeMapper(TypeMapper):
+    type_mapping = {
+        'text' : String,
+        'integer' : Integer,
+        'bigint' : Integer,
+        'smallint' : Integer,
+        'real' : Float,
+        'double precision' : Float,
+        'boolean' : Boolean,
+        'timestamp with time zone' : DateTime,
+        'timestamp without time zone' : DateTime
+    }
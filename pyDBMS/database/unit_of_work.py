@@ -0,0 +1,71 @@
+from typing import List, Union
+from pyDBMS.dbtype import Model
+
+class UnitOfWork():
+    '''
+    Collects pending inserts, updates and deletes against a database and writes them
+    together in a single transaction when flushed. Inserts are written first, then
+    updates, then deletes, each through the database's batched paths.
+    '''
+
+    def __init__(self, db) -> None:
+        self.db = db
+        self._inserts = []
+        self._updates = []
+        self._deletes = []
+
+    def add(self, model : Union[Model, List[Model]]):
+        self._inserts.extend(self._as_models(model))
+
+    def update(self, model : Union[Model, List[Model]]):
+        self._updates.extend(self._as_models(model))
+
+    def delete(self, model : Union[Model, List[Model]]):
+        models = self._as_models(model)
+        for m in models:
+            if not m.__primary_keys__:
+                raise ValueError(f'{m.__table_name__} must have primary keys to be deleted by a unit of work')
+        self._deletes.extend(models)
+
+    def pending(self) -> int:
+        return len(self._inserts) + len(self._updates) + len(self._deletes)
+
+    def flush(self):
+        '''Writes every pending change in one transaction and clears the pending lists.'''
+        if self.pending() == 0:
+            return
+
+        with self.db.transaction():
+            if self._inserts:
+                self.db.insert(self._inserts)
+            if self._updates:
+                self.db.update(self._updates)
+            self._flush_deletes()
+        self.clear()
+
+    def clear(self):
+        self._inserts = []
+        self._updates = []
+        self._deletes = []
+
+    def _flush_deletes(self):
+        groups = {}
+        for m in self._deletes:
+            groups.setdefault((type(m), tuple(m.__primary_keys__)), []).append(m)
+
+        for (model_type, primary_keys), models in groups.items():
+            if len(primary_keys) > 1:
+                for m in models:
+                    self.db.delete(model_type, **{k : m.get(k) for k in primary_keys})
+                continue
+
+            key = primary_keys[0]
+            chunk_size = self.db.max_query_params
+            for i in range(0, len(models), chunk_size):
+                self.db.delete(model_type, **{key : [m.get(key) for m in models[i:i + chunk_size]]})
+
+    def _as_models(self, model) -> List[Model]:
+        models = model if isinstance(model, list) else [model]
+        if not all([isinstance(m, Model) for m in models]):
+            raise TypeError()
+        return models
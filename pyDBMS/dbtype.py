@@ -1,9 +1,13 @@
 from abc import ABC
 from datetime import date, datetime
+from operator import itemgetter
+import weakref
 
 class DBType(ABC):
     '''Abstract base type for any database objects'''
     _python_type = None
+    # numpy dtype used for columnar results
+    _numpy_dtype = object
 
     def __init__(self, is_nullable = True):
         self.is_nullable = is_nullable
@@ -13,16 +17,33 @@ class DBType(ABC):
 
     def _validate(self, value):
         try:
-            converted_value = self._python_type(value)
+            self._coerce(value)
             return True
-        except Exception:
+        except ValueError:
             return False
 
     def _convert(self, value):
         return self._python_type(value)
 
+    def _coerce(self, value):
+        '''Converts value in a single pass, raising ValueError if it cannot be converted.'''
+        try:
+            return self._convert(value)
+        except Exception:
+            raise ValueError(f'{value} cannot be converted to type `{self.__class__.__name__}`')
+
+    def _from_db(self, value):
+        '''
+        Converts a value read from the database driver. The column type is already known,
+        so values that are None or already the python type are returned without validation.
+        '''
+        if value is None or type(value) is self._python_type:
+            return value
+        return self._convert(value)
+
 class Integer(DBType):
     _python_type = int
+    _numpy_dtype = 'int64'
 
 class String(DBType):
     _python_type = str
@@ -33,9 +54,11 @@ class String(DBType):
 
 class Boolean(DBType):
     _python_type = bool
+    _numpy_dtype = 'bool'
 
 class Float(DBType):
     _python_type = float
+    _numpy_dtype = 'float64'
 
 class CharN(String):
 
@@ -51,14 +74,7 @@ class CharN(String):
 
 class DateTime(DBType):
     _python_type = datetime
-
-    def _validate(self, value):
-        try:
-            self._convert(value)
-        except:
-            return False
-        
-        return True
+    _numpy_dtype = 'datetime64[us]'
 
     def _convert(self, value):
         if isinstance(value, datetime):
@@ -73,15 +89,8 @@ class DateTime(DBType):
         raise ValueError(f'unexpected value error with {value}')
 
 class Date(DBType):
-    _python_type = datetime
-
-    def _validate(self, value):
-        try:
-            self._convert(value)
-        except Exception as e:
-            return False
-        
-        return True
+    _python_type = date
+    _numpy_dtype = 'datetime64[D]'
 
     def _convert(self, value):
         if isinstance(value, datetime):
@@ -101,67 +110,195 @@ class Date(DBType):
         raise ValueError(f'unexpected value error with {value}')
 
 
+class Index():
+    '''
+    A secondary index declared in a model's `__indexes__`. where is an sql condition that makes
+    the index partial, e.g. 'deleted = false'. The name defaults to one built from the table and fields.
+    '''
+
+    def __init__(self, *fields : str, unique : bool = False, where : str = None, name : str = None) -> None:
+        if not fields:
+            raise ValueError('an index needs at least one field')
+        self.fields = tuple(fields)
+        self.unique = unique
+        self.where = where
+        self.name = name
+
+    def index_name(self, table_name : str) -> str:
+        return self.name or f'{table_name}_{"_".join(self.fields)}_idx'
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Index) and (self.fields, self.unique, self.where, self.name) == (other.fields, other.unique, other.where, other.name)
+
+    def __hash__(self) -> int:
+        return hash((self.fields, self.unique, self.where, self.name))
+
+    def __repr__(self) -> str:
+        return f'Index({", ".join(map(repr, self.fields))}, unique={self.unique}, where={self.where!r}, name={self.name!r})'
+
 class Model(dict):
     '''
     The model class is the base class for representing a table in a sql database as an object.
+    Field metadata is computed once per subclass when the class is created and shared by all instances.
     '''
     __table_name__ = None
     __primary_keys__ = []
+    # secondary indexes, given as Index objects or tuples of field names
+    __indexes__ = []
     
     fields = []
+    _type_mapping = {}
 
-    def __init__(self, **kwargs):
-        # init fields
-        self.fields, self._type_mapping = self._init_fields()
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.fields, cls._type_mapping = cls._init_fields()
+        cls._row_classes = {}
 
         #ensure primary keys are valid fields
-        if isinstance(self.__primary_keys__, str):
-            self.__primary_keys__ = [self.__primary_keys__]
-        assert all([x in self.fields for x in self.__primary_keys__])
+        if isinstance(cls.__primary_keys__, str):
+            cls.__primary_keys__ = [cls.__primary_keys__]
+        assert all([x in cls.fields for x in cls.__primary_keys__])
 
+        cls.__indexes__ = [cls._init_index(x) for x in cls.__indexes__]
+
+    @classmethod
+    def _init_index(cls, index) -> Index:
+        if not isinstance(index, Index):
+            index = Index(index) if isinstance(index, str) else Index(*index)
+        assert all([x in cls.fields for x in index.fields])
+        return index
+
+    def __init__(self, **kwargs):
         for k, v in kwargs.items():
             self[k] = v
 
     def __setitem__(self, __k, v) -> None:
-        if __k not in self.fields:
-            raise KeyError(f'{self.__table_name__} does not support field {v}')
-        if not self._type_mapping[__k]._validate(v) and v is not None:
-            raise ValueError(f'{v} cannot be converted to type `{self._type_mapping[__k].__class__.__name__}`')
-        if v is None and not self._type_mapping[__k].is_nullable:
-            raise ValueError(f'field {__k} cannot be set to null')
-        field_type = getattr(self, __k)
+        field_type = self._type_mapping.get(__k)
         field_type : DBType
-        converted_value = None
-        if v is not None:
-            converted_value = field_type._convert(v)
-
-        return super().__setitem__(__k, converted_value)
-
-
-
-    def _init_fields(self):
-        fields = set()
+        if field_type is None:
+            raise KeyError(f'{self.__table_name__} does not support field {__k}')
+        if v is None:
+            if not field_type.is_nullable:
+                raise ValueError(f'field {__k} cannot be set to null')
+            return super().__setitem__(__k, None)
+
+        return super().__setitem__(__k, field_type._coerce(v))
+
+    @classmethod
+    def _loader(cls, fields : list):
+        '''
+        Returns a function that builds an instance from a database row with the given column order.
+        Rows come from the driver, so values are converted with `DBType._from_db` without validation.
+        '''
+        converters = [cls._type_mapping[field]._from_db for field in fields]
+        update = dict.update
+
+        def load(row):
+            obj = cls()
+            update(obj, zip(fields, [convert(v) for convert, v in zip(converters, row)]))
+            return obj
+        return load
+
+    @classmethod
+    def _compact_loader(cls, fields : list):
+        '''Returns a function that builds a read-only CompactRow of this model from a database row.'''
+        converters = [cls._type_mapping[field]._from_db for field in fields]
+        row_class = cls._row_class(fields)
+        new = tuple.__new__
+
+        def load(row):
+            return new(row_class, [convert(v) for convert, v in zip(converters, row)])
+        return load
+
+    @classmethod
+    def _row_class(cls, fields : list) -> type:
+        '''Returns the CompactRow subclass for rows of this model holding the given fields, in order.'''
+        key = tuple(fields)
+        row_class = cls._row_classes.get(key)
+        if row_class is None:
+            attributes = {name : property(itemgetter(i), doc=f'Alias for field number {i}') for i, name in enumerate(key)}
+            attributes.update({'__slots__' : (), 'model_class' : cls, 'fields' : key, '_indexes' : {name : i for i, name in enumerate(key)},
+                '__table_name__' : cls.__table_name__, '__primary_keys__' : cls.__primary_keys__})
+            row_class = cls._row_classes.setdefault(key, type(f'{cls.__name__}Row', (CompactRow,), attributes))
+        return row_class
+
+    @classmethod
+    def _init_fields(cls):
         type_mapping = {}
 
-        for n in dir(self):
-            v = getattr(self, n)
+        for n in dir(cls):
+            v = getattr(cls, n)
             if not callable(v) and isinstance(v, DBType):
-                fields.add(n)
                 type_mapping[n] = v
 
         return list(type_mapping.keys()), type_mapping
 
 
+class CompactRow(tuple):
+    '''
+    Read-only row of a Model class backed by a tuple, returned by `select(..., rows='compact')`.
+    Values are available by field name as attributes or keys, and by position; iterating yields
+    the values. The schema is shared with the model class and `to_model` promotes a row to a Model.
+    '''
+    __slots__ = ()
+    model_class = None
+    fields = ()
+    _indexes = {}
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            index = self._indexes.get(key)
+            if index is None:
+                raise KeyError(key)
+            return tuple.__getitem__(self, index)
+        return tuple.__getitem__(self, key)
+
+    def __contains__(self, key) -> bool:
+        return key in self._indexes
+
+    def get(self, key : str, default = None):
+        index = self._indexes.get(key)
+        return default if index is None else tuple.__getitem__(self, index)
+
+    def keys(self):
+        return list(self.fields)
+
+    def values(self):
+        return list(self)
+
+    def items(self):
+        return list(zip(self.fields, self))
+
+    def to_model(self) -> Model:
+        '''Returns a mutable instance of the model class holding this row's values.'''
+        model = self.model_class()
+        dict.update(model, zip(self.fields, self))
+        return model
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}({", ".join([f"{k}={v!r}" for k, v in zip(self.fields, self)])})'
+
+
 class DynamicModel(Model):
-    def __init__(self,table_name, fields : dict, primary_keys = [], **kwargs):
+    '''
+    A model whose schema is given at runtime. Each distinct schema is built into a cached
+    subclass once, so its instances share field metadata the same way declared models do.
+    A schema class is only cached while something still uses it, so runtime schemas do not accumulate.
+    '''
+    _schema_classes = weakref.WeakValueDictionary()
+
+    def __new__(cls, table_name = None, fields : dict = None, primary_keys = [], **kwargs):
+        if cls is not DynamicModel:
+            return super().__new__(cls)
+
         if not isinstance(table_name, str) or not table_name:
             raise TypeError('table name must be a string type')
 
         if not isinstance(primary_keys, (list, str)):
             raise TypeError('primary keys must be a string or list of strings')
 
-        if not table_name or not isinstance(table_name, str):
-            raise TypeError('table name must be a string')
+        if not isinstance(fields, dict):
+            raise TypeError('fields must be a dictionary of field names to types')
 
         if any([not isinstance(x, str) for x in fields.keys()]):
             raise KeyError('field keys must be strings')
@@ -172,10 +309,18 @@ class DynamicModel(Model):
         if isinstance(primary_keys,str):
             primary_keys = [primary_keys]
 
-        self.__primary_keys__ = primary_keys
-        self.__table_name__ = table_name
-        
-        for k, v in fields.items():
-            self.__setattr__(k, v)
+        return super().__new__(cls._schema_class(table_name, fields, primary_keys))
+
+    def __init__(self, table_name = None, fields : dict = None, primary_keys = [], **kwargs):
         super().__init__(**kwargs)
 
+    @classmethod
+    def _schema_class(cls, table_name, fields : dict, primary_keys : list):
+        key = (table_name, tuple(primary_keys), tuple((k, type(v), tuple(sorted(vars(v).items()))) for k, v in sorted(fields.items())))
+        schema_class = cls._schema_classes.get(key)
+        if schema_class is None:
+            attributes = dict(fields)
+            attributes['__table_name__'] = table_name
+            attributes['__primary_keys__'] = list(primary_keys)
+            schema_class = cls._schema_classes.setdefault(key, type(f'DynamicModel_{table_name}', (DynamicModel,), attributes))
+        return schema_class
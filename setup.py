@@ -1,5 +1,5 @@
 import pathlib
-from setuptools import setup
+from setuptools import find_packages, setup
 
 # The directory containing this file
 HERE = pathlib.Path(__file__).parent
@@ -23,9 +23,17 @@ setup(
         "Programming Language :: Python :: 3",
         "Programming Language :: Python :: 3.7",
     ],
-    packages=['pyDBMS'],
+    packages=find_packages(exclude=['tests', 'tests.*', 'benchmarks', 'benchmarks.*']),
     include_package_data=True,
     install_requires=[],
+    # database drivers and numpy are only imported when they are used
+    extras_require={
+        'postgres' : ['psycopg2'],
+        'postgres-async' : ['psycopg>=3.1'],
+        'crate' : ['crate'],
+        'numpy' : ['numpy'],
+        'all' : ['psycopg2', 'psycopg>=3.1', 'crate', 'numpy'],
+    },
     # entry_points={
     #     "console_scripts": [
     #         "realpython=reader.__main__:main",
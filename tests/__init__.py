@@ -1,4 +1,13 @@
 from .model_tests import *
 from .database_tests import *
 from .model_descriptor_tests import *
-from .postgresql_database_tests import *
\ No newline at end of file
+from .query_builder_tests import *
+from .connection_pool_tests import *
+from .columnar_tests import *
+from .import_tests import *
+from .postgres_copy_tests import *
+from .instrumentation_tests import *
+from .benchmark_tests import *
+from .caching_tests import *
+from .postgresql_database_tests import *
+from .async_database_tests import *
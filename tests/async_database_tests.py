@@ -0,0 +1,166 @@
+import asyncio, gc, os, unittest
+from pyDBMS.database.async_database import AsyncSQLiteDatabase
+from pyDBMS.database.connections.async_connection import AsyncSQLiteConnection
+from pyDBMS.database.connections.async_connection_pool import AsyncConnectionPool
+from .example_types import SimpleChildModel, SimpleModel
+DATABASE_NAME = 'tests/async_test.db'
+
+class AsyncSQLiteDBTestCase(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        if os.path.exists(DATABASE_NAME):
+            os.remove(DATABASE_NAME)
+        self.db = AsyncSQLiteDatabase(DATABASE_NAME, pool_size=2)
+        await self.db.create_model(SimpleModel)
+
+    async def asyncTearDown(self) -> None:
+        await self.db.close()
+        if os.path.exists(DATABASE_NAME):
+            os.remove(DATABASE_NAME)
+
+class TestAsyncSQLiteDatabase(AsyncSQLiteDBTestCase):
+    async def test_catalog(self):
+        self.assertEqual(['simple_model'], await self.db.get_tables())
+        self.assertEqual(sorted(SimpleModel.fields), sorted(await self.db.get_columns('simple_model')))
+        self.assertTrue(await self.db.model_exists(SimpleModel))
+        self.assertFalse(await self.db.table_exists('simple_child_model'))
+        self.assertEqual(['model_id'], (await self.db.get_model_meta('simple_model')).__primary_keys__)
+
+    async def test_create_model_updates_schema_cache(self):
+        await self.db.create_model(SimpleChildModel)
+        self.assertTrue(await self.db.model_exists(SimpleChildModel))
+
+    async def test_insert_and_select(self):
+        stats = await self.db.insert([SimpleModel(model_id=str(i), integer_column=i) for i in range(10)])
+        self.assertEqual(10, stats.rows)
+        self.assertEqual(10, len(await self.db.select(SimpleModel)))
+        result = await self.db.select(SimpleModel, integer_column=[3, 4])
+        self.assertEqual(['3', '4'], sorted(m['model_id'] for m in result))
+
+    async def test_select_fields(self):
+        await self.db.insert([SimpleModel(model_id=str(i), integer_column=i) for i in range(3)])
+        results = await self.db.select(SimpleModel, fields=['integer_column'], integer_column__lt=2)
+        self.assertEqual([{'integer_column' : 0}, {'integer_column' : 1}], sorted(results, key=lambda m: m['integer_column']))
+        streamed = [m async for m in self.db.iter_select(SimpleModel, fields=['model_id'])]
+        self.assertEqual(['0', '1', '2'], sorted(m['model_id'] for m in streamed))
+
+    async def test_aggregates(self):
+        await self.db.insert([SimpleModel(model_id=str(i), integer_column=i % 2) for i in range(5)])
+        self.assertEqual(3, await self.db.count(SimpleModel, integer_column=0))
+        self.assertFalse(await self.db.exists(SimpleModel, model_id='9'))
+        result = await self.db.aggregate(SimpleModel, group_by='integer_column', count='model_id')
+        self.assertEqual([{'integer_column' : 0, 'count_model_id' : 3}, {'integer_column' : 1, 'count_model_id' : 2}], result)
+
+    async def test_select_pages(self):
+        await self.db.insert([SimpleModel(model_id=str(i), integer_column=i) for i in range(5)])
+        first = await self.db.select(SimpleModel, order_by=['-integer_column'], limit=2)
+        second = await self.db.select(SimpleModel, order_by=['-integer_column'], limit=2, after=first[-1])
+        self.assertEqual(['4', '3', '2', '1'], [m['model_id'] for m in first + second])
+
+    async def test_upsert(self):
+        await self.db.insert(SimpleModel(model_id='a', integer_column=1))
+        await self.db.upsert([SimpleModel(model_id='a', integer_column=2), SimpleModel(model_id='b', integer_column=3)])
+        self.assertEqual({'a' : 2, 'b' : 3}, {m['model_id'] : m['integer_column'] for m in await self.db.select(SimpleModel)})
+
+    async def test_insert_with_invalid_input_type(self):
+        with self.assertRaises(TypeError):
+            await self.db.insert([SimpleModel(model_id='a'), 'b'])
+
+    async def test_iter_select(self):
+        await self.db.insert([SimpleModel(model_id=str(i), integer_column=i) for i in range(25)])
+        models = [m async for m in self.db.iter_select(SimpleModel, chunk_size=10)]
+        self.assertEqual(list(range(25)), sorted(m['integer_column'] for m in models))
+
+    async def test_iter_select_break_releases_connection(self):
+        await self.db.insert([SimpleModel(model_id=str(i)) for i in range(5)])
+        pool = self.db.db_connection
+        async for _ in self.db.iter_select(SimpleModel, chunk_size=2):
+            break
+        gc.collect()
+        # the abandoned generator is closed by a task the event loop schedules
+        for _ in range(100):
+            if pool.stats().in_use == 0:
+                break
+            await asyncio.sleep(0.01)
+        self.assertEqual(0, pool.stats().in_use)
+        self.assertIsNone(pool._held.get())
+        self.assertEqual(5, len(await self.db.select(SimpleModel)))
+
+    async def test_select_compact_rows(self):
+        await self.db.insert([SimpleModel(model_id=str(i), integer_column=i) for i in range(3)])
+        rows = await self.db.select(SimpleModel, rows='compact', integer_column=1)
+        self.assertEqual(['1'], [row.model_id for row in rows])
+
+    async def test_update(self):
+        await self.db.insert([SimpleModel(model_id=str(i), integer_column=i) for i in range(3)])
+        affected = await self.db.update([SimpleModel(model_id=str(i), integer_column=i * 10) for i in range(3)])
+        self.assertEqual(3, affected)
+        self.assertEqual([0, 10, 20], sorted(m['integer_column'] for m in await self.db.select(SimpleModel)))
+
+    async def test_delete(self):
+        await self.db.insert([SimpleModel(model_id='a'), SimpleModel(model_id='b')])
+        await self.db.delete(SimpleModel, model_id='a')
+        self.assertEqual(['b'], [m['model_id'] for m in await self.db.select(SimpleModel)])
+
+    async def test_transaction_rolls_back_on_exception(self):
+        with self.assertRaises(RuntimeError):
+            async with self.db.transaction():
+                await self.db.insert(SimpleModel(model_id='a'))
+                raise RuntimeError()
+        self.assertEqual([], await self.db.select(SimpleModel))
+
+    async def test_nested_transaction_rolls_back_to_savepoint(self):
+        async with self.db.transaction():
+            await self.db.insert(SimpleModel(model_id='a'))
+            with self.assertRaises(RuntimeError):
+                async with self.db.transaction():
+                    await self.db.insert(SimpleModel(model_id='b'))
+                    raise RuntimeError()
+        self.assertEqual(['a'], [m['model_id'] for m in await self.db.select(SimpleModel)])
+
+    async def test_concurrent_selects(self):
+        await self.db.insert([SimpleModel(model_id=str(i), integer_column=i) for i in range(5)])
+        results = await asyncio.gather(*[self.db.select(SimpleModel, integer_column=i) for i in range(5)])
+        self.assertEqual([str(i) for i in range(5)], [r[0]['model_id'] for r in results])
+        self.assertLessEqual(self.db.db_connection.stats().size, 2)
+
+class TestAsyncConnectionPool(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.pool = AsyncConnectionPool(lambda: AsyncSQLiteConnection.connect(':memory:'), max_size=1)
+
+    async def asyncTearDown(self) -> None:
+        await self.pool.close()
+
+    async def test_borrow_is_reentrant(self):
+        async with self.pool.borrow() as outer:
+            async with self.pool.borrow() as inner:
+                self.assertIs(outer, inner)
+        self.assertEqual(1, self.pool.stats().acquisitions)
+
+    async def test_unshared_borrow_is_not_published(self):
+        async with self.pool.borrow(share=False) as connection:
+            self.assertIsNone(self.pool._held.get())
+            self.assertEqual(1, self.pool.stats().in_use)
+        self.assertEqual(0, self.pool.stats().in_use)
+        async with self.pool.borrow() as shared:
+            self.assertIs(shared, self.pool._held.get())
+        self.assertIsNone(self.pool._held.get())
+
+    async def test_acquire_timeout(self):
+        connection = await self.pool.acquire()
+        with self.assertRaises(TimeoutError):
+            await self.pool.acquire(timeout=0.05)
+        await self.pool.release(connection)
+        self.assertEqual(1, self.pool.stats().timeouts)
+
+    async def test_waiting_task_gets_released_connection(self):
+        connection = await self.pool.acquire()
+        waiter = asyncio.ensure_future(self.pool.acquire())
+        await asyncio.sleep(0.01)
+        self.assertFalse(waiter.done())
+        await self.pool.release(connection)
+        self.assertIs(connection, await waiter)
+        await self.pool.release(connection)
+
+    async def test_direct_use_outside_borrow(self):
+        with self.assertRaises(RuntimeError):
+            await self.pool.execute('SELECT 1')
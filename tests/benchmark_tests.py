@@ -0,0 +1,20 @@
+import json, os, tempfile, unittest
+from benchmarks.run_benchmarks import BENCHMARKS, compare, main, run_all
+
+class TestBenchmarks(unittest.TestCase):
+    def test_run_all_covers_every_benchmark_and_backend(self):
+        results = run_all(rows=20, repeat=1)
+        self.assertEqual(20, results['meta']['rows'])
+        measured = {(r['backend'], r['benchmark']) for r in results['results']}
+        self.assertEqual({(b, name) for b in ('sqlite_file', 'sqlite_memory') for name in BENCHMARKS}, measured)
+        self.assertTrue(all(r['rows_per_second'] > 0 for r in results['results']))
+
+    def test_main_writes_json_and_compares(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'results.json')
+            main(['--rows', '10', '--repeat', '1', '--only', 'insert_bulk', '--output', output])
+            with open(output) as f:
+                results = json.load(f)
+            self.assertEqual({'insert_bulk'}, {r['benchmark'] for r in results['results']})
+            ratios = compare(results, results)
+            self.assertEqual({'sqlite_file.insert_bulk' : 1.0, 'sqlite_memory.insert_bulk' : 1.0}, ratios)
@@ -0,0 +1,183 @@
+import os, unittest
+from pyDBMS.database.caching import IdentityMap, ResultCache
+from pyDBMS.database.instrumentation import RowCounter
+from pyDBMS.database.sqlite_database import SQLiteDatabase
+from .example_types import SimpleModel, SimpleTextModel
+DATABASE_NAME = 'tests/caching_test.db'
+
+class TestResultCache(unittest.TestCase):
+    def test_get_and_put(self):
+        cache = ResultCache()
+        self.assertIsNone(cache.get('key'))
+        cache.put('key', 'table', 'value')
+        self.assertEqual('value', cache.get('key'))
+        stats = cache.stats()
+        self.assertEqual((1, 1, 1), (stats.hits, stats.misses, stats.size))
+        self.assertEqual(0.5, stats.hit_rate)
+
+    def test_least_recently_used_entry_evicted(self):
+        cache = ResultCache(max_entries=2)
+        cache.put('a', 'table', 1)
+        cache.put('b', 'table', 2)
+        cache.get('a')
+        cache.put('c', 'table', 3)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(1, cache.get('a'))
+        self.assertEqual(1, cache.stats().evictions)
+
+    def test_entries_expire(self):
+        cache = ResultCache(ttl=0)
+        cache.put('a', 'table', 1)
+        self.assertIsNone(cache.get('a'))
+
+    def test_invalidate_table(self):
+        cache = ResultCache()
+        cache.put('a', 'first', 1)
+        cache.put('b', 'second', 2)
+        cache.invalidate('first')
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(2, cache.get('b'))
+        self.assertEqual(1, cache.stats().invalidations)
+
+    def test_put_skipped_after_concurrent_invalidation(self):
+        cache = ResultCache()
+        generation = cache.generation('table')
+        cache.invalidate('table')
+        cache.put('a', 'table', 1, generation)
+        self.assertIsNone(cache.get('a'))
+
+class TestIdentityMap(unittest.TestCase):
+    def test_merge_returns_first_instance(self):
+        identity_map = IdentityMap()
+        first = SimpleModel(model_id='a')
+        self.assertIs(first, identity_map.merge(first))
+        self.assertIs(first, identity_map.merge(SimpleModel(model_id='a')))
+        self.assertIs(first, identity_map.get('simple_model', ('a',)))
+        self.assertEqual(1, len(identity_map))
+
+    def test_models_without_primary_key_values_are_not_mapped(self):
+        identity_map = IdentityMap()
+        model = SimpleModel(integer_column=1)
+        self.assertIs(model, identity_map.merge(model))
+        self.assertEqual(0, len(identity_map))
+
+class CachingDBTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        if os.path.exists(DATABASE_NAME):
+            os.remove(DATABASE_NAME)
+        self.db = SQLiteDatabase(DATABASE_NAME)
+        self.db.create_model(SimpleModel)
+        self.db.create_model(SimpleTextModel)
+        self.db.insert([SimpleModel(model_id=str(i), integer_column=i) for i in range(3)])
+        self.counter = RowCounter()
+        self.db.add_hook(self.counter)
+
+    def tearDown(self) -> None:
+        if os.path.exists(DATABASE_NAME):
+            os.remove(DATABASE_NAME)
+
+class TestDatabaseResultCache(CachingDBTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.cache = ResultCache()
+        self.db.enable_result_cache(self.cache)
+
+    def test_repeated_select_served_from_cache(self):
+        first = self.db.select(SimpleModel, model_id='1')
+        second = self.db.select(SimpleModel, model_id='1')
+        self.assertEqual(first, second)
+        self.assertIsNot(first[0], second[0])
+        self.assertEqual(1, self.counter.rows_fetched_total)
+        self.assertEqual(1, self.cache.stats().hits)
+
+    def test_writes_invalidate_table(self):
+        self.db.select(SimpleModel)
+        self.db.select(SimpleTextModel)
+        self.db.update(SimpleModel(model_id='1', integer_column=10))
+        self.assertEqual(10, self.db.select(SimpleModel, model_id='1')[0]['integer_column'])
+        self.db.insert(SimpleModel(model_id='3'))
+        self.assertEqual(4, len(self.db.select(SimpleModel)))
+        self.db.delete(SimpleModel, model_id='3')
+        self.assertEqual(3, len(self.db.select(SimpleModel)))
+        self.db.select(SimpleTextModel)
+        self.assertEqual(1, self.cache.stats().hits)
+
+    def test_databases_on_same_file_share_entries(self):
+        other = SQLiteDatabase(DATABASE_NAME)
+        other.enable_result_cache(self.cache)
+        self.db.select(SimpleModel)
+        other.insert(SimpleModel(model_id='3'))
+        self.assertEqual(4, len(self.db.select(SimpleModel)))
+
+    def test_selects_in_transaction_not_cached(self):
+        with self.db.transaction():
+            self.db.insert(SimpleModel(model_id='3'))
+            self.assertEqual(4, len(self.db.select(SimpleModel)))
+        self.assertEqual(0, self.cache.stats().size)
+
+    def test_rolled_back_transaction_invalidates(self):
+        self.db.select(SimpleModel)
+        with self.assertRaises(RuntimeError):
+            with self.db.transaction():
+                self.db.insert(SimpleModel(model_id='3'))
+                raise RuntimeError()
+        self.assertEqual(3, len(self.db.select(SimpleModel)))
+
+    def test_disable_result_cache(self):
+        self.db.disable_result_cache()
+        self.db.select(SimpleModel)
+        self.db.select(SimpleModel)
+        self.assertEqual(0, self.cache.stats().size)
+
+class TestDatabaseSession(CachingDBTestCase):
+    def test_session_returns_same_instances(self):
+        with self.db.session() as identity_map:
+            first = self.db.select(SimpleModel, model_id='1')[0]
+            self.assertIs(first, self.db.select(SimpleModel, integer_column=1)[0])
+            self.assertIs(first, list(self.db.iter_select(SimpleModel, model_id='1'))[0])
+            self.assertGreater(identity_map.stats().hits, 0)
+        self.assertIsNot(first, self.db.select(SimpleModel, model_id='1')[0])
+
+    def test_session_tracks_writes(self):
+        with self.db.session() as identity_map:
+            model = SimpleModel(model_id='9', integer_column=9, float_column=None)
+            self.db.insert(model)
+            self.assertIs(model, self.db.select(SimpleModel, model_id='9')[0])
+            self.db.delete(SimpleModel, model_id='9')
+            self.assertIsNone(identity_map.get('simple_model', ('9',)))
+
+    def test_session_ignores_failed_insert(self):
+        with self.db.session():
+            with self.assertRaises(Exception):
+                self.db.insert(SimpleModel(model_id='1', integer_column=999))
+            self.assertEqual(1, self.db.get(SimpleModel, '1')['integer_column'])
+            self.assertEqual(1, self.db.select(SimpleModel, model_id='1')[0]['integer_column'])
+
+    def test_session_ignores_update_of_missing_row(self):
+        with self.db.session() as identity_map:
+            self.assertEqual(0, self.db.update(SimpleModel(model_id='ghost', integer_column=5)))
+            self.assertEqual(0, self.db.update(SimpleModel(model_id='ghost')))
+            self.assertIsNone(identity_map.get('simple_model', ('ghost',)))
+            self.assertIsNone(self.db.get(SimpleModel, 'ghost'))
+
+            model = SimpleModel(model_id='2', integer_column=20, float_column=2.0)
+            self.assertEqual(1, self.db.update(model))
+            self.assertIs(model, self.db.get(SimpleModel, '2'))
+
+    def test_session_drops_partially_written_models(self):
+        with self.db.session() as identity_map:
+            loaded = self.db.get(SimpleModel, '2')
+            self.assertEqual(1, self.db.update(SimpleModel(model_id='2', integer_column=20)))
+            self.assertIsNone(identity_map.get('simple_model', ('2',)))
+            model = self.db.get(SimpleModel, '2')
+            self.assertIsNot(loaded, model)
+            self.assertEqual({'model_id' : '2', 'integer_column' : 20, 'float_column' : None}, dict(model))
+
+    def test_in_memory_databases_have_distinct_namespaces(self):
+        first, second = SQLiteDatabase(':memory:'), SQLiteDatabase(':memory:')
+        self.assertNotEqual(first.cache_namespace, second.cache_namespace)
+
+    def test_nested_sessions_share_map(self):
+        with self.db.session() as outer:
+            with self.db.session() as inner:
+                self.assertIs(outer, inner)
@@ -0,0 +1,42 @@
+from datetime import date, datetime
+import unittest
+import numpy as np
+from pyDBMS.database.columnar import ColumnArrayBuilder, column_array
+from pyDBMS.dbtype import Boolean, Date, DateTime, Float, Integer, String
+from .example_types import SimpleModel
+
+class TestColumnArray(unittest.TestCase):
+    def test_typed_arrays(self):
+        self.assertEqual(np.int64, column_array(Integer(), (1, 2)).dtype)
+        self.assertEqual(np.float64, column_array(Float(), (1.0, 2)).dtype)
+        self.assertEqual(np.bool_, column_array(Boolean(), (1, 0)).dtype)
+        self.assertEqual(object, column_array(String(), ('a', 'b')).dtype)
+
+    def test_datetime_arrays(self):
+        timestamps = column_array(DateTime(), ('2022-01-01 10:00:00', datetime(2022, 1, 2)))
+        self.assertEqual(np.dtype('datetime64[us]'), timestamps.dtype)
+        self.assertEqual(np.datetime64('2022-01-01T10:00:00'), timestamps[0])
+        dates = column_array(Date(), (date(2022, 1, 1),))
+        self.assertEqual(np.dtype('datetime64[D]'), dates.dtype)
+
+    def test_nulls(self):
+        self.assertTrue(np.isnan(column_array(Float(), (1.0, None))[1]))
+        self.assertTrue(np.isnat(column_array(DateTime(), (None,))[0]))
+        integers = column_array(Integer(), (1, None))
+        self.assertEqual(object, integers.dtype)
+        self.assertIsNone(integers[1])
+
+class TestColumnArrayBuilder(unittest.TestCase):
+    def test_build_from_chunks(self):
+        builder = ColumnArrayBuilder(SimpleModel, ['model_id', 'integer_column'])
+        builder.add_rows([('a', 1), ('b', 2)])
+        builder.add_rows([('c', 3)])
+        columns = builder.build()
+        self.assertEqual(['a', 'b', 'c'], list(columns['model_id']))
+        self.assertEqual([1, 2, 3], columns['integer_column'].tolist())
+        self.assertEqual(np.int64, columns['integer_column'].dtype)
+
+    def test_build_without_rows(self):
+        columns = ColumnArrayBuilder(SimpleModel, ['integer_column']).build()
+        self.assertEqual(0, len(columns['integer_column']))
+        self.assertEqual(np.int64, columns['integer_column'].dtype)
@@ -0,0 +1,268 @@
+import os, threading, unittest
+from time import sleep
+from pyDBMS.database.connections.connection_pool import ConnectionPool
+from pyDBMS.database.connections.db_connection import SQLiteDBConnection
+from pyDBMS.database.connections.sqlite_connection_pool import SQLiteConnectionPool
+from pyDBMS.database.sqlite_database import SQLiteDatabase
+from .example_types import SimpleModel
+DATABASE_NAME = 'tests/pool_test.db'
+
+class ConnectionPoolTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        if os.path.exists(DATABASE_NAME):
+            os.remove(DATABASE_NAME)
+        self.created = []
+
+    def tearDown(self) -> None:
+        for connection in self.created:
+            connection.close()
+        if os.path.exists(DATABASE_NAME):
+            os.remove(DATABASE_NAME)
+
+    def _factory(self):
+        connection = SQLiteDBConnection(DATABASE_NAME, check_same_thread=False)
+        self.created.append(connection)
+        return connection
+
+class TestConnectionPool(ConnectionPoolTestCase):
+    def test_min_size_connections_opened_up_front(self):
+        pool = ConnectionPool(self._factory, min_size=2, max_size=4)
+        self.assertEqual(2, len(self.created))
+        self.assertEqual(2, pool.stats().size)
+
+    def test_invalid_sizes(self):
+        with self.assertRaises(ValueError):
+            ConnectionPool(self._factory, min_size=3, max_size=2)
+
+    def test_acquire_and_release_reuses_connection(self):
+        pool = ConnectionPool(self._factory, min_size=0, max_size=2)
+        first = pool.acquire()
+        pool.release(first)
+        self.assertIs(first, pool.acquire())
+        self.assertEqual(1, len(self.created))
+
+    def test_acquire_timeout_when_exhausted(self):
+        pool = ConnectionPool(self._factory, min_size=0, max_size=1)
+        pool.acquire()
+        with self.assertRaises(TimeoutError):
+            pool.acquire(timeout=0.01)
+        self.assertEqual(1, pool.stats().timeouts)
+
+    def test_acquire_waits_for_release(self):
+        pool = ConnectionPool(self._factory, min_size=0, max_size=1)
+        connection = pool.acquire()
+        releaser = threading.Timer(0.05, pool.release, args=(connection,))
+        releaser.start()
+        self.assertIs(connection, pool.acquire(timeout=5))
+        releaser.join()
+        self.assertGreater(pool.stats().max_wait_time, 0)
+
+    def test_borrow_is_reentrant_per_thread(self):
+        pool = ConnectionPool(self._factory, min_size=0, max_size=2)
+        with pool.borrow() as outer:
+            with pool.borrow() as inner:
+                self.assertIs(outer, inner)
+            self.assertEqual(1, pool.stats().in_use)
+        self.assertEqual(0, pool.stats().in_use)
+
+    def test_pool_methods_require_borrow(self):
+        pool = ConnectionPool(self._factory, min_size=0, max_size=1)
+        with self.assertRaises(RuntimeError):
+            pool.execute('SELECT 1')
+        with pool.borrow():
+            self.assertEqual((1,), pool.execute('SELECT 1').fetchone())
+
+    def test_health_check_replaces_dead_connection(self):
+        pool = ConnectionPool(self._factory, min_size=1, max_size=1)
+        dead = self.created[0]
+        dead.close()
+        connection = pool.acquire()
+        self.assertIsNot(dead, connection)
+        self.assertTrue(connection.is_alive())
+
+    def test_idle_connections_expire(self):
+        pool = ConnectionPool(self._factory, min_size=0, max_size=2, idle_timeout=0.01)
+        first = pool.acquire()
+        pool.release(first)
+        sleep(0.02)
+        self.assertIsNot(first, pool.acquire())
+        self.assertEqual(1, pool.stats().size)
+
+    def test_stats_utilization(self):
+        pool = ConnectionPool(self._factory, min_size=0, max_size=4)
+        pool.acquire()
+        stats = pool.stats()
+        self.assertEqual(1, stats.in_use)
+        self.assertEqual(0.25, stats.utilization)
+        self.assertEqual(1, stats.acquisitions)
+
+    def test_closed_pool_rejects_acquire(self):
+        pool = ConnectionPool(self._factory, min_size=1, max_size=1)
+        pool.close()
+        self.assertEqual(0, pool.stats().size)
+        with self.assertRaises(RuntimeError):
+            pool.acquire()
+
+class TestPooledDatabase(ConnectionPoolTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.db = SQLiteDatabase(DATABASE_NAME)
+        self.db.db_connection = ConnectionPool(self._factory, min_size=0, max_size=4)
+        self.db.create_model(SimpleModel)
+
+    def test_insert_and_select(self):
+        self.db.insert([SimpleModel(model_id=f'test_id{i}') for i in range(10)])
+        self.assertEqual(10, len(self.db.select(SimpleModel)))
+        self.assertEqual(0, self.db.db_connection.stats().in_use)
+
+    def test_interleaved_streams_use_own_connections(self):
+        self.db.insert([SimpleModel(model_id=f'test_id{i}') for i in range(4)])
+        pool = self.db.db_connection
+        outer = self.db.iter_select(SimpleModel, chunk_size=1)
+        inner = self.db.iter_select(SimpleModel, chunk_size=1)
+        next(outer)
+        next(inner)
+        self.assertEqual(2, pool.stats().in_use)
+        self.assertEqual(3, len(list(outer)))
+        self.assertEqual(1, pool.stats().in_use)
+        self.assertEqual(3, len(list(inner)))
+        self.assertEqual(0, pool.stats().in_use)
+
+    def test_operations_inside_stream_use_another_connection(self):
+        self.db.insert([SimpleModel(model_id=f'test_id{i}') for i in range(3)])
+        pool = self.db.db_connection
+        for model in self.db.iter_select(SimpleModel, chunk_size=1):
+            # a commit here must not end the stream's cursor
+            with pool.borrow(write=True):
+                self.assertEqual(2, pool.stats().in_use)
+            self.assertEqual([model], self.db.select(SimpleModel, model_id=model['model_id']))
+        self.assertEqual(0, pool.stats().in_use)
+
+    def test_concurrent_selects(self):
+        self.db.insert(SimpleModel(model_id='test_id'))
+        errors = []
+        def worker():
+            try:
+                for _ in range(20):
+                    assert len(self.db.select(SimpleModel, model_id='test_id')) == 1
+            except Exception as e:
+                errors.append(e)
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual([], errors)
+        self.assertLessEqual(self.db.db_connection.stats().size, 4)
+
+class TestSQLiteConnectionPool(ConnectionPoolTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.db = SQLiteDatabase(DATABASE_NAME, pool_options={'write_timeout' : 5})
+        self.db.create_model(SimpleModel)
+
+    def tearDown(self) -> None:
+        self.db.db_connection.close()
+        for suffix in ('-wal', '-shm'):
+            if os.path.exists(DATABASE_NAME + suffix):
+                os.remove(DATABASE_NAME + suffix)
+        super().tearDown()
+
+    def _in_thread(self, target):
+        result = []
+        thread = threading.Thread(target=lambda: result.append(target()))
+        thread.start()
+        thread.join()
+        return result[0]
+
+    def test_in_memory_database_rejected(self):
+        with self.assertRaises(ValueError):
+            SQLiteConnectionPool(':memory:')
+
+    def test_wal_and_pragmas_applied(self):
+        pool = self.db.db_connection
+        with pool.borrow() as conn:
+            self.assertEqual('wal', conn.execute('PRAGMA journal_mode').fetchone()[0])
+            self.assertEqual(1, conn.execute('PRAGMA synchronous').fetchone()[0])
+            self.assertEqual(5000, conn.execute('PRAGMA busy_timeout').fetchone()[0])
+            self.assertEqual(-64000, conn.execute('PRAGMA cache_size').fetchone()[0])
+
+    def test_threads_read_on_own_connections(self):
+        pool = self.db.db_connection
+        def reader():
+            with pool.borrow() as conn:
+                return conn
+        own = reader()
+        self.assertIs(own, reader())
+        self.assertIsNot(own, self._in_thread(reader))
+        with pool.borrow(write=True) as writer:
+            self.assertIsNot(own, writer)
+
+    def test_operations_inside_write_share_writer(self):
+        pool = self.db.db_connection
+        with pool.borrow(write=True) as writer:
+            with pool.borrow() as conn:
+                self.assertIs(writer, conn)
+            with pool.borrow(write=True) as conn:
+                self.assertIs(writer, conn)
+
+    def test_unshared_borrow_reads_outside_write(self):
+        pool = self.db.db_connection
+        with pool.borrow(write=True) as writer:
+            with pool.borrow(share=False) as conn:
+                self.assertIsNot(writer, conn)
+                self.assertIs(pool._reader(), conn)
+        with self.assertRaises(ValueError):
+            with pool.borrow(write=True, share=False):
+                pass
+
+    def test_stream_started_in_transaction_outlives_it(self):
+        self.db.insert([SimpleModel(model_id=f'test_id{i}') for i in range(3)])
+        with self.db.transaction():
+            stream = self.db.iter_select(SimpleModel, chunk_size=1)
+            next(stream)
+        self.assertEqual(2, len(list(stream)))
+
+    def test_uncommitted_write_discarded_on_release(self):
+        pool = self.db.db_connection
+        with pool.borrow(write=True) as conn:
+            conn.execute("INSERT INTO simple_model (model_id) VALUES ('test_id')")
+        self.assertEqual([], self.db.select(SimpleModel))
+
+    def test_writer_held_for_transaction(self):
+        pool = self.db.db_connection
+        pool.write_timeout = 0.1
+        def insert():
+            try:
+                self.db.insert(SimpleModel(model_id='other'))
+            except TimeoutError as e:
+                return e
+        with self.db.transaction():
+            self.db.insert(SimpleModel(model_id='test_id'))
+            self.assertIsInstance(self._in_thread(insert), TimeoutError)
+            # readers on other threads do not see the open transaction
+            self.assertEqual(0, self._in_thread(lambda: len(self.db.select(SimpleModel))))
+        self.assertIsNone(self._in_thread(insert))
+        self.assertEqual(2, len(self.db.select(SimpleModel)))
+
+    def test_concurrent_reads_and_writes(self):
+        errors = []
+        def writer(n):
+            try:
+                for i in range(25):
+                    self.db.insert(SimpleModel(model_id=f'test_id{n}_{i}'))
+            except Exception as e:
+                errors.append(e)
+        def reader():
+            try:
+                for _ in range(25):
+                    self.db.select(SimpleModel)
+            except Exception as e:
+                errors.append(e)
+        threads = [threading.Thread(target=writer, args=(n,)) for n in range(4)] + [threading.Thread(target=reader) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual([], errors)
+        self.assertEqual(100, len(self.db.select(SimpleModel)))
@@ -7,10 +7,11 @@ from sqlite3 import connect
 from crate import client
 from pyDBMS.database.abstract_database import AbstractDatabase
 from pyDBMS.database.crate_database import CrateDatabase
-from .example_types import CharNModel, LogTimestamp, NoPrimaryKeyModel, NonNullableModel, SimpleChildModel, SimpleModel, SimpleTextModel, SpecialDate
+from pyDBMS.database.filters import Q
+from .example_types import CharNModel, CompositeKeyModel, IndexedModel, LogTimestamp, NoPrimaryKeyModel, NonNullableModel, SimpleChildModel, SimpleModel, SimpleTextModel, SpecialDate
 from pyDBMS.database.sqlite_database import SQLiteDatabase
 from pyDBMS.database.connections.db_connection import SQLiteDBConnection, SQLiteDBCursor
-from pyDBMS.dbtype import DynamicModel, Float, Integer, Model, String
+from pyDBMS.dbtype import CompactRow, DynamicModel, Float, Integer, Model, String
 DATABASE_NAME = 'tests/simple_test.db'
 
 class TestAbstractDB(unittest.TestCase):
@@ -101,6 +102,43 @@ class TestSQLiteDatabase(SQLiteDBTestCase):
         self.assertSetEqual(set(model.fields), {'model_id', 'integer_column', 'float_column'})
         self.assertTrue(self.db.model_exists(model))
 
+    def test_schema_loaded_once_for_catalog_calls(self):
+        loads = []
+        load_schema = self.db._load_schema
+        self.db._load_schema = lambda: loads.append(1) or load_schema()
+        self.db.get_tables()
+        self.db.model_exists(SimpleModel)
+        self.db.get_model_meta('simple_model')
+        self.assertEqual(1, len(loads))
+
+    def test_schema_cache_invalidation(self):
+        self.assertNotIn('other_table', self.db.get_tables())
+        self.conn.execute('CREATE TABLE other_table (model_id TEXT)')
+        self.conn.commit()
+        self.assertNotIn('other_table', self.db.get_tables())
+        self.db.schema_cache.invalidate()
+        self.assertIn('other_table', self.db.get_tables())
+
+    def test_schema_cache_disabled_with_zero_ttl(self):
+        self.db.schema_cache.ttl = 0
+        self.db.get_tables()
+        self.conn.execute('CREATE TABLE other_table (model_id TEXT)')
+        self.conn.commit()
+        self.assertIn('other_table', self.db.get_tables())
+
+    def test_create_model_updates_schema_cache(self):
+        self.assertFalse(self.db.model_exists(SimpleChildModel))
+        self.db.create_model(SimpleChildModel)
+        self.assertTrue(self.db.model_exists(SimpleChildModel))
+
+    def test_get_model_meta_returns_new_instances(self):
+        first = self.db.get_model_meta('simple_model')
+        first['model_id'] = 'test_id'
+        second = self.db.get_model_meta('simple_model')
+        self.assertIs(type(first), type(second))
+        self.assertEqual({}, dict(second))
+        self.assertEqual(['model_id'], second.__primary_keys__)
+
     def test_model_insert(self):
         self.db.create_model(SimpleChildModel())
         self.assertTrue(self.db.model_exists(SimpleChildModel()))
@@ -132,6 +170,32 @@ class TestSQLiteDatabase(SQLiteDBTestCase):
         self.assertEqual(1, len(results))
         self.assertEqual(results[0][0], 'test_id')
 
+    def test_insert_list_of_models(self):
+        models = [SimpleModel(model_id=f'test_id{i}', integer_column=i) for i in range(25)]
+        stats = self.db.insert(models, batch_size=10)
+        self.assertEqual(25, stats.rows)
+        self.assertGreater(stats.rows_per_second, 0)
+        results = self.conn.execute('select model_id, integer_column from simple_model order by integer_column').fetchall()
+        self.assertEqual(25, len(results))
+        self.assertEqual(('test_id24', 24), results[-1])
+
+    def test_insert_list_of_mixed_models(self):
+        self.db.create_model(SimpleTextModel)
+        self.db.insert([SimpleModel(model_id='test_id'), SimpleTextModel(model_id='12345', boolean_column=True), SimpleModel(model_id='test_id2')])
+        self.assertEqual(2, len(self.conn.execute('select * from simple_model').fetchall()))
+        self.assertEqual(1, len(self.conn.execute('select * from simple_text_model').fetchall()))
+
+    def test_insert_list_with_invalid_element(self):
+        with self.assertRaises(TypeError):
+            self.db.insert([SimpleModel(model_id='test_id'), 100])
+        self.assertEqual(0, len(self.conn.execute('select * from simple_model').fetchall()))
+
+    def test_insert_with_multi_row_values(self):
+        self.db.multi_row_insert = True
+        self.db.max_query_params = 7
+        self.db.insert([SimpleModel(model_id=f'test_id{i}', integer_column=i) for i in range(5)])
+        self.assertEqual(5, len(self.conn.execute('select * from simple_model').fetchall()))
+
     def test_select_model_with_single_kwarg(self):
         self._insert_empty_test_model()
         results = self.db.select(SimpleModel, model_id='test_id')
@@ -156,6 +220,15 @@ class TestSQLiteDatabase(SQLiteDBTestCase):
 
         results = self.db.select(dyn_model)
         self.assertEqual(1, len(results))
+
+    def test_select_with_dynamic_model_returns_new_objects(self):
+        self._insert_empty_test_model()
+        self._insert_empty_test_model('test_id2')
+        dyn_model = DynamicModel('simple_model', {'model_id' : String(), 'integer_column' : Integer(), 'float_column' : Float()}, 'model_id')
+
+        results = self.db.select(dyn_model)
+        self.assertEqual(['test_id', 'test_id2'], sorted([x['model_id'] for x in results]))
+        self.assertIsNot(results[0], dyn_model)
     
     def test_insert_with_dynamic_model(self):
         dyn_model = DynamicModel('simple_model', {'model_id' : String(), 'integer_column' : Integer(), 'float_column' : Float()}, 'model_id', model_id = 'test_id')
@@ -164,6 +237,12 @@ class TestSQLiteDatabase(SQLiteDBTestCase):
 
         self.assertEqual(len(self.db.select(dyn_model)),1)
 
+    def test_select_model_with_quote_in_value(self):
+        self._insert_empty_test_model("o'brien")
+        results = self.db.select(SimpleModel, model_id="o'brien")
+        self.assertEqual(1, len(results))
+        self.assertEqual(results[0]['model_id'], "o'brien")
+
     def test_select_model_with_null(self):
         self._insert_empty_test_model()
         results = self.db.select(SimpleModel, float_column=None)
@@ -190,6 +269,252 @@ class TestSQLiteDatabase(SQLiteDBTestCase):
         self.assertEqual(2, len(results))
         self.assertEqual(['test_id','test_id2'], returned_ids)
 
+    def test_iter_select_yields_all_models(self):
+        for i in range(5):
+            self._insert_empty_test_model(f'test_id{i}', i)
+        results = self.db.iter_select(SimpleModel, chunk_size=2)
+        self.assertNotIsInstance(results, list)
+        self.assertEqual([f'test_id{i}' for i in range(5)], sorted([x['model_id'] for x in results]))
+
+    def test_iter_select_with_kwargs(self):
+        self._insert_empty_test_model()
+        self._insert_empty_test_model('test_id2', 200, 1.0)
+        results = list(self.db.iter_select(SimpleModel, chunk_size=1, float_column=1.0))
+        self.assertEqual(1, len(results))
+        self.assertIsInstance(results[0], SimpleModel)
+        self.assertEqual('test_id2', results[0]['model_id'])
+
+    def test_select_compact_rows(self):
+        self._insert_empty_test_model('test_id', 100, 1.0)
+        results = self.db.select(SimpleModel, rows='compact', model_id='test_id')
+        self.assertEqual(1, len(results))
+        self.assertIsInstance(results[0], CompactRow)
+        self.assertEqual(100, results[0].integer_column)
+        self.assertEqual(self.db.select(SimpleModel, model_id='test_id'), [results[0].to_model()])
+
+    def test_iter_select_compact_rows(self):
+        for i in range(5):
+            self._insert_empty_test_model(f'test_id{i}', i)
+        results = list(self.db.iter_select(SimpleModel, chunk_size=2, rows='compact'))
+        self.assertEqual(list(range(5)), sorted([x['integer_column'] for x in results]))
+        self.assertIs(type(results[0]), type(results[-1]))
+
+    def test_select_with_invalid_rows(self):
+        with self.assertRaises(ValueError):
+            self.db.select(SimpleModel, rows='tuple')
+
+    def test_get(self):
+        self._insert_empty_test_model('test_id', 100, 1.0)
+        model = self.db.get(SimpleModel, 'test_id')
+        self.assertIsInstance(model, SimpleModel)
+        self.assertEqual(100, model['integer_column'])
+        self.assertIsNone(self.db.get(SimpleModel, 'missing'))
+
+    def test_get_many_in_key_order(self):
+        for i in range(10):
+            self._insert_empty_test_model(f'test_id{i}', i)
+        models = self.db.get_many(SimpleModel, ['test_id7', 'missing', 'test_id2', 'test_id5'], chunk_size=2)
+        self.assertEqual([7, 2, 5], [m['integer_column'] for m in models])
+
+    def test_get_many_composite_keys(self):
+        self.db.create_model(CompositeKeyModel)
+        self.db.insert([CompositeKeyModel(region=r, model_id=i, value=float(i)) for r in ('eu', 'us') for i in range(3)])
+        models = self.db.get_many(CompositeKeyModel, [('us', 2), ('eu', '1')])
+        self.assertEqual([('us', 2), ('eu', 1)], [(m['region'], m['model_id']) for m in models])
+        with self.assertRaises(ValueError):
+            self.db.get(CompositeKeyModel, 'eu')
+
+    def test_get_without_primary_keys(self):
+        with self.assertRaises(ValueError):
+            self.db.get(NoPrimaryKeyModel, 'a')
+
+    def test_get_many_uses_identity_map(self):
+        self._insert_empty_test_model('test_id', 100, 1.0)
+        with self.db.session() as identity_map:
+            first = self.db.get(SimpleModel, 'test_id')
+            self.assertIs(first, self.db.get_many(SimpleModel, ['test_id'])[0])
+            self.assertEqual(1, identity_map.stats().hits)
+
+    def test_select_fields(self):
+        for i in range(3):
+            self._insert_empty_test_model(str(i), i, float(i))
+        results = self.db.select(SimpleModel, fields=['model_id', 'integer_column'], integer_column__gte=1)
+        self.assertEqual([{'model_id' : '1', 'integer_column' : 1}, {'model_id' : '2', 'integer_column' : 2}], sorted(results, key=lambda m: m['model_id']))
+        self.assertIsInstance(results[0], SimpleModel)
+
+    def test_select_fields_compact_and_streaming(self):
+        for i in range(3):
+            self._insert_empty_test_model(str(i), i, float(i))
+        rows = self.db.select(SimpleModel, rows='compact', fields=['float_column'])
+        self.assertEqual(['float_column'], rows[0].keys())
+        results = list(self.db.iter_select(SimpleModel, chunk_size=2, fields='integer_column'))
+        self.assertEqual([0, 1, 2], sorted(m['integer_column'] for m in results))
+        self.assertEqual([['integer_column']] * 3, [list(m) for m in results])
+        columns = self.db.select_arrays(SimpleModel, fields=['integer_column'])
+        self.assertEqual(['integer_column'], list(columns))
+
+    def test_select_fields_bypasses_identity_map(self):
+        self._insert_empty_test_model('test_id', 100, 1.0)
+        with self.db.session() as identity_map:
+            partial = self.db.select(SimpleModel, fields=['model_id'])[0]
+            full = self.db.select(SimpleModel)[0]
+            self.assertIsNot(partial, full)
+            self.assertEqual(1.0, full['float_column'])
+            self.assertEqual(1, len(identity_map))
+
+    def test_select_unknown_fields(self):
+        with self.assertRaises(AssertionError):
+            self.db.select(SimpleModel, fields=['missing_column'])
+        with self.assertRaises(ValueError):
+            self.db.select(SimpleModel, fields=[])
+
+    def test_select_pages(self):
+        for i in range(7):
+            self._insert_empty_test_model(str(i), i % 3, float(i))
+        pages = []
+        page = self.db.select(SimpleModel, order_by=['-integer_column'], limit=3)
+        while page:
+            pages.append([m['model_id'] for m in page])
+            page = self.db.select(SimpleModel, order_by=['-integer_column'], limit=3, after=page[-1])
+        self.assertEqual([['2', '5', '1'], ['4', '0', '3'], ['6']], pages)
+
+    def test_select_pages_with_nulls_in_sort_column(self):
+        for i in range(8):
+            self._insert_empty_test_model(str(i), i, None if i < 3 else float(i % 4))
+        for order_by, expected in [('float_column', ['4', '5', '6', '3', '7', '0', '1', '2']), ('-float_column', ['0', '1', '2', '3', '7', '6', '5', '4'])]:
+            ids = []
+            page = self.db.select(SimpleModel, order_by=order_by, limit=2)
+            while page:
+                ids.extend([m['model_id'] for m in page])
+                page = self.db.select(SimpleModel, order_by=order_by, limit=2, after=page[-1])
+            self.assertEqual(expected, ids)
+
+    def test_select_pages_with_filters_and_compact_rows(self):
+        for i in range(6):
+            self._insert_empty_test_model(str(i), i, float(i))
+        first = self.db.select(SimpleModel, rows='compact', order_by='float_column', limit=2, integer_column__gte=1)
+        self.assertEqual(['1', '2'], [m.model_id for m in first])
+        second = list(self.db.iter_select(SimpleModel, order_by='float_column', limit=2, after=first[-1], integer_column__gte=1))
+        self.assertEqual(['3', '4'], [m['model_id'] for m in second])
+
+    def test_select_invalid_limit(self):
+        with self.assertRaises(ValueError):
+            self.db.select(SimpleModel, limit=-1)
+        with self.assertRaises(AssertionError):
+            self.db.select(SimpleModel, order_by=['-missing_column'])
+
+    def test_count_and_exists(self):
+        for i in range(5):
+            self._insert_empty_test_model(str(i), i, float(i))
+        self.assertEqual(5, self.db.count(SimpleModel))
+        self.assertEqual(2, self.db.count(SimpleModel, integer_column__gte=3))
+        self.assertTrue(self.db.exists(SimpleModel, model_id='4'))
+        self.assertFalse(self.db.exists(SimpleModel, model_id='5'))
+
+    def test_aggregate(self):
+        self.db.create_model(CompositeKeyModel)
+        self.db.insert([CompositeKeyModel(region=region, model_id=i, value=float(i)) for region in ['eu', 'us'] for i in range(4)])
+        result = self.db.aggregate(CompositeKeyModel, sum='value', min='region', count='*')
+        self.assertEqual({'count' : 8, 'sum_value' : 12.0, 'min_region' : 'eu'}, result)
+        result = self.db.aggregate(CompositeKeyModel, group_by=['region'], max=['model_id'], avg='value', model_id__lt=3)
+        self.assertEqual([{'region' : 'eu', 'max_model_id' : 2, 'avg_value' : 1.0}, {'region' : 'us', 'max_model_id' : 2, 'avg_value' : 1.0}], result)
+
+    def test_aggregate_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            self.db.aggregate(SimpleModel)
+        with self.assertRaises(AssertionError):
+            self.db.aggregate(SimpleModel, sum='missing_column')
+        with self.assertRaises(AssertionError):
+            self.db.aggregate(SimpleModel, max='*')
+
+    def test_create_model_creates_indexes(self):
+        self.db.create_model(IndexedModel)
+        indexes = self.db._load_indexes('indexed_model')
+        self.assertEqual((('region', 'value'), False), indexes['indexed_model_region_value_idx'])
+        self.assertEqual((('region',), True), indexes['positive_region'])
+        self.assertEqual([], self.db.missing_indexes(IndexedModel))
+
+    def test_missing_indexes(self):
+        self.conn.execute('CREATE TABLE indexed_model (model_id TEXT PRIMARY KEY, region TEXT, value FLOAT, timestamp TIMESTAMP)')
+        self.conn.execute('CREATE INDEX other_name ON indexed_model (timestamp)')
+        self.conn.commit()
+        self.assertEqual(['indexed_model_region_value_idx', 'positive_region'],
+            [x.index_name('indexed_model') for x in self.db.missing_indexes(IndexedModel)])
+        self.db.create_indexes(IndexedModel)
+        self.assertEqual([], self.db.missing_indexes(IndexedModel))
+
+    def test_select_timestamp_range(self):
+        self.db.create_model(LogTimestamp)
+        start = datetime(2024, 1, 1)
+        self.db.insert([LogTimestamp(model_id=str(i), timestamp=start.replace(hour=i)) for i in range(10)])
+        result = self.db.select(LogTimestamp, timestamp__gte=start.replace(hour=3), timestamp__lt=start.replace(hour=6))
+        self.assertEqual(['3', '4', '5'], sorted(m['model_id'] for m in result))
+
+    def test_select_with_q_expression(self):
+        for i in range(10):
+            self._insert_empty_test_model(str(i), i, None if i % 2 else float(i))
+        result = self.db.select(SimpleModel, where=Q(integer_column__lt=2) | ~Q(integer_column__lte=7))
+        self.assertEqual(['0', '1', '8', '9'], sorted(m['model_id'] for m in result))
+        result = self.db.select(SimpleModel, where=Q(float_column__isnull=True) & Q(integer_column__gt=4))
+        self.assertEqual(['5', '7', '9'], sorted(m['model_id'] for m in result))
+
+    def test_select_with_unknown_lookup_field(self):
+        with self.assertRaises(AssertionError):
+            self.db.select(SimpleModel, where=Q(missing_column__gt=1))
+
+    def test_delete_with_lookup(self):
+        for i in range(5):
+            self._insert_empty_test_model(str(i), i, float(i))
+        self.db.delete(SimpleModel, integer_column__gte=2)
+        self.assertEqual(['0', '1'], sorted(m['model_id'] for m in self.db.select(SimpleModel)))
+
+    def test_upsert_inserts_and_updates(self):
+        self._insert_empty_test_model('test_id', 100, 1.0)
+        stats = self.db.upsert([SimpleModel(model_id='test_id', integer_column=5, float_column=2.0), SimpleModel(model_id='new_id', integer_column=6)])
+        self.assertEqual(2, stats.rows)
+        models = {m['model_id'] : m for m in self.db.select(SimpleModel)}
+        self.assertEqual(5, models['test_id']['integer_column'])
+        self.assertEqual(2.0, models['test_id']['float_column'])
+        self.assertEqual(6, models['new_id']['integer_column'])
+
+    def test_upsert_multi_row_keeps_last_duplicate(self):
+        self.db.multi_row_insert = True
+        self.db.upsert([SimpleModel(model_id=str(i % 3), integer_column=i) for i in range(9)], batch_size=4)
+        self.assertEqual({'0' : 6, '1' : 7, '2' : 8}, {m['model_id'] : m['integer_column'] for m in self.db.select(SimpleModel)})
+
+    def test_upsert_composite_keys(self):
+        self.db.create_model(CompositeKeyModel)
+        self.db.upsert(CompositeKeyModel(region='eu', model_id=1, value=1.0))
+        self.db.upsert([CompositeKeyModel(region='eu', model_id=1, value=2.0), CompositeKeyModel(region='us', model_id=1, value=3.0)])
+        self.assertEqual([2.0, 3.0], [m['value'] for m in self.db.get_many(CompositeKeyModel, [('eu', 1), ('us', 1)])])
+
+    def test_upsert_without_primary_keys(self):
+        with self.assertRaises(ValueError):
+            self.db.upsert(NoPrimaryKeyModel())
+
+    def test_iter_select_without_results(self):
+        self.assertEqual([], list(self.db.iter_select(SimpleModel)))
+
+    def test_select_arrays(self):
+        for i in range(5):
+            self._insert_empty_test_model(f'test_id{i}', i, float(i))
+        columns = self.db.select_arrays(SimpleModel, chunk_size=2)
+        self.assertEqual(sorted(['model_id', 'integer_column', 'float_column']), sorted(columns))
+        self.assertEqual(list(range(5)), sorted(columns['integer_column'].tolist()))
+        self.assertEqual('int64', columns['integer_column'].dtype.name)
+        self.assertEqual('float64', columns['float_column'].dtype.name)
+
+    def test_select_arrays_with_kwargs_and_datetime(self):
+        self.db.create_model(LogTimestamp)
+        self.db.insert([LogTimestamp(model_id='a', timestamp='2022-01-01 10:00:00'), LogTimestamp(model_id='b', timestamp='2022-01-02')])
+        columns = self.db.select_arrays(LogTimestamp, model_id='a')
+        self.assertEqual(1, len(columns['timestamp']))
+        self.assertEqual('datetime64[us]', columns['timestamp'].dtype.name)
+
+    def test_select_arrays_without_results(self):
+        columns = self.db.select_arrays(SimpleModel)
+        self.assertEqual(0, len(columns['integer_column']))
+
     def test_delete_without_kwargs(self):
         self._insert_empty_test_model()
         self.db.delete(SimpleModel,False)
@@ -199,6 +524,14 @@ class TestSQLiteDatabase(SQLiteDBTestCase):
         results = self.conn.execute('select * from simple_model').fetchall()
         self.assertEqual(len(results), 0)
 
+    def test_delete_with_empty_where(self):
+        self._insert_empty_test_model()
+        self.db.delete(SimpleModel, where=None)
+        self.db.delete(SimpleModel, where=Q())
+        self.assertEqual(1, len(self.conn.execute('select * from simple_model').fetchall()))
+        self.db.delete(SimpleModel, True, where=Q())
+        self.assertEqual(0, len(self.conn.execute('select * from simple_model').fetchall()))
+
     def test_delete_with_single_kwarg(self):
         self._insert_empty_test_model()
         self._insert_empty_test_model('test_id2',200,1.0)
@@ -228,6 +561,23 @@ class TestSQLiteDatabase(SQLiteDBTestCase):
         for result in results:
             self.assertEqual(200,result[0])
         
+    def test_update_multiple_returns_total_affected_rows(self):
+        for i in range(5):
+            self._insert_empty_test_model(f'test_id{i}', i)
+        models = [SimpleModel(model_id=f'test_id{i}', integer_column=i * 10, float_column=1.0) for i in range(5)]
+        models.append(SimpleModel(model_id='missing_id', integer_column=1))
+        self.assertEqual(5, self.db.update(models))
+        results = self.conn.execute('select integer_column, float_column from simple_model order by integer_column').fetchall()
+        self.assertEqual([(i * 10, 1.0) for i in range(5)], results)
+
+    def test_update_multiple_mixed_models(self):
+        self.db.create_model(SimpleTextModel)
+        self._insert_empty_test_model()
+        self.db.insert(SimpleTextModel(model_id='12345', boolean_column=False))
+        affected_rows = self.db.update([SimpleModel(model_id='test_id', integer_column=5), SimpleTextModel(model_id='12345', boolean_column=True), 100])
+        self.assertEqual(2, affected_rows)
+        self.assertTrue(self.db.select(SimpleTextModel)[0]['boolean_column'])
+
     def test_insert_charn_model_and_insert(self):
         self.db.create_model(CharNModel)
         self.assertIn('charn_model',self.db.get_tables())
@@ -277,6 +627,57 @@ class TestSQLiteDatabase(SQLiteDBTestCase):
         self.assertEqual(model['timestamp'], result['timestamp'])
 
 
+    def test_transaction_commits_on_exit(self):
+        with self.db.transaction():
+            self.db.insert(SimpleModel(model_id='test_id'))
+            self.db.update(SimpleModel(model_id='test_id', integer_column=5))
+            self.assertTrue(self.db.in_transaction())
+            self.assertEqual(0, len(self.conn.execute('select * from simple_model').fetchall()))
+        self.assertFalse(self.db.in_transaction())
+        self.assertEqual([(5,)], self.conn.execute('select integer_column from simple_model').fetchall())
+
+    def test_transaction_rolls_back_on_exception(self):
+        with self.assertRaises(RuntimeError):
+            with self.db.transaction():
+                self.db.insert(SimpleModel(model_id='test_id'))
+                raise RuntimeError()
+        self.assertEqual(0, len(self.db.select(SimpleModel)))
+
+    def test_nested_transaction_rolls_back_to_savepoint(self):
+        with self.db.transaction():
+            self.db.insert(SimpleModel(model_id='test_id'))
+            with self.assertRaises(RuntimeError):
+                with self.db.transaction():
+                    self.db.insert(SimpleModel(model_id='test_id2'))
+                    raise RuntimeError()
+            with self.db.transaction():
+                self.db.insert(SimpleModel(model_id='test_id3'))
+        self.assertEqual(['test_id', 'test_id3'], sorted([x['model_id'] for x in self.db.select(SimpleModel)]))
+
+    def test_unit_of_work_flushes_on_exit(self):
+        self._insert_empty_test_model()
+        self._insert_empty_test_model('test_id2')
+        with self.db.unit_of_work() as uow:
+            uow.add([SimpleModel(model_id='test_id3'), SimpleModel(model_id='test_id4')])
+            uow.update(SimpleModel(model_id='test_id', integer_column=5))
+            uow.delete(SimpleModel(model_id='test_id2'))
+            self.assertEqual(4, uow.pending())
+            self.assertEqual(2, len(self.conn.execute('select * from simple_model').fetchall()))
+        results = {x['model_id'] : x['integer_column'] for x in self.db.select(SimpleModel)}
+        self.assertEqual({'test_id' : 5, 'test_id3' : None, 'test_id4' : None}, results)
+
+    def test_unit_of_work_discarded_on_exception(self):
+        with self.assertRaises(RuntimeError):
+            with self.db.unit_of_work() as uow:
+                uow.add(SimpleModel(model_id='test_id'))
+                raise RuntimeError()
+        self.assertEqual(0, len(self.db.select(SimpleModel)))
+
+    def test_unit_of_work_delete_without_primary_key(self):
+        with self.db.unit_of_work() as uow:
+            with self.assertRaises(ValueError):
+                uow.delete(NoPrimaryKeyModel(model_id='test_id'))
+
     def test_invalid_type_for_update(self):
         self.assertEqual(0, self.db.update(100))
         
@@ -52,4 +52,21 @@ class SpecialDate(Model):
     __primary_keys__ = 'model_id'
 
     model_id = String()
-    timestamp = Date()    
\ No newline at end of file
+    timestamp = Date()    
+class CompositeKeyModel(Model):
+    __table_name__ = 'composite_key_model'
+    __primary_keys__ = ['region', 'model_id']
+
+    region = String()
+    model_id = Integer()
+    value = Float()
+
+class IndexedModel(Model):
+    __table_name__ = 'indexed_model'
+    __primary_keys__ = 'model_id'
+    __indexes__ = [('timestamp',), ('region', 'value'), Index('region', unique=True, where='value > 0', name='positive_region')]
+
+    model_id = String()
+    region = String()
+    value = Float()
+    timestamp = DateTime()
@@ -0,0 +1,19 @@
+import subprocess, sys, unittest
+
+OPTIONAL_DEPENDENCIES = ['psycopg2', 'crate', 'numpy']
+
+class TestImport(unittest.TestCase):
+    # seconds allowed for `import pyDBMS` in a fresh interpreter
+    IMPORT_TIME_BUDGET = 0.25
+
+    def _run(self, code):
+        return subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+
+    def test_import_does_not_load_optional_dependencies(self):
+        loaded = self._run(f'import sys, pyDBMS; print(",".join([m for m in {OPTIONAL_DEPENDENCIES} if m in sys.modules]))')
+        self.assertEqual('', loaded.strip())
+
+    def test_import_time_budget(self):
+        code = 'import time; start = time.perf_counter(); import pyDBMS; print(time.perf_counter() - start)'
+        best = min([float(self._run(code)) for _ in range(3)])
+        self.assertLess(best, self.IMPORT_TIME_BUDGET)
@@ -0,0 +1,124 @@
+import os, unittest
+from pyDBMS.database.connections.connection_pool import ConnectionPool
+from pyDBMS.database.connections.db_connection import InstrumentedCursor, SQLiteDBConnection
+from pyDBMS.database.instrumentation import LatencyHistogram, QueryHook, RowCounter, SlowQueryLog, statement_shape
+from pyDBMS.database.sqlite_database import SQLiteDatabase
+from .example_types import SimpleModel
+DATABASE_NAME = 'tests/instrumentation_test.db'
+
+class RecordingHook(QueryHook):
+    def __init__(self) -> None:
+        self.before = []
+        self.after = []
+        self.fetched = []
+
+    def before_execute(self, sql, params):
+        self.before.append((sql, params))
+
+    def after_execute(self, event):
+        self.after.append(event)
+
+    def rows_fetched(self, sql, count):
+        self.fetched.append((sql, count))
+
+class InstrumentationTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        if os.path.exists(DATABASE_NAME):
+            os.remove(DATABASE_NAME)
+        self.db = SQLiteDatabase(DATABASE_NAME)
+        self.db.create_model(SimpleModel)
+
+    def tearDown(self) -> None:
+        if os.path.exists(DATABASE_NAME):
+            os.remove(DATABASE_NAME)
+
+class TestQueryHooks(InstrumentationTestCase):
+    def test_no_hooks_leaves_connection_uninstrumented(self):
+        conn = self.db.db_connection
+        self.assertNotIn('execute', vars(conn))
+        self.assertNotIsInstance(conn.execute('SELECT 1'), InstrumentedCursor)
+
+    def test_hooks_receive_statements(self):
+        hook = RecordingHook()
+        self.db.add_hook(hook)
+        self.db.insert([SimpleModel(model_id='a'), SimpleModel(model_id='b')])
+        self.db.select(SimpleModel, model_id='a')
+
+        self.assertEqual(2, len(hook.before))
+        insert, select = hook.after
+        self.assertTrue(insert.many)
+        self.assertEqual(2, insert.rowcount)
+        self.assertEqual(['a'], select.params)
+        self.assertGreaterEqual(select.seconds, 0)
+        self.assertEqual([(select.sql, 1)], hook.fetched)
+
+    def test_hooks_receive_errors(self):
+        hook = RecordingHook()
+        self.db.add_hook(hook)
+        with self.assertRaises(Exception):
+            self.db.db_connection.execute('SELECT * FROM missing_table')
+        self.assertIsNotNone(hook.after[0].error)
+
+    def test_cursor_statements_and_fetches_are_reported(self):
+        hook = RecordingHook()
+        self.db.add_hook(hook)
+        self.db.insert([SimpleModel(model_id=str(i)) for i in range(5)])
+        models = list(self.db.iter_select(SimpleModel, chunk_size=2))
+        self.assertEqual(5, len(models))
+        self.assertEqual(5, sum(count for _, count in hook.fetched))
+
+    def test_remove_hook_restores_connection(self):
+        hook = RecordingHook()
+        self.db.add_hook(hook)
+        self.db.remove_hook(hook)
+        self.db.select(SimpleModel)
+        self.assertEqual([], hook.before)
+        self.assertNotIn('execute', vars(self.db.db_connection))
+
+    def test_pool_installs_hooks_on_connections(self):
+        pool = ConnectionPool(lambda: SQLiteDBConnection(DATABASE_NAME, check_same_thread=False), min_size=1, max_size=2)
+        hook = RecordingHook()
+        pool.add_hook(hook)
+        with pool.borrow() as conn:
+            conn.execute('SELECT 2')
+        self.assertIn('SELECT 2', [event.sql for event in hook.after])
+        pool.close()
+
+class TestCollectors(InstrumentationTestCase):
+    def test_statement_shape(self):
+        self.assertEqual('SELECT a FROM t WHERE a in (?, ...) AND b = ?', statement_shape('SELECT a FROM t WHERE a in (%s,%s,%s) AND b = %s'))
+        self.assertEqual(statement_shape("INSERT INTO t (a,b) VALUES (?,?),(?,?)"), statement_shape("INSERT INTO t (a,b) VALUES (?,?),(?,?),(?,?)"))
+        self.assertEqual("SELECT a FROM t WHERE b = ?", statement_shape("SELECT a FROM t WHERE b = 'it''s'"))
+
+    def test_slow_query_log(self):
+        log = SlowQueryLog(threshold=0.0, max_entries=2)
+        self.db.add_hook(log)
+        for _ in range(3):
+            self.db.select(SimpleModel)
+        self.assertEqual(2, len(log.entries))
+        self.db.remove_hook(log)
+
+        log = SlowQueryLog(threshold=60)
+        self.db.add_hook(log)
+        self.db.select(SimpleModel)
+        self.assertEqual(0, len(log.entries))
+
+    def test_latency_histogram(self):
+        histogram = LatencyHistogram(buckets=[60.0])
+        self.db.add_hook(histogram)
+        self.db.select(SimpleModel, model_id=['a', 'b'])
+        self.db.select(SimpleModel, model_id=['a', 'b', 'c'])
+        shapes = histogram.shapes()
+        self.assertEqual(1, len(shapes))
+        self.assertEqual([2, 0], histogram.counts(shapes[0]))
+        self.assertEqual(60.0, histogram.percentile(shapes[0], 99))
+        self.assertEqual(2, histogram.summary()[shapes[0]]['count'])
+
+    def test_row_counter(self):
+        counter = RowCounter()
+        self.db.add_hook(counter)
+        self.db.insert([SimpleModel(model_id=str(i)) for i in range(4)])
+        self.db.select(SimpleModel)
+        self.db.select(SimpleModel, model_id='1')
+        self.assertEqual(4, counter.rows_affected_total)
+        self.assertEqual(5, counter.rows_fetched_total)
@@ -1,7 +1,7 @@
 import unittest
 from pyDBMS.database.model_descriptor import StandardModelDescriptor
 from pyDBMS.dbtype import DBType, Model
-from tests.example_types import SimpleModel, NonNullableModel, LogTimestamp
+from tests.example_types import IndexedModel, SimpleModel, NonNullableModel, LogTimestamp
 from pyDBMS.database.model_descriptor import SQLiteModelDescriptor, StandardModelDescriptor, CrateDBModelDescriptor
 class InvalidType(DBType):
     _python_type = None
@@ -42,6 +42,15 @@ PRIMARY KEY (model_id)
         with self.assertRaises(NotImplementedError):
             descriptor.describe(InvalidModel())
 
+    def test_describe_indexes(self):
+        result = SQLiteModelDescriptor().describe_indexes(IndexedModel())
+        self.assertEqual(['CREATE INDEX IF NOT EXISTS indexed_model_timestamp_idx ON indexed_model (timestamp)',
+            'CREATE INDEX IF NOT EXISTS indexed_model_region_value_idx ON indexed_model (region,value)',
+            'CREATE UNIQUE INDEX IF NOT EXISTS positive_region ON indexed_model (region) WHERE value > 0'], result)
+
+    def test_describe_without_indexes(self):
+        self.assertEqual([], StandardModelDescriptor().describe_indexes(SimpleModel()))
+
 
 class TestCrateDBModelDescriptor(unittest.TestCase):
     def test_describe_model(self):
@@ -66,3 +75,6 @@ timestamp TIMESTAMP,
 PRIMARY KEY (model_id)
 )'''
         self.assertEqual(result, expected_result)
+
+    def test_describe_indexes(self):
+        self.assertEqual([], CrateDBModelDescriptor().describe_indexes(IndexedModel()))
@@ -1,5 +1,5 @@
-from datetime import time
-import unittest
+from datetime import datetime, time
+import gc, unittest, weakref
 from pyDBMS.dbtype import *
 from .example_types import *
 class TestInitModel(unittest.TestCase):
@@ -157,6 +157,76 @@ class TestInitModel(unittest.TestCase):
         self.assertEqual(model['timestamp'], now.date())
 
 
+    def test_field_metadata_shared_between_instances(self):
+        first, second = SimpleModel(), SimpleModel()
+        self.assertIs(first.fields, second.fields)
+        self.assertIs(first._type_mapping, SimpleModel._type_mapping)
+        self.assertNotIn('fields', vars(first))
+
+    def test_child_model_has_own_field_metadata(self):
+        self.assertNotIn('other_column', SimpleModel.fields)
+        self.assertIn('other_column', SimpleChildModel.fields)
+
+    def test_primary_keys_validated_at_class_creation(self):
+        with self.assertRaises(AssertionError):
+            class InvalidPrimaryKeyModel(Model):
+                __table_name__ = 'invalid_pk'
+                __primary_keys__ = 'missing_column'
+                model_id = String()
+
+
+    def test_set_value_converts_once(self):
+        class CountingInteger(Integer):
+            calls = 0
+            def _convert(self, value):
+                CountingInteger.calls += 1
+                return super()._convert(value)
+
+        class CountingModel(Model):
+            __table_name__ = 'counting_model'
+            value = CountingInteger()
+
+        CountingModel(value='10')
+        self.assertEqual(1, CountingInteger.calls)
+
+    def test_coerce_invalid_value(self):
+        with self.assertRaises(ValueError):
+            DateTime()._coerce('invalid_timestamp')
+        self.assertFalse(Integer()._validate('ab'))
+        self.assertTrue(Integer()._validate('10'))
+
+    def test_from_db_keeps_values_of_python_type(self):
+        value = datetime.now()
+        self.assertIs(value, DateTime()._from_db(value))
+        self.assertIsNone(Integer(is_nullable=False)._from_db(None))
+        self.assertIs(True, Boolean()._from_db(1))
+        self.assertEqual(date(2022, 1, 1), Date()._from_db('2022-01-01'))
+
+    def test_loader_builds_models_from_rows(self):
+        load = LogTimestamp._loader(['model_id', 'timestamp'])
+        model = load(('test_id', '2022-01-01 10:00:00'))
+        self.assertIsInstance(model, LogTimestamp)
+        self.assertEqual(model['timestamp'], datetime(2022, 1, 1, 10))
+        model['model_id'] = 'other_id'
+        self.assertEqual(model['model_id'], 'other_id')
+
+
+class TestModelIndexes(unittest.TestCase):
+    def test_declared_indexes_are_normalized(self):
+        self.assertEqual([Index('timestamp'), Index('region', 'value'), Index('region', unique=True, where='value > 0', name='positive_region')], IndexedModel.__indexes__)
+        self.assertEqual('indexed_model_region_value_idx', IndexedModel.__indexes__[1].index_name(IndexedModel.__table_name__))
+
+    def test_index_on_unknown_field(self):
+        with self.assertRaises(AssertionError):
+            class BadIndexModel(Model):
+                __table_name__ = 'bad_index_model'
+                __indexes__ = [('missing_column',)]
+                model_id = String()
+
+    def test_index_without_fields(self):
+        with self.assertRaises(ValueError):
+            Index()
+
 class TestDynamicModel(unittest.TestCase):
     def test_simple_dynamic_init(self):
         model = DynamicModel('dynamic_test_table', {'model_id' : String(), 'integer_column' : Integer()}, ['model_id'])
@@ -184,4 +254,73 @@ class TestDynamicModel(unittest.TestCase):
             model = DynamicModel(None, {'model_id' : String(), 'integer_column' : Integer()}, 'model_id')
         with self.assertRaises(TypeError):
             model = DynamicModel(5, {'model_id' : String(), 'integer_column' : Integer()}, 'model_id')
-        
\ No newline at end of file
+
+    def test_same_schema_shares_class(self):
+        first = DynamicModel('dynamic_test_table', {'model_id' : String(), 'integer_column' : Integer()}, 'model_id')
+        second = DynamicModel('dynamic_test_table', {'model_id' : String(), 'integer_column' : Integer()}, 'model_id', model_id='test_id')
+        self.assertIs(type(first), type(second))
+        self.assertIs(first.fields, second.fields)
+        self.assertEqual(second['model_id'], 'test_id')
+
+    def test_unused_schema_class_is_released(self):
+        model = DynamicModel('released_test_table', {'model_id' : String()}, 'model_id')
+        schema_class = weakref.ref(type(model))
+        del model
+        gc.collect()
+        self.assertIsNone(schema_class())
+        self.assertNotIn('released_test_table', [key[0] for key in DynamicModel._schema_classes.keys()])
+
+    def test_different_schema_has_own_class(self):
+        first = DynamicModel('dynamic_test_table', {'model_id' : String()}, 'model_id')
+        second = DynamicModel('dynamic_test_table', {'model_id' : String(is_nullable=False)}, 'model_id')
+        self.assertIsNot(type(first), type(second))
+        self.assertIsInstance(second, DynamicModel)
+
+    def test_new_instance_from_dynamic_model_type(self):
+        model = DynamicModel('dynamic_test_table', {'model_id' : String(), 'integer_column' : Integer()}, 'model_id')
+        copy = type(model)(integer_column=5)
+        self.assertEqual(copy.__table_name__, 'dynamic_test_table')
+        self.assertEqual(copy['integer_column'], 5)
+        self.assertEqual(model.__primary_keys__, copy.__primary_keys__)
+
+class TestCompactRow(unittest.TestCase):
+    def _row(self):
+        return SimpleModel._compact_loader(['model_id', 'integer_column', 'float_column'])(('test_id', 5, None))
+
+    def test_attribute_key_and_index_access(self):
+        row = self._row()
+        self.assertEqual('test_id', row.model_id)
+        self.assertEqual(5, row['integer_column'])
+        self.assertEqual(5, row[1])
+        self.assertIsNone(row.get('float_column'))
+        self.assertEqual('default', row.get('missing', 'default'))
+        with self.assertRaises(KeyError):
+            row['missing']
+
+    def test_is_read_only_and_slotted(self):
+        row = self._row()
+        with self.assertRaises(AttributeError):
+            row.model_id = 'other'
+        with self.assertRaises(TypeError):
+            row['model_id'] = 'other'
+        self.assertFalse(hasattr(row, '__dict__'))
+
+    def test_shares_schema_with_model(self):
+        first, second = self._row(), self._row()
+        self.assertIs(type(first), type(second))
+        self.assertIs(SimpleModel, first.model_class)
+        self.assertEqual('simple_model', first.__table_name__)
+        self.assertEqual(['model_id'], first.__primary_keys__)
+        self.assertIn('model_id', first)
+        self.assertEqual([('model_id', 'test_id'), ('integer_column', 5), ('float_column', None)], first.items())
+
+    def test_to_model(self):
+        model = self._row().to_model()
+        self.assertIsInstance(model, SimpleModel)
+        self.assertEqual(SimpleModel(model_id='test_id', integer_column=5, float_column=None), model)
+        model['integer_column'] = 6
+        self.assertEqual(6, model['integer_column'])
+
+    def test_converts_driver_values(self):
+        row = LogTimestamp._compact_loader(['model_id', 'timestamp'])(('a', '2022-01-01 10:00:00'))
+        self.assertEqual(datetime(2022, 1, 1, 10), row.timestamp)
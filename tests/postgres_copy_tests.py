@@ -0,0 +1,85 @@
+from datetime import date, datetime
+import threading, unittest
+from pyDBMS.database.postgres_copy import CopyFormat, CopyInStream, stream_copy_out
+from .example_types import LogTimestamp, SimpleModel, SimpleTextModel, SpecialDate
+
+class TestCopyFormat(unittest.TestCase):
+    def test_encode_model(self):
+        copy_format = CopyFormat(SimpleModel, ['model_id', 'integer_column', 'float_column'])
+        self.assertEqual('a\t1\t0.5\n', copy_format.encode(SimpleModel(model_id='a', integer_column=1, float_column=0.5)))
+
+    def test_encode_null_and_escapes(self):
+        copy_format = CopyFormat(SimpleModel, ['model_id', 'integer_column'])
+        self.assertEqual('a\\tb\\\\c\\nd\t\\N\n', copy_format.encode(SimpleModel(model_id='a\tb\\c\nd')))
+
+    def test_encode_sequence(self):
+        copy_format = CopyFormat(SimpleTextModel, ['model_id', 'boolean_column'])
+        self.assertEqual('x\tt\n', copy_format.encode(('x', True)))
+
+    def test_encode_sequence_converts_values(self):
+        copy_format = CopyFormat(SimpleModel, ['model_id', 'integer_column', 'float_column'])
+        self.assertEqual('3\t3\t1.5\n', copy_format.encode((3, '3', '1.5')))
+        self.assertEqual('a\t2021-03-04 05:06:07\n', CopyFormat(LogTimestamp, ['model_id', 'timestamp']).encode(('a', '2021-03-04T05:06:07')))
+        with self.assertRaises(ValueError):
+            copy_format.encode(('a', 'not a number', None))
+
+    def test_encode_sequence_requires_every_field(self):
+        with self.assertRaises(ValueError):
+            CopyFormat(SimpleModel, ['model_id', 'integer_column']).encode(('a', 1, None))
+
+    def test_default_fields_are_alphabetical(self):
+        self.assertEqual('COPY simple_model (float_column,integer_column,model_id) FROM STDIN', CopyFormat(SimpleModel).copy_from_query())
+
+    def test_encode_dates(self):
+        self.assertEqual('a\t2021-03-04 05:06:07.500000\n', CopyFormat(LogTimestamp, ['model_id', 'timestamp']).encode(('a', datetime(2021, 3, 4, 5, 6, 7, 500000))))
+        self.assertEqual('a\t2021-03-04\n', CopyFormat(SpecialDate, ['model_id', 'timestamp']).encode(('a', date(2021, 3, 4))))
+
+    def test_decode(self):
+        copy_format = CopyFormat(SimpleModel, ['model_id', 'integer_column', 'float_column'])
+        self.assertEqual(('a\tb\\c', 1, None), copy_format.decode('a\\tb\\\\c\t1\t\\N'))
+        self.assertEqual((True,), CopyFormat(SimpleTextModel, ['boolean_column']).decode('t'))
+        self.assertEqual((datetime(2021, 3, 4, 5, 6, 7, 500000),), CopyFormat(LogTimestamp, ['timestamp']).decode('2021-03-04 05:06:07.5'))
+
+    def test_queries(self):
+        copy_format = CopyFormat(SimpleModel, ['model_id', 'integer_column'])
+        self.assertEqual('COPY simple_model (model_id,integer_column) FROM STDIN', copy_format.copy_from_query())
+        self.assertEqual('COPY (SELECT model_id FROM simple_model) TO STDOUT', copy_format.copy_to_query('SELECT model_id FROM simple_model'))
+
+class TestCopyStreams(unittest.TestCase):
+    def test_copy_in_stream_reads_lazily(self):
+        consumed = []
+        def lines():
+            for i in range(100):
+                consumed.append(i)
+                yield f'{i}\n'
+        stream = CopyInStream(lines())
+        self.assertEqual('0\n1\n2', stream.read(5))
+        self.assertLess(len(consumed), 10)
+        self.assertEqual(''.join(f'{i}\n' for i in range(100))[5:], stream.read())
+        self.assertEqual('', stream.read(10))
+
+    def test_stream_copy_out_splits_chunks_into_lines(self):
+        def copy_expert(query, file):
+            for chunk in ['a\t1\nb', '\t2\n', 'c\t3\n']:
+                file.write(chunk)
+        self.assertEqual(['a\t1', 'b\t2', 'c\t3'], list(stream_copy_out(copy_expert, 'COPY')))
+
+    def test_stream_copy_out_raises_copy_errors(self):
+        def copy_expert(query, file):
+            file.write('a\n')
+            raise RuntimeError('copy failed')
+        with self.assertRaises(RuntimeError):
+            list(stream_copy_out(copy_expert, 'COPY'))
+
+    def test_stream_copy_out_closed_early_stops_writer(self):
+        finished = threading.Event()
+        def copy_expert(query, file):
+            try:
+                for i in range(10000):
+                    file.write(f'{i}\n')
+            finally:
+                finished.set()
+        lines = stream_copy_out(copy_expert, 'COPY', max_buffered_chunks=2)
+        self.assertEqual('0', next(lines))
+        lines.close()
+        self.assertTrue(finished.is_set())
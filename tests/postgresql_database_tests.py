@@ -87,6 +87,13 @@ class TestPostgresDB(unittest.TestCase):
         self.assertSetEqual(set(model.fields), {'model_id', 'integer_column', 'float_column'})
         self.assertTrue(self.db.model_exists(model))
     
+    def test_insert_list_of_models(self):
+        stats = self.db.insert([SimpleModel(model_id=f'test_id{i}', integer_column=i) for i in range(25)], batch_size=10)
+        self.assertEqual(25, stats.rows)
+        cur = self.conn.cursor()
+        cur.execute('select count(*) from simple_model')
+        self.assertEqual(25, cur.fetchone()[0])
+
     def test_model_insert_passing_class(self):
         self.assertFalse(self.db.model_exists(SimpleChildModel))
         self.db.create_model(SimpleChildModel)
@@ -140,6 +147,21 @@ class TestPostgresDB(unittest.TestCase):
         self.assertEqual(2, len(results))
         self.assertEqual(['test_id','test_id2'], returned_ids)
 
+    def test_iter_select(self):
+        for i in range(5):
+            self._insert_empty_test_model(f'test_id{i}', i)
+        results = list(self.db.iter_select(SimpleModel, chunk_size=2))
+        self.assertEqual([f'test_id{i}' for i in range(5)], sorted([x['model_id'] for x in results]))
+
+    def test_nested_transaction_rolls_back_to_savepoint(self):
+        with self.db.transaction():
+            self.db.insert(SimpleModel(model_id='test_id'))
+            with self.assertRaises(RuntimeError):
+                with self.db.transaction():
+                    self.db.insert(SimpleModel(model_id='test_id2'))
+                    raise RuntimeError()
+        self.assertEqual(['test_id'], [x['model_id'] for x in self.db.select(SimpleModel)])
+
     def test_update_simple_model(self):
         self._insert_empty_test_model('test_id2',200,None)
         model = SimpleModel(model_id='test_id2',integer_column=200,float_column=1.0)
@@ -152,6 +174,14 @@ class TestPostgresDB(unittest.TestCase):
         self.assertEqual(len(results), 1)
         self.assertEqual(1.0, results[0][0])
 
+    def test_update_large_batch_with_values_strategy(self):
+        self.db.insert([SimpleModel(model_id=f'test_id{i}', integer_column=i) for i in range(600)])
+        affected_rows = self.db.update([SimpleModel(model_id=f'test_id{i}', integer_column=i * 2, float_column=0.5) for i in range(600)])
+        self.assertEqual(600, affected_rows)
+        cur = self.conn.cursor()
+        cur.execute('select sum(integer_column), sum(float_column) from simple_model')
+        self.assertEqual((sum(range(600)) * 2, 300.0), cur.fetchone())
+
     def test_delete_without_kwargs(self):
         self._insert_empty_test_model()
         cur = self.conn.cursor()
@@ -203,3 +233,26 @@ class TestPostgresDB(unittest.TestCase):
         self.assertNotIn('log_timestamp_model', self.db.get_tables())
         self.db.create_model(LogTimestamp)
         self.assertIn('log_timestamp_model', self.db.get_tables())
+
+    def test_copy_in_and_copy_out(self):
+        models = [SimpleModel(model_id=f'id\t{i}', integer_column=i, float_column=i / 2) for i in range(100)]
+        models.append(SimpleModel(model_id='null_columns'))
+        stats = self.db.copy_in(models)
+        self.assertEqual(101, stats.rows)
+        result = sorted(self.db.copy_out(SimpleModel), key=lambda m: m['model_id'])
+        self.assertEqual(sorted(models, key=lambda m: m['model_id']), result)
+
+    def test_copy_in_rows_and_copy_out_with_filter(self):
+        self.db.copy_in(((str(i), i) for i in range(10)), SimpleModel, fields=['model_id', 'integer_column'])
+        result = list(self.db.copy_out(SimpleModel, integer_column=[1, 2]))
+        self.assertEqual(['1', '2'], sorted(m['model_id'] for m in result))
+
+    def test_copy_in_rows_in_default_field_order(self):
+        self.db.copy_in([(0.5, '1', 'id')], SimpleModel)
+        self.assertEqual([SimpleModel(model_id='id', integer_column=1, float_column=0.5)], list(self.db.copy_out(SimpleModel)))
+
+    def test_copy_out_datetime(self):
+        self.db.create_model(LogTimestamp)
+        model = LogTimestamp(model_id='test_id', timestamp=datetime.now())
+        self.db.copy_in([model])
+        self.assertEqual([model], list(self.db.copy_out(LogTimestamp)))
@@ -0,0 +1,201 @@
+import gc, unittest, weakref
+from pyDBMS.database.query_builder import AggregateQueryBuilder, CrateUpsertQueryBuilder, PostgresAggregateQueryBuilder, DeleteQueryBuilder, PostgresSelectQueryBuilder, PostgresUpdateQueryBuilder, PostgresUpsertQueryBuilder, SelectQueryBuilder, UpdateQueryBuilder, UpsertQueryBuilder
+from pyDBMS.database.filters import Q
+from tests.example_types import CompositeKeyModel, SimpleModel
+
+class TestSelectQueryBuilder(unittest.TestCase):
+    def test_build_query_without_filters(self):
+        query, params = SelectQueryBuilder().build_query(SimpleModel())
+        self.assertEqual(query, 'SELECT float_column,integer_column,model_id FROM simple_model')
+        self.assertEqual(params, [])
+
+    def test_build_query_with_parameterized_filters(self):
+        query, params = SelectQueryBuilder().build_query(SimpleModel(), model_id="o'brien", integer_column=[1, 2])
+        self.assertEqual(query, 'SELECT float_column,integer_column,model_id FROM simple_model WHERE integer_column in (?,?) AND model_id = ?')
+        self.assertEqual(params, [1, 2, "o'brien"])
+
+    def test_build_query_with_null(self):
+        query, params = SelectQueryBuilder().build_query(SimpleModel(), float_column=[None, 1.0])
+        self.assertEqual(query, 'SELECT float_column,integer_column,model_id FROM simple_model WHERE (float_column is null OR float_column = ?)')
+        self.assertEqual(params, [1.0])
+
+    def test_postgres_param_symbol(self):
+        query, params = PostgresSelectQueryBuilder().build_query(SimpleModel(), model_id='test_id')
+        self.assertEqual(query, 'SELECT float_column,integer_column,model_id FROM simple_model WHERE model_id = %s')
+
+    def test_build_query_with_fields(self):
+        query, params = SelectQueryBuilder().build_query(SimpleModel(), ['model_id', 'integer_column'], float_column=1.0)
+        self.assertEqual(query, 'SELECT model_id,integer_column FROM simple_model WHERE float_column = ?')
+        self.assertEqual(params, [1.0])
+
+    def test_same_shape_reuses_template(self):
+        builder = SelectQueryBuilder()
+        first, first_params = builder.build_query(SimpleModel(), model_id='a', integer_column=1)
+        second, second_params = builder.build_query(SimpleModel(), integer_column=2, model_id='b')
+        self.assertIs(first, second)
+        self.assertEqual(second_params, [2, 'b'])
+
+    def test_different_in_list_arity_builds_new_template(self):
+        builder = SelectQueryBuilder()
+        first, _ = builder.build_query(SimpleModel(), model_id=['a', 'b'])
+        second, _ = builder.build_query(SimpleModel(), model_id=['a', 'b', 'c'])
+        self.assertNotEqual(first, second)
+
+    def test_templates_cached_per_builder(self):
+        builder = SelectQueryBuilder()
+        first, _ = builder.build_query(SimpleModel(), model_id='a', limit=1, after='a')
+        self.assertIs(first, builder.build_query(SimpleModel(), model_id='b', limit=2, after='b')[0])
+        self.assertEqual(1, builder._template.cache_info().hits)
+        self.assertEqual(0, SelectQueryBuilder()._template.cache_info().currsize)
+
+        reference = weakref.ref(builder)
+        del builder
+        gc.collect()
+        self.assertIsNone(reference())
+
+class TestFilterExpressions(unittest.TestCase):
+    def test_comparison_lookups(self):
+        query, params = SelectQueryBuilder().build_query(SimpleModel(), integer_column__gte=1, integer_column__lt=5, model_id__like='a%')
+        self.assertTrue(query.endswith('WHERE integer_column >= ? AND integer_column < ? AND model_id LIKE ?'))
+        self.assertEqual(params, [1, 5, 'a%'])
+
+    def test_exclusion_and_null_lookups(self):
+        query, params = PostgresSelectQueryBuilder().build_query(SimpleModel(), float_column__isnull=False, model_id__ne=[None, 'a', 'b'])
+        self.assertTrue(query.endswith('WHERE float_column is not null AND (model_id is not null AND model_id not in (%s,%s))'))
+        self.assertEqual(params, ['a', 'b'])
+
+    def test_in_lookup(self):
+        query, params = SelectQueryBuilder().build_query(SimpleModel(), model_id__in=('a', 'b'))
+        self.assertTrue(query.endswith('WHERE model_id in (?,?)'))
+        self.assertEqual(params, ['a', 'b'])
+
+    def test_empty_in_list_matches_nothing(self):
+        query, params = SelectQueryBuilder().build_query(SimpleModel(), model_id__in=[])
+        self.assertTrue(query.endswith('WHERE 1 = 0'))
+
+    def test_q_expression(self):
+        where = Q(integer_column__lt=2) | ~Q(integer_column__lte=7, float_column__isnull=True)
+        query, params = SelectQueryBuilder().build_query(SimpleModel(), where=where, model_id='a')
+        self.assertTrue(query.endswith('WHERE model_id = ? AND (integer_column < ? OR NOT (float_column is null AND integer_column <= ?))'))
+        self.assertEqual(params, ['a', 2, 7])
+
+    def test_same_expression_shape_reuses_template(self):
+        builder = SelectQueryBuilder()
+        first, _ = builder.build_query(SimpleModel(), where=Q(integer_column__gt=1) | Q(model_id='a'))
+        second, params = builder.build_query(SimpleModel(), where=Q(integer_column__gt=5) | Q(model_id='b'))
+        self.assertIs(first, second)
+        self.assertEqual(params, [5, 'b'])
+
+    def test_in_requires_list_of_values(self):
+        with self.assertRaises(TypeError):
+            SelectQueryBuilder().build_query(SimpleModel(), model_id__in='abc')
+        with self.assertRaises(TypeError):
+            SelectQueryBuilder().build_query(SimpleModel(), integer_column__in=5)
+        _, params = SelectQueryBuilder().build_query(SimpleModel(), model_id__in=('abc', 'd'))
+        self.assertEqual(params, ['abc', 'd'])
+
+    def test_comparison_requires_single_value(self):
+        with self.assertRaises(ValueError):
+            SelectQueryBuilder().build_query(SimpleModel(), integer_column__gt=None)
+
+class TestKeysetPagination(unittest.TestCase):
+    def test_limit_orders_by_primary_key(self):
+        query, params = SelectQueryBuilder().build_query(SimpleModel(), limit=10)
+        self.assertTrue(query.endswith('FROM simple_model ORDER BY model_id LIMIT ?'))
+        self.assertEqual(params, [10])
+
+    def test_after_with_mixed_directions(self):
+        query, params = SelectQueryBuilder().build_query(SimpleModel(), order_by=['-integer_column'], limit=2, after=(5, 'a'), float_column=1.0)
+        self.assertTrue(query.endswith('WHERE float_column = ? AND integer_column <= ? AND ((integer_column < ?) OR (integer_column = ? AND model_id > ?)) '
+            'ORDER BY integer_column DESC NULLS FIRST,model_id LIMIT ?'))
+        self.assertEqual(params, [1.0, 5, 5, 5, 'a', 2])
+
+    def test_after_null_position(self):
+        query, params = SelectQueryBuilder().build_query(SimpleModel(), order_by=['float_column'], after=(None, 'a'))
+        self.assertTrue(query.endswith('WHERE float_column IS NULL AND model_id > ? ORDER BY float_column NULLS LAST,model_id'))
+        self.assertEqual(params, ['a'])
+        query, params = SelectQueryBuilder().build_query(SimpleModel(), order_by=['float_column'], after=(1.5, 'a'))
+        self.assertTrue(query.endswith('WHERE (float_column >= ? OR float_column IS NULL) AND (((float_column > ? OR float_column IS NULL)) '
+            'OR (float_column = ? AND model_id > ?)) ORDER BY float_column NULLS LAST,model_id'))
+        self.assertEqual(params, [1.5, 1.5, 1.5, 'a'])
+
+    def test_after_model(self):
+        _, params = SelectQueryBuilder().build_query(SimpleModel(), after=SimpleModel(model_id='a', integer_column=1))
+        self.assertEqual(params, ['a'])
+
+    def test_postgres_row_value_comparison(self):
+        query, params = PostgresSelectQueryBuilder().build_query(CompositeKeyModel(), after=('eu', 1), limit=10)
+        self.assertTrue(query.endswith('WHERE (region,model_id) > (%s,%s) ORDER BY region,model_id LIMIT %s'))
+        self.assertEqual(params, ['eu', 1, 10])
+
+    def test_after_needs_every_ordering_value(self):
+        with self.assertRaises(ValueError):
+            SelectQueryBuilder().build_query(SimpleModel(), order_by=['integer_column'], after=5)
+
+class TestKeyQuery(unittest.TestCase):
+    def test_single_key(self):
+        query = SelectQueryBuilder().build_key_query(SimpleModel, 1)
+        self.assertEqual(query, f'SELECT {",".join(SimpleModel.fields)} FROM simple_model WHERE model_id = ?')
+
+    def test_many_keys(self):
+        query = PostgresSelectQueryBuilder().build_key_query(SimpleModel, 3)
+        self.assertTrue(query.endswith('WHERE model_id in (%s,%s,%s)'))
+
+    def test_composite_keys(self):
+        query = SelectQueryBuilder().build_key_query(CompositeKeyModel, 2)
+        self.assertTrue(query.endswith('WHERE (region = ? AND model_id = ?) OR (region = ? AND model_id = ?)'))
+
+class TestUpdateQueryBuilder(unittest.TestCase):
+    def test_build_query(self):
+        query, params = UpdateQueryBuilder().build_query(SimpleModel(model_id='test_id', integer_column=5))
+        self.assertEqual(query, 'UPDATE simple_model SET float_column= ?,integer_column= ? WHERE model_id = ?')
+        self.assertEqual(params, [None, 5, 'test_id'])
+
+    def test_build_bulk_query(self):
+        query = UpdateQueryBuilder().build_bulk_query(SimpleModel(), ['float_column', 'integer_column'])
+        self.assertEqual(query, 'UPDATE simple_model SET float_column= ?,integer_column= ? WHERE model_id = ?')
+
+    def test_build_postgres_values_query(self):
+        query = PostgresUpdateQueryBuilder().build_values_query(SimpleModel(), ['integer_column'], 2, ['INTEGER', 'TEXT'])
+        self.assertEqual(query, 'UPDATE simple_model SET integer_column = pydbms_values.integer_column FROM (VALUES (CAST(%s AS INTEGER),CAST(%s AS TEXT)),(%s,%s)) '
+            'AS pydbms_values(integer_column,model_id) WHERE simple_model.model_id = pydbms_values.model_id')
+
+class TestUpsertQueryBuilder(unittest.TestCase):
+    def test_build_query(self):
+        query, params = UpsertQueryBuilder().build_query(SimpleModel(model_id='test_id', integer_column=5))
+        self.assertEqual(query, 'INSERT INTO simple_model(float_column,integer_column,model_id) VALUES (?,?,?) '
+            'ON CONFLICT (model_id) DO UPDATE SET float_column = excluded.float_column,integer_column = excluded.integer_column')
+        self.assertEqual(params, [None, 5, 'test_id'])
+
+    def test_build_postgres_multi_row_query(self):
+        query = PostgresUpsertQueryBuilder().build_bulk_query(CompositeKeyModel(), ['model_id', 'region', 'value'], 2)
+        self.assertEqual(query, 'INSERT INTO composite_key_model(model_id,region,value) VALUES (%s,%s,%s),(%s,%s,%s) '
+            'ON CONFLICT (region,model_id) DO UPDATE SET value = excluded.value')
+
+    def test_only_primary_keys(self):
+        self.assertTrue(UpsertQueryBuilder().build_bulk_query(SimpleModel(), ['model_id']).endswith('ON CONFLICT (model_id) DO NOTHING'))
+        self.assertTrue(CrateUpsertQueryBuilder().build_bulk_query(SimpleModel(), ['model_id']).endswith('VALUES (?) ON CONFLICT DO NOTHING'))
+
+class TestAggregateQueryBuilder(unittest.TestCase):
+    def test_count(self):
+        query, params = AggregateQueryBuilder().build_count_query(SimpleModel(), integer_column__gt=1)
+        self.assertEqual(query, 'SELECT COUNT(*) AS count FROM simple_model WHERE integer_column > ?')
+        self.assertEqual(params, [1])
+
+    def test_exists(self):
+        query, params = PostgresAggregateQueryBuilder().build_exists_query(SimpleModel(), model_id='a')
+        self.assertEqual(query, 'SELECT 1 FROM simple_model WHERE model_id = %s LIMIT 1')
+
+    def test_group_by(self):
+        query, _ = AggregateQueryBuilder().build_query(CompositeKeyModel(), ['region'], [('sum', 'value'), ('max', 'model_id')])
+        self.assertEqual(query, 'SELECT region,SUM(value) AS sum_value,MAX(model_id) AS max_model_id FROM composite_key_model GROUP BY region ORDER BY region')
+
+    def test_postgres_avg_is_double_precision(self):
+        query, _ = PostgresAggregateQueryBuilder().build_query(SimpleModel(), [], [('avg', 'integer_column')])
+        self.assertEqual(query, 'SELECT CAST(AVG(integer_column) AS DOUBLE PRECISION) AS avg_integer_column FROM simple_model')
+
+class TestDeleteQueryBuilder(unittest.TestCase):
+    def test_build_query(self):
+        query, params = DeleteQueryBuilder().build_query(SimpleModel(), float_column=1.0)
+        self.assertEqual(query, 'DELETE FROM simple_model WHERE float_column = ?')
+        self.assertEqual(params, [1.0])